@@ -0,0 +1,120 @@
+"""
+Inventory analytics: stock valuation, low-stock products and per-category totals.
+
+Totals are read from the category_stats summary table, which triggers keep current on
+every product and category write (including raw SQL), so no request scans the products
+table. ``check`` and ``rebuild`` recompute the totals from scratch to detect and repair
+drift:
+
+    python analytics.py check --db inventory.db
+    python analytics.py rebuild --db inventory.db
+"""
+import argparse
+import sys
+
+from models import CATEGORY_STATS_REBUILD, CATEGORY_STATS_SOURCE, Database
+
+STAT_COLUMNS = ("product_count", "total_quantity", "stock_value", "out_of_stock", "low_stock")
+
+
+def _rounded(row: dict) -> dict:
+    row["stock_value"] = round(row["stock_value"], 2)
+    return row
+
+
+class Analytics:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def low_stock_threshold(self) -> int:
+        return self.db.fetchone("SELECT value FROM settings WHERE name = 'low_stock_threshold'")["value"]
+
+    def set_low_stock_threshold(self, threshold: int):
+        """Change the quantity at or below which a product counts as low on stock, and recount."""
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE settings SET value = ? WHERE name = 'low_stock_threshold'", (int(threshold),))
+            for statement in CATEGORY_STATS_REBUILD:
+                conn.execute(statement)
+
+    def summary(self) -> dict:
+        """Inventory-wide totals: product and category counts, units, stock value and stock alerts."""
+        row = self.db.fetchone(
+            "SELECT (SELECT COUNT(*) FROM categories) AS categories, IFNULL(SUM(product_count), 0) AS products, "
+            "IFNULL(SUM(total_quantity), 0) AS total_quantity, TOTAL(stock_value) AS stock_value, "
+            "IFNULL(SUM(out_of_stock), 0) AS out_of_stock, IFNULL(SUM(low_stock), 0) AS low_stock, "
+            "(SELECT value FROM settings WHERE name = 'low_stock_threshold') AS low_stock_threshold FROM category_stats"
+        )
+        return _rounded(row)
+
+    def category_stats(self) -> list:
+        """Totals for every category; products without a category are listed with category None."""
+        rows = self.db.fetchall(
+            "SELECT c.name AS category, s.product_count, s.total_quantity, s.stock_value, s.out_of_stock, s.low_stock "
+            "FROM category_stats s LEFT JOIN categories c ON c.id = s.category_id ORDER BY s.stock_value DESC"
+        )
+        return [_rounded(row) for row in rows]
+
+    def category_stat(self, category_name: str):
+        row = self.db.fetchone(
+            "SELECT c.name AS category, s.product_count, s.total_quantity, s.stock_value, s.out_of_stock, s.low_stock "
+            "FROM categories c JOIN category_stats s ON s.category_id = c.id WHERE c.name = ?", (category_name,)
+        )
+        return _rounded(row) if row else None
+
+    def low_stock(self, threshold: int = None, category: str = None, limit: int = 100) -> list:
+        """Products with quantity at or below threshold (default: the configured one), lowest first."""
+        threshold = self.low_stock_threshold() if threshold is None else threshold
+        query = ("SELECT p.id, p.name, p.quantity, p.price, c.name AS category FROM products p "
+                 "LEFT JOIN categories c ON p.category_id = c.id WHERE p.quantity <= ?")
+        params = [threshold]
+        if category is not None:
+            query += " AND c.name = ?"
+            params.append(category)
+        return self.db.fetchall(query + " ORDER BY p.quantity, p.id LIMIT ?", (*params, limit))
+
+    @staticmethod
+    def _drift(conn) -> list:
+        stored = {row["category_id"]: dict(row) for row in conn.execute("SELECT * FROM category_stats")}
+        actual = {row["category_id"]: dict(row) for row in conn.execute(CATEGORY_STATS_SOURCE)}
+        drift = []
+        for category_id in sorted(stored.keys() | actual.keys()):
+            before, after = stored.get(category_id), actual.get(category_id)
+            if before is None or after is None or any(
+                    abs(before[column] - after[column]) > 1e-6 * max(1.0, abs(after[column])) for column in STAT_COLUMNS):
+                drift.append({"category_id": category_id, "stored": before, "actual": after})
+        return drift
+
+    def check(self) -> list:
+        """Categories whose stored totals differ from a full recount, as {category_id, stored, actual}."""
+        with self.db.transaction() as conn:
+            conn.execute("BEGIN")  # one read snapshot for both queries
+            return self._drift(conn)
+
+    def rebuild(self) -> list:
+        """Recompute every total from the products table; returns the drift that was repaired."""
+        with self.db.transaction() as conn:
+            # Take the write lock before recounting so no write lands between the check and the rebuild.
+            conn.execute("BEGIN IMMEDIATE")
+            drift = self._drift(conn)
+            for statement in CATEGORY_STATS_REBUILD:
+                conn.execute(statement)
+        return drift
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("check", "rebuild"))
+    parser.add_argument("--db", default="inventory.db")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        analytics = Analytics(db)
+        drift = analytics.check() if args.command == "check" else analytics.rebuild()
+    for row in drift:
+        print(f"category {row['category_id']}: stored {row['stored']} actual {row['actual']}")
+    print(f"{len(drift)} categories out of date" + (" (rebuilt)" if args.command == "rebuild" and drift else ""))
+    return 1 if drift and args.command == "check" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,627 @@
+"""
+Async (ASGI) variant of the REST API in routes.py.
+
+Exposes the same routes and response envelope as the Flask app. Inventory calls never
+run on the event loop: reads go to a bounded thread pool and run in parallel, writes go
+to a single dedicated writer thread so they are serialized instead of contending for
+SQLite's write lock. Run it with an ASGI server, e.g. ``python app/serve.py --mode asgi``.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from itertools import islice
+from urllib.parse import parse_qs, unquote
+
+from analytics import Analytics
+from cache import CachedInventory, create_cache
+from changes import ChangeLog, ChangesExpiredError
+from export import CHUNK_SIZE, EXPORTS, EXTENSIONS, FORMATS, backup_chunks, export_chunks
+from httpcache import (COMPRESSIBLE_TYPES, MIN_COMPRESS_SIZE, Compressor, TableVersions, compress, dumps, negotiate,
+                       not_modified, validator_headers)
+from models import Database, InsufficientStockError, Inventory, ProductNotFoundError
+from snapshot import CatalogSnapshot
+
+MAX_PAGE_SIZE = 1000
+MAX_CHANGES_PAGE = 10000
+STREAM_BATCH_SIZE = 500
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class DatabaseExecutor:
+    """Runs blocking Inventory calls off the event loop: reads on a bounded pool, writes on one thread."""
+
+    def __init__(self, readers: int = 8):
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    async def read(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, partial(fn, *args, **kwargs))
+
+    async def write(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.readers.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+
+readers = int(os.environ.get("INVENTORY_READERS", 8))
+# Group commit is not used here: writes are already serialized on the executor's single writer
+# thread, so every batch would hold one statement and only add flush_interval to each write.
+if os.environ.get("INVENTORY_GROUP_COMMIT") == "1":
+    logging.warning("INVENTORY_GROUP_COMMIT is ignored by the ASGI app; its writes are serialized already")
+db = Database(os.environ.get("INVENTORY_DB", "inventory.db"), pool_size=readers + 1, read_pool_size=readers,
+              immutable=os.environ.get("INVENTORY_IMMUTABLE") == "1")
+versions = TableVersions(db, max_staleness=float(os.environ.get("INVENTORY_VALIDATOR_TTL", 1)))
+cache = create_cache(os.environ.get("INVENTORY_CACHE", "memory"))
+inventory = CachedInventory(db, cache, versions) if cache is not None else Inventory(db)
+analytics = Analytics(db)
+change_log = ChangeLog(db)
+if os.environ.get("INVENTORY_CHANGES_MAX_AGE"):
+    if db.immutable:
+        raise ValueError("INVENTORY_CHANGES_MAX_AGE trims the change log, which INVENTORY_IMMUTABLE=1 forbids")
+    change_log.start_maintenance(60, max_age=float(os.environ["INVENTORY_CHANGES_MAX_AGE"]))
+snapshot = CatalogSnapshot(db) if os.environ.get("INVENTORY_SNAPSHOT") == "1" else None
+executor = DatabaseExecutor(readers)
+
+
+class Request:
+    def __init__(self, scope: dict, body: bytes):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = {key: values[0] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers = {key.decode().lower(): value.decode() for key, value in scope.get("headers", [])}
+        self.mimetype = self.headers.get("content-type", "").split(";")[0].strip()
+        self.body = body
+
+    def json(self):
+        """The decoded JSON body, or None when it is missing or invalid."""
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+
+class StreamingResponse:
+    def __init__(self, chunks, content_type: str):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.headers = {}
+
+
+def response(success: bool, message: str, data=None, status_code=200, **extra):
+    """Same envelope as routes.response: (status, {"success", "message", "data", ...})."""
+    response_data = {"success": success, "message": message}
+    if data is not None:
+        response_data["data"] = data
+    response_data.update(extra)
+    return status_code, response_data
+
+
+def raw_response(message: str, data: bytes):
+    """The response() envelope around an already serialized JSON payload: (status, bytes)."""
+    head = json.dumps({"success": True, "message": message})[:-1].encode()
+    return 200, head + b', "data": ' + data + b"}"
+
+
+ROUTES = []
+
+
+def route(method: str, pattern: str):
+    def register(handler):
+        ROUTES.append((method, re.compile(pattern), handler))
+        return handler
+    return register
+
+
+def conditional(*tables: str):
+    """Same as routes.conditional; adds the validator headers as a third (status, payload, headers) element."""
+    def decorate(handler):
+        @wraps(handler)
+        async def wrapper(request: Request, **kwargs):
+            etag, last_modified = await executor.read(versions.validators, *tables)
+            headers = validator_headers(etag, last_modified)
+            if not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"),
+                            etag, last_modified):
+                return 304, b"", headers
+            result = await handler(request, **kwargs)
+            if isinstance(result, StreamingResponse):
+                result.headers.update(headers)
+                return result
+            if result[0] == 200:
+                return (*result, headers)
+            return result
+        return wrapper
+    return decorate
+
+
+def page_size(request: Request):
+    limit = request.args.get("limit")
+    if limit is None:
+        return None
+    limit = int(limit)
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def product_filters(args) -> dict:
+    filters = {"category": args["category"]} if "category" in args else {}
+    for key, cast in (("min_price", float), ("max_price", float), ("min_quantity", int), ("max_quantity", int)):
+        if key in args:
+            filters[key] = cast(args[key])
+    return filters
+
+
+def search_params(args) -> dict:
+    limit = int(args.get("limit", 50))
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return {
+        "query": args.get("q"),
+        "category": args.get("category"),
+        "min_price": float(args["min_price"]) if "min_price" in args else None,
+        "max_price": float(args["max_price"]) if "max_price" in args else None,
+        "in_stock": args.get("in_stock", "").lower() in ("1", "true", "yes"),
+        "limit": limit,
+        "offset": max(int(args.get("offset", 0)), 0),
+        "facets": args.get("facets", "1").lower() not in ("0", "false", "no"),
+        "rank": args.get("sort", "relevance") == "relevance",
+    }
+
+
+def stream_rows(message: str, rows, mode: str) -> StreamingResponse:
+    """Stream rows in batches pulled from the cursor on the reader pool."""
+    async def chunks():
+        if mode != "ndjson":
+            yield json.dumps({"success": True, "message": message})[:-1].encode() + b', "data": ['
+        first = True
+        while True:
+            batch = await executor.read(lambda: list(islice(rows, STREAM_BATCH_SIZE)))
+            if not batch:
+                break
+            if mode == "ndjson":
+                yield b"".join(dumps(row) + b"\n" for row in batch)
+            else:
+                yield (b"" if first else b",") + b",".join(dumps(row) for row in batch)
+                first = False
+        if mode != "ndjson":
+            yield b"]}"
+
+    return StreamingResponse(chunks(), "application/x-ndjson" if mode == "ndjson" else "application/json")
+
+
+def stream_chunks(chunks, content_type: str, filename: str) -> StreamingResponse:
+    """Stream a blocking iterator of byte chunks as a download, pulling each chunk on the reader pool."""
+    async def pull():
+        try:
+            while True:
+                chunk = await executor.read(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            chunks.close()
+
+    result = StreamingResponse(pull(), content_type)
+    result.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return result
+
+
+@route("GET", r"/products")
+@conditional("products", "categories")
+async def get_all_products(request: Request):
+    try:
+        limit = page_size(request)
+        filters = product_filters(request.args)
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+
+    if filters:
+        if snapshot is not None:
+            rows = await executor.read(snapshot.select, **filters)
+            return raw_response("Products retrieved successfully", await executor.read(snapshot.json, rows))
+        return response(True, "Products retrieved successfully", await executor.read(inventory.filter_products, **filters))
+    stream = request.args.get("stream")
+    if stream:
+        return stream_rows("Products retrieved successfully", inventory.iter_products(), stream)
+    if limit:
+        products = await executor.read(inventory.get_products_page, limit, request.args.get("after"))
+        next_cursor = products[-1]["id"] if len(products) == limit else None
+        return response(True, "Products retrieved successfully", products, next=next_cursor)
+    if snapshot is not None:
+        return raw_response("Products retrieved successfully", await executor.read(snapshot.products_json))
+    products = await executor.read(inventory.get_all_products)
+    return response(True, "Products retrieved successfully", products)
+
+
+@route("GET", r"/products/search")
+@conditional("products", "categories")
+async def search_products(request: Request):
+    try:
+        params = search_params(request.args)
+    except ValueError as e:
+        return response(False, f"Invalid search parameters: {e}", status_code=400)
+    result = await executor.read(inventory.search_products, **params)
+    return response(True, "Products retrieved successfully", result["items"], facets=result["facets"])
+
+
+@route("GET", r"/products/(?P<product_id>[^/]+)")
+@conditional("products", "categories")
+async def get_product(request: Request, product_id: str):
+    product = await executor.read(inventory.get_product, product_id)
+    if not product:
+        return response(False, "Product not found", status_code=404)
+    return response(True, "Product retrieved successfully", product)
+
+
+@route("GET", r"/categories")
+@conditional("categories")
+async def get_all_categories(request: Request):
+    try:
+        limit = page_size(request)
+        after = int(request.args.get("after", 0))
+    except ValueError as e:
+        return response(False, f"Invalid pagination parameters: {e}", status_code=400)
+
+    stream = request.args.get("stream")
+    if stream:
+        return stream_rows("Categories retrieved successfully", inventory.iter_categories(), stream)
+    if limit:
+        categories = await executor.read(inventory.get_categories_page, limit, after)
+        next_cursor = categories[-1]["id"] if len(categories) == limit else None
+        return response(True, "Categories retrieved successfully", categories, next=next_cursor)
+    categories = await executor.read(inventory.get_all_categories)
+    return response(True, "Categories retrieved successfully", categories)
+
+
+@route("GET", r"/categories/(?P<category_name>[^/]+)")
+@conditional("categories")
+async def get_category(request: Request, category_name: str):
+    category = await executor.read(inventory.get_category, category_name)
+    if not category:
+        return response(False, "Category not found", status_code=404)
+    return response(True, "Category retrieved successfully", category)
+
+
+@route("GET", r"/cache/stats")
+async def get_cache_stats(request: Request):
+    if cache is None:
+        return response(False, "Caching is disabled", status_code=404)
+    return response(True, "Cache statistics retrieved successfully", await executor.read(cache.stats))
+
+
+def low_stock_params(args) -> dict:
+    limit = int(args.get("limit", 100))
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return {
+        "threshold": int(args["threshold"]) if "threshold" in args else None,
+        "category": args.get("category"),
+        "limit": limit,
+    }
+
+
+@route("GET", r"/changes")
+async def get_changes(request: Request):
+    try:
+        since = int(request.args.get("since", 0))
+        limit = int(request.args.get("limit", 1000))
+        if not 0 < limit <= MAX_CHANGES_PAGE:
+            raise ValueError(f"limit must be between 1 and {MAX_CHANGES_PAGE}")
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+
+    try:
+        stream = request.args.get("stream")
+        if stream:
+            trimmed = await executor.read(change_log.trimmed_seq)
+            if since < trimmed:
+                raise ChangesExpiredError(f"Changes up to seq {trimmed} have been deleted.")
+            return stream_rows("Changes retrieved successfully", change_log.iter_changes(since), stream)
+        changes = await executor.read(change_log.read, since, limit)
+        next_cursor = changes[-1]["seq"] if changes else since
+        return response(True, "Changes retrieved successfully", changes, next=next_cursor,
+                        latest=await executor.read(change_log.latest_seq))
+    except ChangesExpiredError as e:
+        return response(False, str(e), status_code=410, latest=await executor.read(change_log.latest_seq))
+
+
+@route("GET", r"/export/(?P<table>[^/]+)")
+async def export_table(request: Request, table: str):
+    if table not in EXPORTS:
+        return response(False, "Unknown export", status_code=404)
+    fmt = request.args.get("format", "ndjson")
+    try:
+        chunk_size = int(request.args.get("chunk_size", CHUNK_SIZE))
+        if fmt not in FORMATS or chunk_size < 1:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)} and chunk_size positive")
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+    return stream_chunks(export_chunks(db, table, fmt, chunk_size), FORMATS[fmt], f"{table}.{EXTENSIONS[fmt]}")
+
+
+@route("GET", r"/backup")
+async def get_backup(request: Request):
+    return stream_chunks(backup_chunks(db), "application/vnd.sqlite3", "inventory-backup.db")
+
+
+@route("GET", r"/stats")
+async def get_stats(request: Request):
+    return response(True, "Statistics retrieved successfully", await executor.read(analytics.summary))
+
+
+@route("GET", r"/stats/categories")
+async def get_category_stats(request: Request):
+    return response(True, "Statistics retrieved successfully", await executor.read(analytics.category_stats))
+
+
+@route("GET", r"/stats/categories/(?P<category_name>[^/]+)")
+async def get_category_stat(request: Request, category_name: str):
+    stats = await executor.read(analytics.category_stat, category_name)
+    if not stats:
+        return response(False, "Category not found", status_code=404)
+    return response(True, "Statistics retrieved successfully", stats)
+
+
+@route("GET", r"/stats/low-stock")
+async def get_low_stock(request: Request):
+    try:
+        params = low_stock_params(request.args)
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+    return response(True, "Low-stock products retrieved successfully", await executor.read(analytics.low_stock, **params))
+
+
+@route("PUT", r"/stats/low-stock")
+async def set_low_stock_threshold(request: Request):
+    data = request.json()
+    try:
+        threshold = int(data["threshold"])
+    except (KeyError, TypeError, ValueError):
+        return response(False, "threshold must be an integer", status_code=400)
+    await executor.write(analytics.set_low_stock_threshold, threshold)
+    return response(True, "Low-stock threshold updated successfully", await executor.read(analytics.summary))
+
+
+@route("POST", r"/products")
+async def add_product(request: Request):
+    data = request.json()
+    required_fields = {"name", "price", "quantity", "category_name", "description"}
+    if not isinstance(data, dict) or not required_fields.issubset(data.keys()):
+        return response(False, "Missing required fields", status_code=400)
+
+    def add():
+        if "id" in data and data["id"].strip():
+            product_id = data["id"]
+        else:
+            product_id = inventory.next_product_id()
+        inventory.add_product(product_id=product_id, name=data["name"], price=float(data["price"]),
+                              quantity=int(data["quantity"]), category_name=data["category_name"],
+                              description=data["description"])
+        return product_id
+
+    product_id = await executor.write(add)
+    return response(True, "Product added successfully", {"product_id": product_id}, status_code=201)
+
+
+@route("POST", r"/products/bulk")
+async def add_products_bulk(request: Request):
+    text = request.body.decode("utf-8")
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        def parse(line):
+            try:
+                return json.loads(line)
+            except ValueError:
+                return None
+        rows = (parse(line) for line in text.splitlines() if line.strip())
+    elif request.mimetype == "text/csv":
+        rows = csv.DictReader(io.StringIO(text))
+    else:
+        rows = request.json()
+        if not isinstance(rows, list):
+            return response(False, "Expected a JSON array of products", status_code=400)
+
+    chunk_size = int(request.args.get("chunk_size", 1000))
+    result = await executor.write(inventory.add_products_bulk, rows, chunk_size=max(chunk_size, 1))
+    if not result["errors"]:
+        return response(True, "Products added successfully", result, status_code=201)
+    if result["inserted"]:
+        return response(True, "Products partially added", result, status_code=207)
+    return response(False, "No products added", result, status_code=400)
+
+
+@route("PUT", r"/products/(?P<product_id>[^/]+)")
+async def update_product(request: Request, product_id: str):
+    data = request.json() or {}
+    product = await executor.read(inventory.get_product, product_id)
+    if not product:
+        return response(False, "Product not found", status_code=404)
+
+    price = float(data["price"]) if "price" in data else None
+    quantity = int(data["quantity"]) if "quantity" in data else None
+    if price is None and quantity is None:
+        return response(False, "No valid fields to update", status_code=400)
+
+    await executor.write(inventory.update_product, product_id, price=price, quantity=quantity)
+    return response(True, "Product updated successfully")
+
+
+def stock_items(data, key: str) -> dict:
+    items = {}
+    for item in (data or {}).get("items") or []:
+        items[item["product_id"]] = items.get(item["product_id"], 0) + int(item[key])
+    if not items:
+        raise ValueError("No items given")
+    return items
+
+
+def stock_error(e: Exception):
+    if isinstance(e, ProductNotFoundError):
+        return response(False, str(e), status_code=404)
+    if isinstance(e, InsufficientStockError):
+        return response(False, str(e), {"product_id": e.product_id}, status_code=409)
+    return response(False, f"Invalid request: {e}", status_code=400)
+
+
+STOCK_ERRORS = (KeyError, ValueError, TypeError, AttributeError, ProductNotFoundError, InsufficientStockError)
+
+
+@route("POST", r"/products/(?P<product_id>[^/]+)/stock")
+async def adjust_stock(request: Request, product_id: str):
+    try:
+        quantity = await executor.write(inventory.adjust_stock, product_id, int((request.json() or {})["delta"]))
+        return response(True, "Stock updated successfully", {"product_id": product_id, "quantity": quantity})
+    except STOCK_ERRORS as e:
+        return stock_error(e)
+
+
+@route("POST", r"/stock")
+async def adjust_stock_batch(request: Request):
+    try:
+        quantities = await executor.write(inventory.adjust_stock_batch, stock_items(request.json(), "delta"))
+        return response(True, "Stock updated successfully", quantities)
+    except STOCK_ERRORS as e:
+        return stock_error(e)
+
+
+@route("POST", r"/reservations")
+async def reserve_stock(request: Request):
+    try:
+        reservation_id = await executor.write(inventory.reserve_stock, stock_items(request.json(), "quantity"))
+        return response(True, "Stock reserved successfully", {"reservation_id": reservation_id}, status_code=201)
+    except STOCK_ERRORS as e:
+        return stock_error(e)
+
+
+@route("GET", r"/reservations/(?P<reservation_id>\d+)")
+async def get_reservation(request: Request, reservation_id: str):
+    reservation = await executor.read(inventory.get_reservation, int(reservation_id))
+    if not reservation:
+        return response(False, "Reservation not found", status_code=404)
+    return response(True, "Reservation retrieved successfully", reservation)
+
+
+@route("POST", r"/reservations/(?P<reservation_id>\d+)/(?P<action>commit|release)")
+async def finish_reservation(request: Request, reservation_id: str, action: str):
+    finish = inventory.commit_reservation if action == "commit" else inventory.release_reservation
+    if not await executor.write(finish, int(reservation_id)):
+        return response(False, "Reservation not found or no longer pending", status_code=409)
+    return response(True, "Reservation committed successfully" if action == "commit" else "Reservation released successfully")
+
+
+@route("DELETE", r"/products/(?P<product_id>[^/]+)")
+async def delete_product(request: Request, product_id: str):
+    product = await executor.read(inventory.get_product, product_id)
+    if not product:
+        return response(False, "Product not found", status_code=404)
+    await executor.write(inventory.remove_product, product_id)
+    return response(True, "Product deleted successfully")
+
+
+@route("DELETE", r"/categories/(?P<category_name>[^/]+)")
+async def delete_category(request: Request, category_name: str):
+    category = await executor.read(inventory.get_category, category_name)
+    if not category:
+        return response(False, "Category not found", status_code=404)
+    await executor.write(inventory.remove_category, category_name)
+    return response(True, "Category deleted successfully")
+
+
+async def dispatch(request: Request):
+    path = unquote(request.path).rstrip("/") or "/"
+    allowed = False
+    for method, pattern, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            allowed = True
+            # HEAD is answered as GET; app() drops the body.
+            if method == request.method or method == "GET" and request.method == "HEAD":
+                if db.immutable and method not in ("GET", "HEAD", "OPTIONS"):
+                    # see routes.reject_writes_when_immutable
+                    return response(False, "Service is read-only (INVENTORY_IMMUTABLE=1)", status_code=503)
+                try:
+                    return await handler(request, **match.groupdict())
+                except Exception as e:
+                    logging.error(f"Error handling {request.method} {path}: {str(e)}")
+                    return response(False, "Internal Server Error", status_code=500)
+    if allowed:
+        return response(False, "Method Not Allowed", status_code=405)
+    return response(False, "Not Found", status_code=404)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown()
+            db.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    request = Request(scope, body)
+    result = await dispatch(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        versions.invalidate()    # see routes.invalidate_validators
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if isinstance(result, StreamingResponse):
+        headers = {"content-type": result.content_type, **result.headers}
+        compressible = result.content_type in COMPRESSIBLE_TYPES
+        if compressible:
+            headers["vary"] = "Accept-Encoding"
+        compressor = Compressor(encoding) if encoding and compressible else None
+        if compressor:
+            headers["content-encoding"] = encoding
+        await send({"type": "http.response.start", "status": 200, "headers": encode_headers(headers)})
+        if request.method == "HEAD":
+            await result.chunks.aclose()
+            await send({"type": "http.response.body", "body": b""})
+            return
+        async for chunk in result.chunks:
+            await send({"type": "http.response.body", "body": compressor.compress(chunk) if compressor else chunk,
+                        "more_body": True})
+        await send({"type": "http.response.body", "body": compressor.finish() if compressor else b""})
+        return
+
+    status, payload, *extra = result
+    headers = extra[0] if extra else {}
+    if status == 304:
+        await send({"type": "http.response.start", "status": status, "headers": encode_headers(headers)})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    content = payload if isinstance(payload, bytes) else dumps(payload)
+    headers = {"content-type": "application/json", "vary": "Accept-Encoding", **headers}
+    if encoding and len(content) >= MIN_COMPRESS_SIZE:
+        content = compress(content, encoding)
+        headers["content-encoding"] = encoding
+    headers["content-length"] = str(len(content))
+    await send({"type": "http.response.start", "status": status, "headers": encode_headers(headers)})
+    await send({"type": "http.response.body", "body": b"" if request.method == "HEAD" else content})
+
+
+def encode_headers(headers: dict) -> list:
+    return [(name.lower().encode(), value.encode("latin-1")) for name, value in headers.items()]
@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from models import Database, Inventory
+
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded in-process cache; least recently used entries are evicted first and every entry expires after ttl seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str):
+        """Return the cached value, or MISSING when absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"backend": "memory", "size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_ratio": self.hits / total if total else 0.0}
+
+
+class CacheStore(Database):
+    """SQLite file holding FileCache entries; it gets the cache table instead of the inventory schema."""
+
+    def create_tables(self):
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires)")
+
+
+class FileCache:
+    """
+    Cache kept in a local SQLite file, shared by every worker process on the host.
+
+    Use this instead of LRUCache when the API runs in several processes (e.g. gunicorn
+    workers): an invalidation made by one worker is seen by all of them. Values must be
+    JSON serializable.
+    """
+
+    def __init__(self, path: str = "inventory_cache.db", maxsize: int = 100000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db = CacheStore(path, synchronous="OFF")
+        self.hits = self.misses = self.evictions = 0
+        self._writes = 0
+
+    def get(self, key: str):
+        row = self.db.fetchone("SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time()))
+        if row is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(row["value"])
+
+    def set(self, key: str, value):
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), now + self.ttl))
+            # Trim in batches, not on every write.
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+                excess = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxsize
+                if excess > 0:
+                    conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)", (excess,))
+                    self.evictions += excess
+
+    def delete(self, *keys: str):
+        with self.db.transaction() as conn:
+            conn.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        self.db.execute("DELETE FROM cache")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        size = self.db.fetchone("SELECT COUNT(*) AS count FROM cache")["count"]
+        return {"backend": "file", "size": size, "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_ratio": self.hits / total if total else 0.0}
+
+
+class CachedInventory(Inventory):
+    """
+    Inventory with a read-through cache in front of get_product and get_category.
+
+    Writes made through this class invalidate the affected keys. Writes made elsewhere
+    (another process without a shared FileCache, or raw SQL) are only picked up once the
+    cached entry expires, unless versions (an httpcache.TableVersions) is given: entries
+    are then stored with the validator of the tables they were read from and are misses
+    once that has changed, so a cached row is never older than the ETag sent with it.
+    Lookups that find nothing are not cached.
+    """
+
+    def __init__(self, db: Database, cache=None, versions=None, **kwargs):
+        super().__init__(db, **kwargs)
+        self.cache = cache if cache is not None else LRUCache()
+        self.versions = versions
+
+    def _cached(self, key: str, tables: tuple, load):
+        version = self.versions.validators(*tables)[0] if self.versions is not None else None
+        entry = self.cache.get(key)
+        if entry is MISSING or entry[0] != version:
+            value = load()
+            if value is not None:
+                self.cache.set(key, [version, value])
+        else:
+            value = entry[1]
+        return dict(value) if value is not None else None
+
+    def get_product(self, product_id: str):
+        return self._cached(f"product:{product_id}", ("products", "categories"),
+                            lambda: super(CachedInventory, self).get_product(product_id))
+
+    def get_category(self, category_name: str):
+        return self._cached(f"category:{category_name}", ("categories",),
+                            lambda: super(CachedInventory, self).get_category(category_name))
+
+    def add_category(self, category_name: str, description: str):
+        super().add_category(category_name, description)
+        self.cache.delete(f"category:{category_name}")
+
+    def add_product(self, product_id: str, name: str, price: float, category_name: str, description: str, quantity: int):
+        super().add_product(product_id, name, price, category_name, description, quantity)
+        self.cache.delete(f"product:{product_id}", f"category:{category_name}")
+
+    def add_products_bulk(self, rows, chunk_size: int = 1000) -> dict:
+        try:
+            return super().add_products_bulk(rows, chunk_size)
+        finally:
+            self.cache.clear()
+
+    def update_product(self, product_id: str, price: float = None, quantity: int = None):
+        super().update_product(product_id, price, quantity)
+        self.cache.delete(f"product:{product_id}")
+
+    def remove_product(self, product_id: str):
+        super().remove_product(product_id)
+        self.cache.delete(f"product:{product_id}")
+
+    def _products_changed(self, product_ids):
+        self.cache.delete(*(f"product:{product_id}" for product_id in product_ids))
+
+    def remove_category(self, category_name: str):
+        try:
+            return super().remove_category(category_name)
+        finally:
+            self.cache.delete(f"category:{category_name}")
+
+
+def create_cache(backend: str, **options):
+    """Build a cache from a backend name: "memory", "file" or "none"."""
+    if backend == "memory":
+        return LRUCache(**options)
+    if backend == "file":
+        return FileCache(**options)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown cache backend: {backend}")
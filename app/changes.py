@@ -0,0 +1,146 @@
+"""
+Change-data-capture feed over the ``changes`` log.
+
+Triggers append one entry per inserted, updated or deleted product or category row
+(whether written through Inventory or raw SQL). Consumers poll ``GET /changes?since=<seq>``
+with the last seq they processed and receive only the rows that changed after it: one
+delta per row, carrying the row's last operation and current state (``data`` is None
+once the row is deleted), so a consumer upserts or deletes and moves its cursor on.
+
+Two maintenance jobs keep the log small:
+
+* compaction removes entries superseded by a later entry for the same row; this never
+  changes what any consumer receives;
+* retention deletes entries older than a maximum age or beyond a maximum count and
+  records the highest removed seq. Consumers behind it get ChangesExpiredError (HTTP 410)
+  and must resync from a full listing.
+
+    python changes.py compact --db inventory.db
+    python changes.py trim --max-age 604800 --db inventory.db
+"""
+import argparse
+import logging
+import threading
+import time
+from typing import Iterator, List
+
+from models import UNIX_NOW, Database
+
+# A delta's row is the latest entry for that row after `since`.
+LATEST_CHANGES = (
+    "SELECT c.seq, c.table_name, c.row_id, c.op, c.changed_at FROM changes c WHERE c.seq > ? AND NOT EXISTS "
+    "(SELECT 1 FROM changes n WHERE n.table_name = c.table_name AND n.row_id = c.row_id AND n.seq > c.seq) "
+    "ORDER BY c.seq LIMIT ?"
+)
+ROW_QUERIES = {
+    "products": "SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p "
+                "LEFT JOIN categories c ON p.category_id = c.id WHERE p.id IN ({params})",
+    "categories": "SELECT * FROM categories WHERE id IN ({params})",
+}
+
+
+class ChangesExpiredError(LookupError):
+    """Raised when a consumer asks for changes that retention has already deleted."""
+
+
+class ChangeLog:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def latest_seq(self) -> int:
+        return self.db.fetchone("SELECT IFNULL(MAX(seq), 0) AS seq FROM changes")["seq"]
+
+    def trimmed_seq(self) -> int:
+        return self.db.fetchone("SELECT value FROM settings WHERE name = 'changes_trimmed_seq'")["value"]
+
+    def read(self, since: int = 0, limit: int = 1000) -> List[dict]:
+        """Up to limit deltas for rows changed after seq `since`, oldest first."""
+        with self.db.transaction() as conn:
+            conn.execute("BEGIN")  # entries and row states from one snapshot
+            trimmed = conn.execute("SELECT value FROM settings WHERE name = 'changes_trimmed_seq'").fetchone()[0]
+            if since < trimmed:
+                raise ChangesExpiredError(f"Changes up to seq {trimmed} have been deleted; resync and continue from a newer seq.")
+            entries = conn.execute(LATEST_CHANGES, (since, limit)).fetchall()
+            rows = {}
+            for table, query in ROW_QUERIES.items():
+                ids = [entry["row_id"] for entry in entries if entry["table_name"] == table and entry["op"] != "delete"]
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    for row in conn.execute(query.format(params=",".join("?" * len(chunk))), chunk):
+                        rows[table, row["id"]] = dict(row)
+        return [{"seq": entry["seq"], "table": entry["table_name"], "id": entry["row_id"], "op": entry["op"],
+                 "changed_at": entry["changed_at"], "data": rows.get((entry["table_name"], entry["row_id"]))}
+                for entry in entries]
+
+    def iter_changes(self, since: int = 0, batch_size: int = 500) -> Iterator[dict]:
+        """Every delta after seq `since`, read batch_size at a time."""
+        while True:
+            batch = self.read(since, batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            since = batch[-1]["seq"]
+
+    def compact(self, batch_size: int = 10000) -> int:
+        """Delete entries superseded by a later entry for the same row; returns how many."""
+        removed, start, latest = 0, 0, self.latest_seq()
+        while start < latest:
+            # Short transactions, so writers are never blocked for long.
+            with self.db.transaction() as conn:
+                removed += conn.execute(
+                    "DELETE FROM changes WHERE seq > ? AND seq <= ? AND EXISTS (SELECT 1 FROM changes n WHERE "
+                    "n.table_name = changes.table_name AND n.row_id = changes.row_id AND n.seq > changes.seq)",
+                    (start, start + batch_size)).rowcount
+            start += batch_size
+        return removed
+
+    def trim(self, max_age: float = None, max_entries: int = None) -> int:
+        """Delete entries older than max_age seconds or beyond the newest max_entries; returns how many."""
+        with self.db.transaction() as conn:
+            cutoff = 0
+            if max_age is not None:
+                cutoff = conn.execute(f"SELECT IFNULL(MAX(seq), 0) FROM changes WHERE changed_at < {UNIX_NOW} - ?",
+                                      (max_age,)).fetchone()[0]
+            if max_entries is not None:
+                row = conn.execute("SELECT seq FROM changes ORDER BY seq DESC LIMIT 1 OFFSET ?", (max_entries,)).fetchone()
+                cutoff = max(cutoff, row[0] if row else 0)
+            if not cutoff:
+                return 0
+            removed = conn.execute("DELETE FROM changes WHERE seq <= ?", (cutoff,)).rowcount
+            conn.execute("UPDATE settings SET value = MAX(value, ?) WHERE name = 'changes_trimmed_seq'", (cutoff,))
+            return removed
+
+    def start_maintenance(self, interval: float, max_age: float = None, max_entries: int = None) -> threading.Thread:
+        """Compact and trim the log every interval seconds on a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.compact()
+                    self.trim(max_age, max_entries)
+                except Exception as e:
+                    logging.error(f"Change log maintenance failed: {str(e)}")
+
+        thread = threading.Thread(target=run, name="changes-maintenance", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("compact", "trim"))
+    parser.add_argument("--db", default="inventory.db")
+    parser.add_argument("--max-age", type=float, help="trim: delete entries older than this many seconds")
+    parser.add_argument("--max-entries", type=int, help="trim: keep at most this many entries")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        log = ChangeLog(db)
+        if args.command == "compact":
+            print(f"removed {log.compact()} superseded entries")
+        else:
+            print(f"removed {log.trim(args.max_age, args.max_entries)} entries; consumers must be past seq {log.trimmed_seq()}")
+
+
+if __name__ == "__main__":
+    main()
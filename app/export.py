@@ -0,0 +1,325 @@
+"""
+Bulk export and hot backup of the catalog, in constant memory.
+
+Exports read every row of a table from one read transaction on a dedicated connection
+and encode it chunk_size rows at a time, so the output is a consistent snapshot however
+many writes land meanwhile. In WAL mode the read does not block writers, but checkpoints
+cannot pass it; the WAL grows until the export finishes.
+
+Formats:
+
+* ``csv`` -- a header line, then one line per row;
+* ``ndjson`` -- one JSON object per line;
+* ``columnar`` -- row groups of zlib-compressed column chunks, Parquet-style (see
+  ColumnarEncoder); read it back with read_columnar.
+
+Backups copy the database file with SQLite's online backup API, ``pages`` pages per
+step with a pause between steps, into a temporary file that is renamed into place when
+complete.
+
+    python export.py products --format csv --output products.csv --db inventory.db
+    python export.py categories --format ndjson
+    python export.py backup --output inventory-backup.db --pages 1024 --pause 0.005
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from typing import Iterator
+
+from httpcache import dumps
+from models import Database
+
+EXPORTS = {
+    "products": ("SELECT p.id, p.name, p.price, p.quantity, c.name AS category FROM products p "
+                 "LEFT JOIN categories c ON p.category_id = c.id",
+                 (("id", "str"), ("name", "str"), ("price", "f64"), ("quantity", "i64"), ("category", "str"))),
+    "categories": ("SELECT id, name, description FROM categories",
+                   (("id", "i64"), ("name", "str"), ("description", "str"))),
+}
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson", "columnar": "application/octet-stream"}
+EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "columnar": "col"}
+CHUNK_SIZE = 10000
+
+COLUMNAR_MAGIC = b"INVCOL1\n"
+COLUMNAR_LEVEL = 1
+
+
+class CsvEncoder:
+    def __init__(self, columns):
+        self.columns = [name for name, _ in columns]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _flush(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return self._flush()
+
+    def encode(self, rows) -> bytes:
+        self._writer.writerows(rows)
+        return self._flush()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def __init__(self, columns):
+        self.columns = [name for name, _ in columns]
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows) -> bytes:
+        columns = self.columns
+        return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class ColumnarEncoder:
+    """
+    A minimal Parquet-like layout::
+
+        magic, row group*, footer JSON, footer length (uint64 LE), magic
+
+    Each row group holds one zlib-compressed chunk per column: ``f64`` and ``i64``
+    columns are little-endian arrays; ``str`` columns are an int32 length per value (-1
+    for NULL) followed by the UTF-8 bytes. The footer lists the schema and the offset and
+    size of every column chunk, so readers can fetch only the columns they need.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._offset = 0
+        self._row_groups = []
+
+    def _write(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._write(COLUMNAR_MAGIC)
+
+    def encode(self, rows) -> bytes:
+        chunks, group = [], {"rows": len(rows), "columns": []}
+        for i, (_, kind) in enumerate(self.columns):
+            values = [row[i] for row in rows]
+            data = zlib.compress(_encode_column(kind, values), COLUMNAR_LEVEL)
+            group["columns"].append([self._offset + sum(map(len, chunks)), len(data)])
+            chunks.append(data)
+        self._row_groups.append(group)
+        return self._write(b"".join(chunks))
+
+    def footer(self) -> bytes:
+        footer = json.dumps({"version": 1, "codec": "zlib", "columns": [{"name": name, "type": kind}
+                                                                          for name, kind in self.columns],
+                             "row_groups": self._row_groups}).encode()
+        return self._write(footer + struct.pack("<Q", len(footer)) + COLUMNAR_MAGIC)
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "columnar": ColumnarEncoder}
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_column(kind: str, values: list) -> bytes:
+    if kind == "f64":
+        return _little_endian(array("d", values))
+    if kind == "i64":
+        return _little_endian(array("q", values))
+    encoded = [None if value is None else str(value).encode() for value in values]
+    lengths = array("i", (-1 if value is None else len(value) for value in encoded))
+    return _little_endian(lengths) + b"".join(value for value in encoded if value)
+
+
+def _decode_column(kind: str, data: bytes, rows: int) -> list:
+    if kind in ("f64", "i64"):
+        values = array("d" if kind == "f64" else "q")
+        values.frombytes(data)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values.tolist()
+    lengths = array("i")
+    lengths.frombytes(data[:4 * rows])
+    if sys.byteorder != "little":
+        lengths.byteswap()
+    values, position = [], 4 * rows
+    for length in lengths:
+        if length < 0:
+            values.append(None)
+        else:
+            values.append(data[position:position + length].decode())
+            position += length
+    return values
+
+
+def read_columnar(path: str, columns=None) -> Iterator[dict]:
+    """Rows of a columnar export, one row group in memory at a time; columns selects a subset."""
+    with open(path, "rb") as f:
+        f.seek(-len(COLUMNAR_MAGIC) - 8, os.SEEK_END)
+        (footer_size,) = struct.unpack("<Q", f.read(8))
+        if f.read() != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar export")
+        f.seek(-len(COLUMNAR_MAGIC) - 8 - footer_size, os.SEEK_END)
+        footer = json.loads(f.read(footer_size))
+        schema = [(i, column["name"], column["type"]) for i, column in enumerate(footer["columns"])
+                  if columns is None or column["name"] in columns]
+        for group in footer["row_groups"]:
+            decoded = {}
+            for i, name, kind in schema:
+                offset, size = group["columns"][i]
+                f.seek(offset)
+                decoded[name] = _decode_column(kind, zlib.decompress(f.read(size)), group["rows"])
+            names = list(decoded)
+            for values in zip(*decoded.values()):
+                yield dict(zip(names, values))
+
+
+def export_chunks(db: Database, table: str = "products", fmt: str = "ndjson",
+                  chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """The encoded rows of table, chunk_size rows per chunk, all read from one snapshot."""
+    query, columns = EXPORTS[table]
+    encoder = ENCODERS[fmt](columns)
+    # A connection of its own: the export may outlive many requests and must not hold a pool slot.
+    conn = db.get_connection()
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.execute(query)
+        yield encoder.header()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield encoder.encode(rows)
+        yield encoder.footer()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def export(db: Database, output, table: str = "products", fmt: str = "ndjson", chunk_size: int = CHUNK_SIZE) -> int:
+    """Write an export to a binary file object; returns the number of bytes written."""
+    written = 0
+    for chunk in export_chunks(db, table, fmt, chunk_size):
+        output.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def backup(db: Database, target: str, pages: int = 1024, pause: float = 0.005, max_restarts: int = 3,
+           progress=None) -> dict:
+    """
+    Copy the database to target with the online backup API, pages pages per step.
+
+    Writers run between steps (and, in WAL mode, during them). A write from another
+    connection restarts SQLite's incremental copy; after max_restarts restarts the rest is
+    copied in a single step, which in WAL mode reads one snapshot without blocking writers.
+    progress(remaining, total) is called after every step.
+    """
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, partial = tempfile.mkstemp(prefix=".backup-", suffix=".db", dir=directory)
+    os.close(fd)
+    stats = {"steps": 0, "restarts": 0, "pages": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    source = db.get_connection()
+    destination = sqlite3.connect(partial)
+    try:
+        last_remaining = None
+
+        def step(status, remaining, total):
+            nonlocal last_remaining
+            stats["steps"] += 1
+            stats["pages"] = total
+            if last_remaining is not None and remaining > last_remaining:
+                stats["restarts"] += 1
+                if stats["restarts"] >= max_restarts:
+                    raise _Restarted()
+            last_remaining = remaining
+            if progress is not None:
+                progress(remaining, total)
+            if remaining and pause:
+                time.sleep(pause)
+
+        try:
+            source.backup(destination, pages=pages, progress=step)
+        except _Restarted:
+            logging.info("Backup restarted %d times by concurrent writes; copying the rest in one step", max_restarts)
+            source.backup(destination, pages=-1)
+        destination.close()
+        os.replace(partial, target)
+    except BaseException:
+        destination.close()
+        os.unlink(partial)
+        raise
+    finally:
+        source.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+class _Restarted(Exception):
+    pass
+
+
+def backup_chunks(db: Database, chunk_size: int = 1 << 20, **options) -> Iterator[bytes]:
+    """A hot backup streamed as file chunks; the temporary copy is deleted afterwards."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "backup.db")
+        backup(db, path, **options)
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("what", choices=(*EXPORTS, "backup"))
+    parser.add_argument("--db", default="inventory.db")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--output", default="-", help="file to write, - for stdout (exports only)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows encoded per chunk")
+    parser.add_argument("--pages", type=int, default=1024, help="backup: pages copied per step")
+    parser.add_argument("--pause", type=float, default=0.005, help="backup: seconds to yield to writers between steps")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        if args.what == "backup":
+            if args.output == "-":
+                parser.error("backup needs --output")
+            stats = backup(db, args.output, pages=args.pages, pause=args.pause)
+            print(f"backed up {stats['pages']} pages in {stats['steps']} steps ({stats['restarts']} restarts) "
+                  f"in {stats['seconds']:.2f}s", file=sys.stderr)
+        elif args.output == "-":
+            export(db, sys.stdout.buffer, args.what, args.format, args.chunk_size)
+        else:
+            with open(args.output, "wb") as f:
+                written = export(db, f, args.what, args.format, args.chunk_size)
+            print(f"wrote {written} bytes to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""gunicorn settings for serving routes:app in production (see serve.py)."""
+import multiprocessing
+import os
+
+bind = os.environ.get("INVENTORY_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("INVENTORY_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+# A per-process memory cache would keep serving rows other workers have changed, so several
+# workers share the file cache unless INVENTORY_CACHE says otherwise.
+if workers > 1:
+    os.environ.setdefault("INVENTORY_CACHE", "file")
+threads = int(os.environ.get("INVENTORY_THREADS", 8))
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+accesslog = None
+errorlog = "-"
@@ -0,0 +1,161 @@
+"""
+HTTP validators and response encoding shared by the Flask (routes.py) and ASGI (asgi.py) apps.
+
+* Validators: every logged write bumps its table's row in ``table_versions`` (migration 8)
+  to the write's change seq. A response built from products and categories is labelled
+  with the versions of both, as a weak ETag and a Last-Modified date. A request whose
+  If-None-Match or If-Modified-Since still matches is answered with 304 before any product
+  or category row is read.
+* Encoding: bodies of at least MIN_COMPRESS_SIZE bytes and streams are compressed with
+  zstd (when the optional ``zstandard`` package is installed) or gzip, whichever the
+  client's Accept-Encoding prefers.
+* ``dumps`` serializes response envelopes with ``orjson`` when it is installed, falling
+  back to the standard library.
+"""
+import json
+import threading
+import time
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from models import Database
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_COMPRESS_SIZE = 1024
+# Other content types (columnar exports, backups) are already compressed or binary.
+COMPRESSIBLE_TYPES = frozenset(("application/json", "application/x-ndjson", "text/csv", "text/plain"))
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+# Streams are flushed to the client after roughly this many uncompressed bytes.
+STREAM_FLUSH_SIZE = 64 * 1024
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes for a response body."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class TableVersions:
+    """
+    Current version and modification time of each table, read from ``table_versions``.
+
+    With max_staleness > 0 the versions are reused in-process for that many seconds, so
+    conditional requests in that window are answered without any database access, at the
+    price of a 304 for up to max_staleness seconds after a change made by another process.
+    Call invalidate() after this process writes so its own changes are seen at once.
+    """
+
+    def __init__(self, db: Database, max_staleness: float = 0.0):
+        self.db = db
+        self.max_staleness = max_staleness
+        self._versions = {}
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self) -> dict:
+        """{table: (version, modified_at)} for every versioned table."""
+        with self._lock:
+            if time.monotonic() - self._loaded_at >= self.max_staleness:
+                self._versions = {row["table_name"]: (row["version"], row["modified_at"])
+                                  for row in self.db.fetchall("SELECT * FROM table_versions", read_only=True)}
+                self._loaded_at = time.monotonic()
+            return self._versions
+
+    def invalidate(self):
+        """Reload the versions on the next call, e.g. after this process has written."""
+        with self._lock:
+            self._loaded_at = float("-inf")
+
+    def validators(self, *tables: str) -> tuple:
+        """(ETag, Last-Modified timestamp) of a representation built from the given tables."""
+        versions = self.current()
+        etag = 'W/"%s"' % ".".join(str(versions[table][0]) for table in tables)
+        return etag, max(versions[table][1] for table in tables)
+
+
+def validator_headers(etag: str, last_modified: float) -> dict:
+    return {"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True), "Cache-Control": "no-cache"}
+
+
+def not_modified(if_none_match: str, if_modified_since: str, etag: str, last_modified: float) -> bool:
+    """Whether the request's If-None-Match (or, without it, If-Modified-Since) matches the current validators."""
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"1.2" and "1.2" name the same version.
+        current = etag[2:] if etag.startswith("W/") else etag
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+    if if_modified_since is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def negotiate(accept_encoding: str):
+    """The preferred supported content coding in an Accept-Encoding header: "zstd", "gzip" or None."""
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    supported = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+    best = max(supported, key=lambda coding: weights.get(coding, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else None
+
+
+class Compressor:
+    """Incremental compressor that flushes every STREAM_FLUSH_SIZE input bytes, so streamed rows keep flowing."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._sync = zlib.Z_SYNC_FLUSH
+        self._pending = 0
+
+    def compress(self, chunk: bytes) -> bytes:
+        data = self._obj.compress(chunk)
+        self._pending += len(chunk)
+        if self._pending < STREAM_FLUSH_SIZE:
+            return data
+        self._pending = 0
+        return data + self._obj.flush(self._sync)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, GZIP_LEVEL, wbits=31)
+
+
+def compress_chunks(chunks, encoding: str):
+    """Compress an iterable of str or bytes chunks into a single encoded stream."""
+    compressor = Compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.finish()
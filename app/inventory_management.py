@@ -1,35 +1,117 @@
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
 from models import Inventory, Database
 
+PAGE_SIZE = 200
+SEARCH_DELAY_MS = 300
+POLL_INTERVAL_MS = 20
+
+
+class DbWorker:
+    """
+    Runs database calls on a small thread pool so the Tk main loop never waits on SQLite.
+
+    Results are handed back through a queue that the main thread polls with root.after,
+    so on_success/on_error callbacks always run on the Tk thread and may touch widgets.
+    """
+
+    def __init__(self, root, workers: int = 2):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gui-db")
+        self.results = queue.SimpleQueue()
+        self.closed = False
+        self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def submit(self, fn, *args, on_success=None, on_error=None):
+        """Run fn(*args) on the pool; on_success(result) or on_error(exception) follows on the Tk thread."""
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda done: self.results.put((done, on_success, on_error)))
+        return future
+
+    def poll(self):
+        while True:
+            try:
+                future, on_success, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is None:
+                if on_success is not None:
+                    on_success(future.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                messagebox.showerror("Error", f"An error occurred: {str(error)}")
+        if not self.closed:
+            self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def close(self):
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProductQuery:
+    """
+    Successive pages of the product table: keyset pages of the whole catalog ordered by id,
+    or offset pages of a name search. Runs on the DbWorker, one page at a time.
+    """
+
+    def __init__(self, inventory: Inventory, text: str = "", page_size: int = PAGE_SIZE):
+        self.inventory = inventory
+        self.text = text.strip()
+        self.page_size = page_size
+        self.loaded = 0
+        self.after = None
+        self.exhausted = False
+
+    def next_page(self) -> list:
+        if self.exhausted:
+            return []
+        if self.text:
+            products = self.inventory.search_products(self.text, limit=self.page_size, offset=self.loaded,
+                                                      facets=False, rank=False)["items"]
+        else:
+            products = self.inventory.get_products_page(self.page_size, self.after)
+        self.loaded += len(products)
+        self.after = products[-1]["id"] if products else self.after
+        self.exhausted = len(products) < self.page_size
+        return products
+
+
 class InventoryGUI:
     def __init__(self, root, inventory: Inventory):
         self.inventory = inventory
         self.root = root
         self.root.title("Inventory Management")
         self.root.geometry("500x500")
-        
+        self.worker = DbWorker(root)
+
         self.create_main_menu()
 
     def create_main_menu(self):
         """Creates the main menu with navigation buttons."""
         tk.Label(self.root, text="Inventory Management System", font=("Arial", 16, "bold")).pack(pady=10)
-        
+
         tk.Button(self.root, text="Manage Categories", font=("Arial", 12), command=self.open_category_form).pack(pady=5)
         tk.Button(self.root, text="Manage Products", font=("Arial", 12), command=self.open_product_form).pack(pady=5)
         tk.Button(self.root, text="Exit", font=("Arial", 12), command=self.root.quit).pack(pady=10)
 
     def open_category_form(self):
         """Opens the category management form."""
-        CategoryForm(self.root, self.inventory)
-    
+        CategoryForm(self.root, self.inventory, self.worker)
+
     def open_product_form(self):
         """Opens the product management form."""
-        ProductForm(self.root, self.inventory)
+        ProductForm(self.root, self.inventory, self.worker)
 
 class CategoryForm:
-    def __init__(self, root, inventory: Inventory):
+    def __init__(self, root, inventory: Inventory, worker: DbWorker):
         self.inventory = inventory
+        self.worker = worker
         self.window = tk.Toplevel(root)
         self.window.title("Manage Categories")
         self.window.geometry("400x300")
@@ -37,125 +119,204 @@ class CategoryForm:
         tk.Label(self.window, text="Category Name", font=("Arial", 12)).pack()
         self.category_name = tk.Entry(self.window, font=("Arial", 12))
         self.category_name.pack(pady=5)
-        
+
         tk.Label(self.window, text="Description", font=("Arial", 12)).pack()
         self.category_desc = tk.Entry(self.window, font=("Arial", 12))
         self.category_desc.pack(pady=5)
-        
+
         tk.Button(self.window, text="Add Category", command=self.add_category).pack(pady=5)
         tk.Button(self.window, text="View Categories", command=self.list_categories).pack(pady=5)
-    
+
     def add_category(self):
-        try:
-            name = self.category_name.get().strip()
-            desc = self.category_desc.get().strip()
+        name = self.category_name.get().strip()
+        desc = self.category_desc.get().strip()
 
-            if not name:
-                messagebox.showerror("Input Error", "Category Name is required!")
-                return
+        if not name:
+            messagebox.showerror("Input Error", "Category Name is required!")
+            return
 
-            self.inventory.add_category(name, desc)
-            messagebox.showinfo("Success", "Category added successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.worker.submit(self.inventory.add_category, name, desc,
+                           on_success=lambda _: messagebox.showinfo("Success", "Category added successfully!"))
 
     def list_categories(self):
-        try:
-            categories = self.inventory.db.fetchall("SELECT id, name FROM categories")
-            if not categories:
-                messagebox.showinfo("Categories", "No categories available.")
-                return
-            
-            category_list = "\n".join([f"{cat['id']} - {cat['name']}" for cat in categories])
-            messagebox.showinfo("Categories", category_list)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to retrieve categories: {str(e)}")
+        CategoryTable(self.window, self.inventory, self.worker)
+
+class CategoryTable:
+    """All categories in a table, loaded in the background."""
+
+    def __init__(self, root, inventory: Inventory, worker: DbWorker):
+        self.window = tk.Toplevel(root)
+        self.window.title("Categories")
+        self.window.geometry("400x400")
+
+        self.tree = ttk.Treeview(self.window, columns=("id", "name", "description"), show="headings")
+        for column, width in (("id", 50), ("name", 140), ("description", 200)):
+            self.tree.heading(column, text=column.title())
+            self.tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(self.window, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+
+        worker.submit(inventory.get_all_categories, on_success=self.show,
+                      on_error=lambda e: messagebox.showerror("Error", f"Failed to retrieve categories: {str(e)}"))
+
+    def show(self, categories: list):
+        if not self.window.winfo_exists():
+            return
+        for category in categories:
+            self.tree.insert("", "end", values=(category["id"], category["name"], category["description"] or ""))
 
 class ProductForm:
-    def __init__(self, root, inventory: Inventory):
+    def __init__(self, root, inventory: Inventory, worker: DbWorker):
         self.inventory = inventory
+        self.worker = worker
         self.window = tk.Toplevel(root)
         self.window.title("Manage Products")
         self.window.geometry("400x400")
-        
+
         tk.Label(self.window, text="Product Name", font=("Arial", 12)).pack()
         self.product_name = tk.Entry(self.window, font=("Arial", 12))
         self.product_name.pack(pady=5)
-        
+
         tk.Label(self.window, text="Price", font=("Arial", 12)).pack()
         self.price = tk.Entry(self.window, font=("Arial", 12))
         self.price.pack(pady=5)
-        
+
         tk.Label(self.window, text="Quantity", font=("Arial", 12)).pack()
         self.quantity = tk.Entry(self.window, font=("Arial", 12))
         self.quantity.pack(pady=5)
-        
+
         tk.Label(self.window, text="Category", font=("Arial", 12)).pack()
         self.category_dropdown = ttk.Combobox(self.window, font=("Arial", 12))
         self.category_dropdown.pack(pady=5)
         self.load_categories()
-        
+
         tk.Button(self.window, text="Add Product", command=self.add_product).pack(pady=5)
         tk.Button(self.window, text="View Products", command=self.list_products).pack(pady=5)
 
     def load_categories(self):
-        try:
-            categories = self.inventory.db.fetchall("SELECT name FROM categories")
-            self.category_dropdown['values'] = [cat['name'] for cat in categories]
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load categories: {str(e)}")
+        """Fill the dropdown once the names arrive; the form is usable meanwhile."""
+        def show(names):
+            if self.window.winfo_exists():
+                self.category_dropdown['values'] = names
+
+        self.worker.submit(lambda: [cat['name'] for cat in self.inventory.db.fetchall("SELECT name FROM categories")],
+                           on_success=show,
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to load categories: {str(e)}"))
 
     def add_product(self):
+        name = self.product_name.get().strip()
+        price_input = self.price.get().strip()
+        quantity_input = self.quantity.get().strip()
+        category_name = self.category_dropdown.get().strip()
+
+        if not name or not price_input or not quantity_input or not category_name:
+            messagebox.showerror("Input Error", "All fields are required!")
+            return
+
         try:
-            name = self.product_name.get().strip()
-            price_input = self.price.get().strip()
-            quantity_input = self.quantity.get().strip()
-            category_name = self.category_dropdown.get().strip()
-
-            if not name or not price_input or not quantity_input or not category_name:
-                messagebox.showerror("Input Error", "All fields are required!")
-                return
-            
-            try:
-                price = float(price_input)
-                quantity = int(quantity_input)
-            except ValueError:
-                messagebox.showerror("Input Error", "Price must be a number and Quantity must be an integer!")
-                return
-
-            category_desc = ""
-
-            last_product = self.inventory.db.fetchone("SELECT id FROM products ORDER BY CAST(SUBSTR(id, 2) AS INTEGER) DESC LIMIT 1")
-            if last_product and last_product["id"]:
-                try:
-                    last_number = int(last_product["id"][1:])
-                except ValueError:
-                    last_number = 100000  
-            else:
-                last_number = 100000  
+            price = float(price_input)
+            quantity = int(quantity_input)
+        except ValueError:
+            messagebox.showerror("Input Error", "Price must be a number and Quantity must be an integer!")
+            return
 
-            product_id = f"P{last_number + 1:06d}"
+        category_desc = ""
 
+        def add():
+            product_id = self.inventory.next_product_id()
             self.inventory.add_product(product_id, name, price, category_name, category_desc, quantity)
-            messagebox.showinfo("Success", "Product added successfully!")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
-    
+        self.worker.submit(add, on_success=lambda _: messagebox.showinfo("Success", "Product added successfully!"),
+                           on_error=lambda e: messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}"))
+
     def list_products(self):
-        try:
-            products = self.inventory.get_all_products()
-            if not products:
-                messagebox.showinfo("Products", "No products available.")
-                return
-
-            product_list = "\n".join(
-                f"ID: {p['id']} | Name: {p['name']} | Price: {p['price']}₹ | Qty: {p['quantity']}"
-                for p in products
-            )
-            messagebox.showinfo("Products", product_list)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to retrieve products: {str(e)}")
+        ProductTable(self.window, self.inventory, self.worker)
+
+class ProductTable:
+    """
+    Product table that loads PAGE_SIZE rows at a time as the user scrolls towards the end,
+    with a search box that re-queries SEARCH_DELAY_MS after the user stops typing.
+    """
+
+    def __init__(self, root, inventory: Inventory, worker: DbWorker):
+        self.inventory = inventory
+        self.worker = worker
+        self.window = tk.Toplevel(root)
+        self.window.title("Products")
+        self.window.geometry("700x500")
+
+        search_bar = tk.Frame(self.window)
+        search_bar.pack(fill="x", padx=5, pady=5)
+        tk.Label(search_bar, text="Search", font=("Arial", 12)).pack(side="left")
+        self.search_text = tk.StringVar()
+        tk.Entry(search_bar, textvariable=self.search_text, font=("Arial", 12)).pack(side="left", fill="x", expand=True, padx=5)
+        self.status = tk.Label(self.window, anchor="w")
+        self.status.pack(side="bottom", fill="x", padx=5)
+
+        columns = (("id", 90), ("name", 250), ("price", 80), ("quantity", 80), ("category", 150))
+        self.tree = ttk.Treeview(self.window, columns=[column for column, _ in columns], show="headings")
+        for column, width in columns:
+            self.tree.heading(column, text=column.title())
+            self.tree.column(column, width=width, anchor="e" if column in ("price", "quantity") else "w")
+        self.scrollbar = ttk.Scrollbar(self.window, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+
+        self.query = None
+        self.loading = False
+        self.pending_search = None
+        self.search_text.trace_add("write", lambda *_: self.schedule_search())
+        self.start_query("")
+
+    def schedule_search(self):
+        """Debounce: only the last keystroke within SEARCH_DELAY_MS starts a query."""
+        if self.pending_search is not None:
+            self.window.after_cancel(self.pending_search)
+        self.pending_search = self.window.after(SEARCH_DELAY_MS, lambda: self.start_query(self.search_text.get()))
+
+    def start_query(self, text: str):
+        self.pending_search = None
+        self.query = ProductQuery(self.inventory, text)
+        self.loading = False
+        self.tree.delete(*self.tree.get_children())
+        self.load_more()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) > 0.9:
+            self.load_more()
+
+    def load_more(self):
+        if self.loading or self.query.exhausted:
+            return
+        self.loading = True
+        self.status.config(text=f"Loading... ({self.query.loaded} products shown)")
+        query = self.query
+        self.worker.submit(query.next_page, on_success=lambda products: self.show(query, products),
+                           on_error=lambda e: self.failed(query, e))
+
+    def show(self, query: ProductQuery, products: list):
+        # Pages of a query the user has since replaced are dropped.
+        if query is not self.query or not self.window.winfo_exists():
+            return
+        self.loading = False
+        for p in products:
+            self.tree.insert("", "end", values=(p["id"], p["name"], f"{p['price']:.2f}₹", p["quantity"], p["category"] or ""))
+        if query.exhausted:
+            self.status.config(text=f"{query.loaded} products")
+        else:
+            self.status.config(text=f"{query.loaded} products shown, scroll for more")
+            # A first page that does not fill the view triggers no scroll event; keep loading.
+            if float(self.tree.yview()[1]) > 0.9:
+                self.load_more()
+
+    def failed(self, query: ProductQuery, error: Exception):
+        if query is self.query:
+            self.loading = False
+            messagebox.showerror("Error", f"Failed to retrieve products: {str(error)}")
 
 if __name__ == "__main__":
     try:
@@ -164,5 +325,7 @@ if __name__ == "__main__":
         root = tk.Tk()
         app = InventoryGUI(root, inventory)
         root.mainloop()
+        app.worker.close()
+        db.close()
     except Exception as e:
         messagebox.showerror("Fatal Error", f"Application failed to start: {str(e)}")
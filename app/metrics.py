@@ -0,0 +1,184 @@
+"""
+Performance instrumentation: per-query and per-transaction timings for Database, per-route
+latency for the Flask app, a slow-query log and a Prometheus text exposition of both.
+
+Nothing here runs unless it is installed: Database only times queries while
+``db.query_observer`` is set, and the Flask hooks exist only after ``init_app``.
+"""
+import bisect
+import functools
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) of the route latency histogram buckets.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """Normalize a SQL statement so queries differing only in literals are grouped together."""
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _VALUE_LIST.sub("(?+)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class Summary:
+    """Count, sum and quantiles over a bounded reservoir of the most recent observations."""
+
+    def __init__(self, reservoir_size: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class QueryTimer:
+    """Database.query_observer that aggregates timings per SQL fingerprint and logs slow queries."""
+
+    def __init__(self, slow_query_threshold: float = 0.1, logger: logging.Logger = None):
+        self.slow_query_threshold = slow_query_threshold
+        self.logger = logger or logging.getLogger("inventory.slow_queries")
+        self.queries = {}
+        self.rows = {}
+        self._lock = threading.Lock()
+
+    def install(self, db):
+        db.query_observer = self
+        return self
+
+    @staticmethod
+    def uninstall(db):
+        db.query_observer = None
+
+    def __call__(self, query: str, seconds: float, rows: int):
+        key = fingerprint(query)
+        with self._lock:
+            summary = self.queries.get(key)
+            if summary is None:
+                summary = self.queries[key] = Summary()
+                self.rows[key] = 0
+            summary.observe(seconds)
+            self.rows[key] += rows
+        if seconds >= self.slow_query_threshold:
+            self.logger.warning(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows): {key}")
+
+    def stats(self) -> list:
+        with self._lock:
+            return [{"query": key, "count": s.count, "total": s.total, "p50": s.quantile(0.5),
+                     "p99": s.quantile(0.99), "rows": self.rows[key]} for key, s in self.queries.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+class RouteMetrics:
+    """Latency histograms per (method, route, status) recorded by Flask request hooks."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        with self._lock:
+            histogram = self.routes.get(key)
+            if histogram is None:
+                histogram = self.routes[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(query_timer: QueryTimer = None, route_metrics: RouteMetrics = None) -> str:
+    """Prometheus text exposition format (version 0.0.4) of the collected metrics."""
+    lines = []
+    if query_timer is not None:
+        stats = query_timer.stats()
+        lines += ["# HELP inventory_query_duration_seconds Time spent executing SQL statements.",
+                  "# TYPE inventory_query_duration_seconds summary"]
+        for s in stats:
+            query = _label(s["query"])
+            lines.append(f'inventory_query_duration_seconds{{query="{query}",quantile="0.5"}} {s["p50"]:.9f}')
+            lines.append(f'inventory_query_duration_seconds{{query="{query}",quantile="0.99"}} {s["p99"]:.9f}')
+            lines.append(f'inventory_query_duration_seconds_sum{{query="{query}"}} {s["total"]:.9f}')
+            lines.append(f'inventory_query_duration_seconds_count{{query="{query}"}} {s["count"]}')
+        lines += ["# HELP inventory_query_rows_total Rows returned by SQL statements.",
+                  "# TYPE inventory_query_rows_total counter"]
+        lines += [f'inventory_query_rows_total{{query="{_label(s["query"])}"}} {s["rows"]}' for s in stats]
+
+    if route_metrics is not None:
+        lines += ["# HELP inventory_http_request_duration_seconds HTTP request latency by route.",
+                  "# TYPE inventory_http_request_duration_seconds histogram"]
+        with route_metrics._lock:
+            routes = sorted(route_metrics.routes.items(), key=lambda item: tuple(map(str, item[0])))
+            for (method, route, status), h in routes:
+                labels = f'method="{_label(method)}",route="{_label(route)}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'inventory_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'inventory_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"inventory_http_request_duration_seconds_sum{{{labels}}} {h.total:.9f}")
+                lines.append(f"inventory_http_request_duration_seconds_count{{{labels}}} {h.count}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, db, slow_query_threshold: float = 0.1):
+    """Instrument a Flask app and its Database, and serve the results at GET /metrics."""
+    from flask import Response, g, request
+
+    query_timer = QueryTimer(slow_query_threshold).install(db)
+    route_metrics = RouteMetrics()
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_latency(resp):
+        start = getattr(g, "metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            route_metrics.observe(request.method, route, resp.status_code, time.perf_counter() - start)
+        return resp
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics"""
+        return Response(render_prometheus(query_timer, route_metrics), mimetype="text/plain; version=0.0.4")
+
+    return query_timer, route_metrics
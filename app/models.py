@@ -1,55 +1,728 @@
+import os
+import re
 import sqlite3
-from typing import List
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from queue import Empty, LifoQueue, Queue
+from typing import Iterable, Iterator, List
+from urllib.parse import quote
+
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections shared between threads."""
+
+    def __init__(self, factory, max_size: int = 8, timeout: float = 30.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Borrow an idle connection, opening a new one while under max_size."""
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed.")
+            if len(self._connections) < self.max_size:
+                conn = self.factory()
+                self._connections.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s.")
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding any unfinished transaction."""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection; busy ones are closed when released."""
+        with self._lock:
+            self._closed = True
+            self._connections = []
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+# Adds (sign="") or subtracts (sign="-") one product row to its category's totals; products
+# without a category are counted under category_id 0.
+CATEGORY_STATS_UPSERT = (
+    "INSERT INTO category_stats (category_id, product_count, total_quantity, stock_value, out_of_stock, low_stock) "
+    "VALUES (IFNULL({row}.category_id, 0), {sign}1, {sign}{row}.quantity, {sign}({row}.price * {row}.quantity), "
+    "{sign}({row}.quantity <= 0), "
+    "{sign}({row}.quantity <= (SELECT value FROM settings WHERE name = 'low_stock_threshold'))) "
+    "ON CONFLICT (category_id) DO UPDATE SET product_count = product_count + excluded.product_count, "
+    "total_quantity = total_quantity + excluded.total_quantity, stock_value = stock_value + excluded.stock_value, "
+    "out_of_stock = out_of_stock + excluded.out_of_stock, low_stock = low_stock + excluded.low_stock;"
+)
+
+# Recomputes category_stats from scratch (used by migration 5 and Analytics.rebuild).
+CATEGORY_STATS_TOTALS = (
+    "SELECT {key} AS category_id, COUNT(p.id) AS product_count, IFNULL(SUM(p.quantity), 0) AS total_quantity, "
+    "TOTAL(p.price * p.quantity) AS stock_value, COUNT(CASE WHEN p.quantity <= 0 THEN 1 END) AS out_of_stock, "
+    "COUNT(CASE WHEN p.quantity <= (SELECT value FROM settings WHERE name = 'low_stock_threshold') THEN 1 END) AS low_stock "
+)
+CATEGORY_STATS_SOURCE = (
+    CATEGORY_STATS_TOTALS.format(key="c.id") + "FROM categories c LEFT JOIN products p ON p.category_id = c.id GROUP BY c.id "
+    "UNION ALL " + CATEGORY_STATS_TOTALS.format(key="0") + "FROM products p WHERE p.category_id IS NULL HAVING COUNT(*) > 0"
+)
+CATEGORY_STATS_REBUILD = [
+    "DELETE FROM category_stats",
+    "INSERT INTO category_stats (category_id, product_count, total_quantity, stock_value, out_of_stock, low_stock) "
+    + CATEGORY_STATS_SOURCE,
+]
+
+# Current Unix time in seconds (with milliseconds) as an SQL expression.
+UNIX_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# While a bulk import's transaction holds this settings row, the per-row insert triggers stand
+# down and BULK_INSERT_UPKEEP brings the derived tables up to date once per chunk instead. The
+# row is added and removed inside that transaction, so no other connection ever sees it.
+BULK_INSERT_GATE = "WHEN NOT EXISTS (SELECT 1 FROM settings WHERE name = 'bulk_insert')"
+
+# Run after a bulk insert with the highest products rowid from before it; new rows have larger rowids.
+BULK_INSERT_UPKEEP = [
+    "INSERT INTO products_fts (rowid, name) SELECT rowid, name FROM products WHERE rowid > ?",
+    "INSERT INTO category_stats (category_id, product_count, total_quantity, stock_value, out_of_stock, low_stock) "
+    "SELECT IFNULL(category_id, 0), COUNT(*), SUM(quantity), TOTAL(price * quantity), SUM(quantity <= 0), "
+    "SUM(quantity <= (SELECT value FROM settings WHERE name = 'low_stock_threshold')) "
+    "FROM products WHERE rowid > ? GROUP BY IFNULL(category_id, 0) "
+    "ON CONFLICT (category_id) DO UPDATE SET product_count = product_count + excluded.product_count, "
+    "total_quantity = total_quantity + excluded.total_quantity, stock_value = stock_value + excluded.stock_value, "
+    "out_of_stock = out_of_stock + excluded.out_of_stock, low_stock = low_stock + excluded.low_stock",
+    f"INSERT INTO changes (table_name, row_id, op, changed_at) "
+    f"SELECT 'products', id, 'insert', {UNIX_NOW} FROM products WHERE rowid > ? ORDER BY rowid",
+    "UPDATE table_versions SET (version, modified_at) = (SELECT seq, changed_at FROM changes ORDER BY seq DESC LIMIT 1) "
+    "WHERE table_name = 'products'",
+]
+
+# Schema migrations, applied in order. The number of applied migrations is stored in
+# PRAGMA user_version, so append new entries and never edit or reorder existing ones.
+MIGRATIONS = [
+    # 1: base schema (IF NOT EXISTS so databases created before versioning are adopted as-is)
+    [
+        "CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, description TEXT)",
+        "CREATE TABLE IF NOT EXISTS products (id TEXT PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL, quantity INTEGER NOT NULL, category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE)",
+        "CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    ],
+    # 2: indexes for category lookups, the foreign key cascade and name/price/quantity filters
+    [
+        "CREATE INDEX IF NOT EXISTS idx_products_category_id ON products (category_id)",
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)",
+        "CREATE INDEX IF NOT EXISTS idx_products_price ON products (price)",
+        "CREATE INDEX IF NOT EXISTS idx_products_quantity ON products (quantity)",
+    ],
+    # 3: stock reservations held by in-flight orders
+    [
+        "CREATE TABLE IF NOT EXISTS reservations (id INTEGER PRIMARY KEY AUTOINCREMENT, status TEXT NOT NULL DEFAULT 'reserved', created_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS reservation_items (reservation_id INTEGER NOT NULL, product_id TEXT NOT NULL, quantity INTEGER NOT NULL, PRIMARY KEY (reservation_id, product_id), FOREIGN KEY (reservation_id) REFERENCES reservations (id) ON DELETE CASCADE)",
+        "CREATE INDEX IF NOT EXISTS idx_reservations_status ON reservations (status, created_at)",
+    ],
+    # 4: full-text index on product names, kept in sync by triggers, and category/price indexes for search filters
+    [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, content='products', content_rowid='rowid', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts (rowid, name) VALUES (new.rowid, new.name); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.rowid, old.name); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name ON products BEGIN "
+        "INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.rowid, old.name); "
+        "INSERT INTO products_fts (rowid, name) VALUES (new.rowid, new.name); END",
+        "INSERT INTO products_fts (products_fts) VALUES ('rebuild')",
+        "CREATE INDEX IF NOT EXISTS idx_products_category_price ON products (category_id, price)",
+        # (price, category_id) covers price-range facet counts; it supersedes idx_products_price.
+        "CREATE INDEX IF NOT EXISTS idx_products_price_category ON products (price, category_id)",
+        "DROP INDEX IF EXISTS idx_products_price",
+    ],
+    # 5: per-category totals for the analytics endpoints, kept current by triggers
+    [
+        "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value)",
+        "INSERT OR IGNORE INTO settings (name, value) VALUES ('low_stock_threshold', 5)",
+        "CREATE TABLE IF NOT EXISTS category_stats (category_id INTEGER PRIMARY KEY, "
+        "product_count INTEGER NOT NULL DEFAULT 0, total_quantity INTEGER NOT NULL DEFAULT 0, "
+        "stock_value REAL NOT NULL DEFAULT 0, out_of_stock INTEGER NOT NULL DEFAULT 0, low_stock INTEGER NOT NULL DEFAULT 0)",
+        "CREATE TRIGGER IF NOT EXISTS category_stats_category_insert AFTER INSERT ON categories BEGIN "
+        "INSERT OR IGNORE INTO category_stats (category_id) VALUES (new.id); END",
+        "CREATE TRIGGER IF NOT EXISTS category_stats_category_delete AFTER DELETE ON categories BEGIN "
+        "DELETE FROM category_stats WHERE category_id = old.id; END",
+        "CREATE TRIGGER IF NOT EXISTS category_stats_product_insert AFTER INSERT ON products BEGIN "
+        + CATEGORY_STATS_UPSERT.format(row="new", sign="") + " END",
+        "CREATE TRIGGER IF NOT EXISTS category_stats_product_delete AFTER DELETE ON products BEGIN "
+        + CATEGORY_STATS_UPSERT.format(row="old", sign="-") + " END",
+        "CREATE TRIGGER IF NOT EXISTS category_stats_product_update AFTER UPDATE OF price, quantity, category_id ON products BEGIN "
+        + CATEGORY_STATS_UPSERT.format(row="old", sign="-") + " "
+        + CATEGORY_STATS_UPSERT.format(row="new", sign="") + " END",
+        *CATEGORY_STATS_REBUILD,
+        # (quantity, id) serves the low-stock listing in order without a sort; it supersedes idx_products_quantity.
+        "CREATE INDEX IF NOT EXISTS idx_products_quantity_id ON products (quantity, id)",
+        "DROP INDEX IF EXISTS idx_products_quantity",
+    ],
+    # 6: append-only log of changed product and category rows, written by triggers so raw SQL is captured too
+    [
+        "CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, row_id NOT NULL, op TEXT NOT NULL)",
+        *(statement.format(table=table)
+          for table in ("products", "categories")
+          for statement in (
+              "CREATE TRIGGER IF NOT EXISTS {table}_changes_insert AFTER INSERT ON {table} BEGIN "
+              "INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', new.id, 'insert'); END",
+              "CREATE TRIGGER IF NOT EXISTS {table}_changes_update AFTER UPDATE ON {table} BEGIN "
+              "INSERT INTO changes (table_name, row_id, op) SELECT '{table}', old.id, 'delete' WHERE old.id IS NOT new.id; "
+              "INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', new.id, 'update'); END",
+              "CREATE TRIGGER IF NOT EXISTS {table}_changes_delete AFTER DELETE ON {table} BEGIN "
+              "INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', old.id, 'delete'); END",
+          )),
+    ],
+    # 7: timestamps and a per-row index on the change log for the /changes feed, compaction and retention
+    [
+        "ALTER TABLE changes ADD COLUMN changed_at REAL",
+        f"UPDATE changes SET changed_at = {UNIX_NOW}",
+        "CREATE INDEX IF NOT EXISTS idx_changes_row ON changes (table_name, row_id, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_changes_changed_at ON changes (changed_at)",
+        # Entries up to this seq may have been deleted by retention; readers behind it must resync.
+        "INSERT OR IGNORE INTO settings (name, value) VALUES ('changes_trimmed_seq', 0)",
+        *(statement.format(table=table, now=UNIX_NOW)
+          for table in ("products", "categories")
+          for statement in (
+              "DROP TRIGGER IF EXISTS {table}_changes_insert",
+              "DROP TRIGGER IF EXISTS {table}_changes_update",
+              "DROP TRIGGER IF EXISTS {table}_changes_delete",
+              "CREATE TRIGGER {table}_changes_insert AFTER INSERT ON {table} BEGIN "
+              "INSERT INTO changes (table_name, row_id, op, changed_at) VALUES ('{table}', new.id, 'insert', {now}); END",
+              "CREATE TRIGGER {table}_changes_update AFTER UPDATE ON {table} BEGIN "
+              "INSERT INTO changes (table_name, row_id, op, changed_at) SELECT '{table}', old.id, 'delete', {now} WHERE old.id IS NOT new.id; "
+              "INSERT INTO changes (table_name, row_id, op, changed_at) VALUES ('{table}', new.id, 'update', {now}); END",
+              "CREATE TRIGGER {table}_changes_delete AFTER DELETE ON {table} BEGIN "
+              "INSERT INTO changes (table_name, row_id, op, changed_at) VALUES ('{table}', old.id, 'delete', {now}); END",
+          )),
+    ],
+    # 8: per-table version (the seq of its latest change) and modification time, the HTTP validators of both apps
+    [
+        "CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL, modified_at REAL NOT NULL)",
+        *(f"INSERT OR IGNORE INTO table_versions (table_name, version, modified_at) "
+          f"SELECT '{table}', IFNULL(MAX(seq), 0), IFNULL(MAX(changed_at), {UNIX_NOW}) FROM changes WHERE table_name = '{table}'"
+          for table in ("products", "categories")),
+        "CREATE TRIGGER IF NOT EXISTS changes_table_version AFTER INSERT ON changes BEGIN "
+        "UPDATE table_versions SET version = new.seq, modified_at = new.changed_at WHERE table_name = new.table_name; END",
+    ],
+    # 9: the per-row insert triggers stand down during bulk imports (see BULK_INSERT_GATE)
+    [
+        "DROP TRIGGER IF EXISTS products_fts_insert",
+        f"CREATE TRIGGER products_fts_insert AFTER INSERT ON products {BULK_INSERT_GATE} BEGIN "
+        "INSERT INTO products_fts (rowid, name) VALUES (new.rowid, new.name); END",
+        "DROP TRIGGER IF EXISTS category_stats_product_insert",
+        f"CREATE TRIGGER category_stats_product_insert AFTER INSERT ON products {BULK_INSERT_GATE} BEGIN "
+        + CATEGORY_STATS_UPSERT.format(row="new", sign="") + " END",
+        "DROP TRIGGER IF EXISTS products_changes_insert",
+        f"CREATE TRIGGER products_changes_insert AFTER INSERT ON products {BULK_INSERT_GATE} BEGIN "
+        f"INSERT INTO changes (table_name, row_id, op, changed_at) VALUES ('products', new.id, 'insert', {UNIX_NOW}); END",
+        "DROP TRIGGER IF EXISTS changes_table_version",
+        f"CREATE TRIGGER changes_table_version AFTER INSERT ON changes {BULK_INSERT_GATE} BEGIN "
+        "UPDATE table_versions SET version = new.seq, modified_at = new.changed_at WHERE table_name = new.table_name; END",
+    ],
+]
+
+
+class ProductNotFoundError(LookupError):
+    """Raised when a stock operation names a product that does not exist."""
+
+
+class InsufficientStockError(Exception):
+    """Raised when a stock operation would take a product's quantity below zero."""
+
+    def __init__(self, product_id: str):
+        super().__init__(f"Insufficient stock for product {product_id}.")
+        self.product_id = product_id
+
+
+class GroupCommitQueue:
+    """
+    Background writer that batches Database.execute calls from many threads into shared transactions.
+
+    A batch is flushed after flush_interval seconds or max_batch statements, whichever comes
+    first, so one commit (and one fsync) covers the whole batch. Each statement runs in its
+    own savepoint: a failing statement is rolled back alone and its error is raised to its
+    caller, while the rest of the batch still commits.
+    """
+
+    def __init__(self, db: "Database", flush_interval: float = 0.002, max_batch: int = 100):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str, params=()) -> Future:
+        future = Future()
+        self._queue.put((query, params, future))
+        return future
+
+    def close(self):
+        """Flush everything already submitted, then stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch: list):
+        outcomes = []
+        try:
+            with self.db.transaction() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for query, params, future in batch:
+                    conn.execute("SAVEPOINT statement")
+                    try:
+                        conn.execute(query, params)
+                        outcomes.append((future, None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO statement")
+                        outcomes.append((future, e))
+                    conn.execute("RELEASE statement")
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for future, error in outcomes:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
 
 class Database:
-    def __init__(self, db_name="inventory.db"):
-        self.db_name = db_name  
+    def __init__(self, db_name="inventory.db", pool_size: int = 8, journal_mode: str = "WAL",
+                 synchronous: str = "NORMAL", cache_size: int = -16000, mmap_size: int = 0,
+                 group_commit: bool = False, flush_interval: float = 0.002, max_batch: int = 100,
+                 read_pool_size: int = 0, read_mmap_size: int = 1 << 30, immutable: bool = False):
+        """
+        pool_size: maximum number of pooled connections, 0 opens a new connection per call.
+        journal_mode/synchronous/cache_size/mmap_size: SQLite PRAGMA values applied to the
+        database file (journal_mode) and to every connection (the others).
+        group_commit: batch execute() calls from concurrent threads into one transaction per
+        flush_interval seconds or max_batch statements (see GroupCommitQueue).
+        read_pool_size: size of a second pool of read-only (mode=ro) connections serving
+        fetchall/fetchone(read_only=True); 0 sends those reads through the main pool. They
+        use read_mmap_size, so the pages they read are shared with every other process
+        through the OS page cache instead of being copied into each connection's cache.
+        immutable: open the read-only connections with immutable=1, which skips locking and
+        change detection. Only safe when nothing writes the file while it is open (e.g.
+        worker processes serving a published copy); the WAL is checkpointed into the file
+        first, since immutable connections never read it.
+        """
+        self.db_name = db_name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.read_mmap_size = read_mmap_size
+        self.immutable = immutable
+        self.pool = ConnectionPool(self.get_connection, max_size=pool_size) if pool_size > 0 else None
+        self.read_pool = ConnectionPool(self.get_read_connection, max_size=read_pool_size) if read_pool_size > 0 else None
+        self.commit_queue = None
+        # Optional callable(query, seconds, rows) called after every execute/fetchall/fetchone.
+        self.query_observer = None
+
+        conn = self.get_connection()
+        try:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        finally:
+            conn.close()
         self.create_tables()
+        if immutable:
+            with self.connection() as conn:
+                busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            if busy:
+                raise sqlite3.OperationalError(f"{db_name} is being written; it cannot be opened immutable.")
+        self.commit_queue = GroupCommitQueue(self, flush_interval, max_batch) if group_commit else None
 
     def get_connection(self):
+        """Open a new, fully configured connection (not taken from the pool)."""
         conn = sqlite3.connect(self.db_name, check_same_thread=False)
-        conn.row_factory = sqlite3.Row  
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def get_read_connection(self):
+        """Open a new read-only connection; writes through it fail with 'attempt to write a readonly database'."""
+        uri = f"file:{quote(os.path.abspath(self.db_name))}?mode=ro{'&immutable=1' if self.immutable else ''}"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.read_mmap_size)}")
         return conn
 
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool for the duration of the block."""
+        if self.pool is None:
+            conn = self.get_connection()
+            try:
+                yield conn
+            finally:
+                conn.close()
+        else:
+            with self.pool.connection() as conn:
+                yield conn
+
+    @contextmanager
+    def read_connection(self):
+        """Borrow a read-only connection, or a pooled one when there is no read pool."""
+        if self.read_pool is None:
+            with self.connection() as conn:
+                yield conn
+        else:
+            with self.read_pool.connection() as conn:
+                yield conn
+
+    def transaction(self, label: str = None):
+        """
+        Run the block in a single transaction, committed on success and rolled back on error.
+
+        With a query_observer installed the whole block is timed and reported as
+        "transaction <label>", label defaulting to the qualified name of the calling function.
+        """
+        observer = self.query_observer
+        if observer is not None and label is None:
+            label = sys._getframe(1).f_code.co_qualname
+        return self._transaction(observer, label)
+
+    @contextmanager
+    def _transaction(self, observer, label: str):
+        start = time.perf_counter() if observer is not None else 0.0
+        try:
+            with self.connection() as conn:
+                with conn:
+                    yield conn
+        finally:
+            if observer is not None:
+                observer(f"transaction {label}", time.perf_counter() - start, 0)
+
+    def iterate(self, query: str, params=(), batch_size: int = 500, read_only: bool = False) -> Iterator[dict]:
+        """
+        Yield rows one at a time, pulling batch_size rows per fetch from the cursor. The
+        connection is held until the iterator is exhausted or closed, so long streams should
+        pass read_only=True to keep it out of the writers' pool.
+        """
+        with self.read_connection() if read_only else self.connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+
+    def close(self):
+        """Flush pending group commits and close all pooled connections."""
+        if self.commit_queue is not None:
+            self.commit_queue.close()
+            self.commit_queue = None
+        if self.pool is not None:
+            self.pool.close()
+        if self.read_pool is not None:
+            self.read_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     def create_tables(self):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, description TEXT)")
-            cursor.execute("CREATE TABLE IF NOT EXISTS products (id TEXT PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL, quantity INTEGER NOT NULL, category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE)")
-            conn.commit()
+        self.migrate()
+
+    def schema_version(self) -> int:
+        return self.fetchone("PRAGMA user_version")["user_version"]
+
+    def migrate(self, migrations: list = None):
+        """Apply every migration newer than the database's schema version."""
+        migrations = MIGRATIONS if migrations is None else migrations
+        if self.schema_version() >= len(migrations):
+            return
+
+        with self.connection() as conn:
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent processes
+            # apply each migration exactly once.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for number, statements in enumerate(migrations[version:], start=version + 1):
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {number}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
     def execute(self, query: str, params=()):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-
-    def fetchall(self, query: str, params=()) -> List[dict]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
-
-    def fetchone(self, query: str, params=()) -> dict:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        """Run a write statement; returns once it is committed (batched with others in group-commit mode)."""
+        observer = self.query_observer
+        start = time.perf_counter() if observer is not None else 0.0
+        if self.commit_queue is not None:
+            self.commit_queue.submit(query, params).result()
+        else:
+            with self._transaction(None, None) as conn:    # timed below as the statement itself
+                conn.execute(query, params)
+        if observer is not None:
+            observer(query, time.perf_counter() - start, 0)
+
+    def fetchall(self, query: str, params=(), read_only: bool = False) -> List[dict]:
+        """Rows of a query; read_only=True runs it on the read pool (see read_connection)."""
+        observer = self.query_observer
+        start = time.perf_counter() if observer is not None else 0.0
+        with self.read_connection() if read_only else self.connection() as conn:
+            cursor = conn.execute(query, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+        if observer is not None:
+            observer(query, time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchone(self, query: str, params=(), read_only: bool = False) -> dict:
+        observer = self.query_observer
+        start = time.perf_counter() if observer is not None else 0.0
+        with self.read_connection() if read_only else self.connection() as conn:
+            row = conn.execute(query, params).fetchone()
+        if observer is not None:
+            observer(query, time.perf_counter() - start, 1 if row else 0)
+        return dict(row) if row else None
+
+class IdSequence:
+    """
+    Hands out increasing integers from a row of the sequences table.
+
+    Every reservation is a single UPDATE ... RETURNING, so values are unique across
+    threads and processes sharing the database file. With block_size > 1 a block of
+    values is reserved at once and served from memory; unused values of a block are
+    lost when the process exits, so only block_size=1 is gap-free.
+    """
+
+    def __init__(self, db: Database, name: str, start: int = 0, block_size: int = 1):
+        self.db = db
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 1
+        self._limit = 0
+        self.db.execute("INSERT OR IGNORE INTO sequences (name, value) VALUES (?, ?)", (name, start))
+
+    def _reserve(self, count: int) -> int:
+        with self.db.transaction() as conn:
+            row = conn.execute("UPDATE sequences SET value = value + ? WHERE name = ? RETURNING value", (count, self.name)).fetchone()
+        return row["value"]
+
+    def next_values(self, count: int) -> List[int]:
+        with self._lock:
+            values = []
+            while len(values) < count:
+                if self._next > self._limit:
+                    reserve = max(self.block_size, count - len(values))
+                    self._limit = self._reserve(reserve)
+                    self._next = self._limit - reserve + 1
+                take = min(count - len(values), self._limit - self._next + 1)
+                values.extend(range(self._next, self._next + take))
+                self._next += take
+            return values
+
+    def next_value(self) -> int:
+        return self.next_values(1)[0]
+
+    def advance_to(self, value: int):
+        """Make sure the sequence never hands out value or anything below it."""
+        with self._lock:
+            if value <= self._limit:
+                # Inside (or below) the block this instance holds: the stored value is past it
+                # already, so only the in-memory cursor has to skip it.
+                self._next = max(self._next, value + 1)
+                return
+            self.db.execute("UPDATE sequences SET value = MAX(value, ?) WHERE name = ?", (value, self.name))
+
 
 class Inventory:
-    def __init__(self, db: Database):
+    PRODUCT_ID_PREFIX = "P"
+    PRODUCT_ID_START = 100000
+
+    def __init__(self, db: Database, id_block_size: int = 1):
         self.db = db
+        self.product_ids = IdSequence(db, "products", self._last_product_number(), id_block_size)
+
+    def _last_product_number(self) -> int:
+        """Highest existing P###### number, used once to seed the products sequence."""
+        if self.db.fetchone("SELECT value FROM sequences WHERE name = 'products'"):
+            return self.PRODUCT_ID_START
+        row = self.db.fetchone(
+            "SELECT MAX(CAST(SUBSTR(id, 2) AS INTEGER)) AS last FROM products WHERE id GLOB 'P[0-9]*'"
+        )
+        return max(row["last"] or 0, self.PRODUCT_ID_START)
+
+    def next_product_id(self) -> str:
+        return f"{self.PRODUCT_ID_PREFIX}{self.product_ids.next_value():06d}"
+
+    def next_product_ids(self, count: int) -> List[str]:
+        return [f"{self.PRODUCT_ID_PREFIX}{n:06d}" for n in self.product_ids.next_values(count)]
+
+    def reserve_product_id(self, product_id: str):
+        """Keep generated IDs clear of a client-supplied P###### ID."""
+        number = product_id[len(self.PRODUCT_ID_PREFIX):]
+        if product_id.startswith(self.PRODUCT_ID_PREFIX) and number.isdigit():
+            self.product_ids.advance_to(int(number))
 
     def add_category(self, category_name: str, description: str):
         self.db.execute("INSERT OR IGNORE INTO categories (name, description) VALUES (?, ?)", (category_name, description))
 
     def add_product(self, product_id: str, name: str, price: float, category_name: str, description: str, quantity: int):
+        self.reserve_product_id(product_id)
         self.add_category(category_name, description)
         category = self.db.fetchone("SELECT id FROM categories WHERE name = ?", (category_name,))
         if category:
             self.db.execute("INSERT INTO products (id, name, price, quantity, category_id) VALUES (?, ?, ?, ?, ?)", (product_id, name, price, quantity, category["id"]))
 
+    def add_products_bulk(self, rows: Iterable[dict], chunk_size: int = 1000) -> dict:
+        """
+        Insert many products, chunk_size rows per transaction.
+
+        Each row is a dict with name, price, quantity, category_name and optionally id and
+        description. Categories are resolved once per chunk through an in-memory name -> id
+        map. Rows that fail validation or violate a constraint are skipped and reported as
+        {"row": <index>, "error": <message>}.
+        """
+        categories = {c["name"]: c["id"] for c in self.db.fetchall("SELECT id, name FROM categories")}
+        inserted = 0
+        errors = []
+        chunk = []
+        for index, row in enumerate(rows):
+            try:
+                chunk.append((index, self._bulk_record(row)))
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append({"row": index, "error": str(e)})
+            if len(chunk) >= chunk_size:
+                inserted += self._insert_chunk(chunk, categories, errors)
+                chunk = []
+        if chunk:
+            inserted += self._insert_chunk(chunk, categories, errors)
+        return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+    @staticmethod
+    def _bulk_record(row) -> tuple:
+        if not isinstance(row, dict):
+            raise TypeError("Row is not a JSON object.")
+        missing = [field for field in ("name", "price", "quantity", "category_name") if row.get(field) in (None, "")]
+        if missing:
+            raise KeyError(f"Missing required fields: {', '.join(missing)}")
+        product_id = str(row.get("id") or "").strip() or None
+        return (product_id, row["name"], float(row["price"]), int(row["quantity"]),
+                row["category_name"], row.get("description") or "")
+
+    def _insert_chunk(self, chunk: list, categories: dict, errors: list) -> int:
+        new_categories = {}
+        for _, (_, _, _, _, category_name, description) in chunk:
+            if category_name not in categories:
+                new_categories.setdefault(category_name, description)
+        if new_categories:
+            with self.db.transaction() as conn:
+                conn.executemany("INSERT OR IGNORE INTO categories (name, description) VALUES (?, ?)", new_categories.items())
+                for name in new_categories:
+                    categories[name] = conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()["id"]
+
+        # IDs are reserved before the insert transaction so the sequence update never waits on it,
+        # and only after the sequence has moved past the chunk's own P###### IDs.
+        prefix = self.PRODUCT_ID_PREFIX
+        explicit = [int(record[0][len(prefix):]) for _, record in chunk
+                    if record[0] and record[0].startswith(prefix) and record[0][len(prefix):].isdigit()]
+        if explicit:
+            self.product_ids.advance_to(max(explicit))
+        generated = iter(self.next_product_ids(sum(1 for _, record in chunk if record[0] is None)))
+        indices = [index for index, _ in chunk]
+        params = [(product_id or next(generated), name, price, quantity, categories[category_name])
+                  for _, (product_id, name, price, quantity, category_name, _) in chunk]
+
+        query = "INSERT INTO products (id, name, price, quantity, category_id) VALUES (?, ?, ?, ?, ?)"
+        try:
+            with self.db.transaction() as conn:
+                # Derived tables are brought up to date once for the chunk, not row by row (see BULK_INSERT_GATE).
+                conn.execute("INSERT INTO settings (name, value) VALUES ('bulk_insert', 1)")
+                last_rowid = conn.execute("SELECT IFNULL(MAX(rowid), 0) FROM products").fetchone()[0]
+                conn.executemany(query, params)
+                for statement in BULK_INSERT_UPKEEP:
+                    conn.execute(statement, (last_rowid,) * statement.count("?"))
+                conn.execute("DELETE FROM settings WHERE name = 'bulk_insert'")
+            return len(params)
+        except sqlite3.IntegrityError:
+            pass
+
+        # Something in the chunk conflicts: retry row by row to report exactly which rows failed.
+        inserted = 0
+        with self.db.transaction() as conn:
+            for index, record in zip(indices, params):
+                try:
+                    conn.execute(query, record)
+                    inserted += 1
+                except sqlite3.IntegrityError as e:
+                    errors.append({"row": index, "error": str(e)})
+        return inserted
+
+    def update_product(self, product_id: str, price: float = None, quantity: int = None):
+        """Update the price and/or quantity of a product; fields left as None are unchanged."""
+        update_fields = []
+        update_values = []
+        if price is not None:
+            update_fields.append("price = ?")
+            update_values.append(price)
+        if quantity is not None:
+            update_fields.append("quantity = ?")
+            update_values.append(quantity)
+        if update_fields:
+            update_values.append(product_id)
+            self.db.execute(f"UPDATE products SET {', '.join(update_fields)} WHERE id = ?", tuple(update_values))
+
     def remove_product(self, product_id: str):
         self.db.execute("DELETE FROM products WHERE id = ?", (product_id,))
 
@@ -59,18 +732,94 @@ class Inventory:
         if not category:
             return False  
 
-        products_in_category = self.db.fetchall("SELECT id FROM products WHERE category_id = ?", (category["id"],))
+        products_in_category = self.db.fetchone("SELECT 1 FROM products WHERE category_id = ? LIMIT 1", (category["id"],))
         if products_in_category:
             raise Exception("Cannot delete category with existing products.")
 
         self.db.execute("DELETE FROM categories WHERE name = ?", (category_name,))
         return True    
     
+    def _products_changed(self, product_ids):
+        """Hook called after stock operations change the given products."""
+
+    @staticmethod
+    def _apply_stock_delta(conn: sqlite3.Connection, product_id: str, delta: int) -> int:
+        # One conditional UPDATE: the check and the write cannot interleave with another writer.
+        row = conn.execute("UPDATE products SET quantity = quantity + ? WHERE id = ? AND quantity >= ? RETURNING quantity",
+                           (delta, product_id, -delta)).fetchone()
+        if row is not None:
+            return row["quantity"]
+        if conn.execute("SELECT 1 FROM products WHERE id = ?", (product_id,)).fetchone() is None:
+            raise ProductNotFoundError(f"Product {product_id} not found.")
+        raise InsufficientStockError(product_id)
+
+    def adjust_stock(self, product_id: str, delta: int) -> int:
+        """Add delta (negative to remove) to a product's quantity and return the new quantity."""
+        return self.adjust_stock_batch({product_id: delta})[product_id]
+
+    def adjust_stock_batch(self, deltas: dict) -> dict:
+        """Apply {product_id: delta} in one transaction; nothing changes if any product fails."""
+        with self.db.transaction() as conn:
+            quantities = {product_id: self._apply_stock_delta(conn, product_id, int(delta))
+                          for product_id, delta in deltas.items()}
+        self._products_changed(quantities)
+        return quantities
+
+    def reserve_stock(self, items: dict) -> int:
+        """Take {product_id: quantity} out of stock for an order and return the reservation id."""
+        with self.db.transaction() as conn:
+            reservation_id = conn.execute("INSERT INTO reservations (created_at) VALUES (?)", (time.time(),)).lastrowid
+            for product_id, quantity in items.items():
+                quantity = int(quantity)
+                if quantity <= 0:
+                    raise ValueError(f"Reserved quantity for product {product_id} must be positive.")
+                self._apply_stock_delta(conn, product_id, -quantity)
+            conn.executemany("INSERT INTO reservation_items (reservation_id, product_id, quantity) VALUES (?, ?, ?)",
+                             [(reservation_id, product_id, int(quantity)) for product_id, quantity in items.items()])
+        self._products_changed(items)
+        return reservation_id
+
+    def commit_reservation(self, reservation_id: int) -> bool:
+        """Mark a reservation as sold; its stock stays removed. False if it is not pending."""
+        with self.db.transaction() as conn:
+            updated = conn.execute("UPDATE reservations SET status = 'committed' WHERE id = ? AND status = 'reserved'", (reservation_id,))
+            return updated.rowcount == 1
+
+    def release_reservation(self, reservation_id: int) -> bool:
+        """Cancel a pending reservation and put its stock back. False if it is not pending."""
+        with self.db.transaction() as conn:
+            updated = conn.execute("UPDATE reservations SET status = 'released' WHERE id = ? AND status = 'reserved'", (reservation_id,))
+            if updated.rowcount != 1:
+                return False
+            items = conn.execute("SELECT product_id, quantity FROM reservation_items WHERE reservation_id = ?", (reservation_id,)).fetchall()
+            conn.executemany("UPDATE products SET quantity = quantity + ? WHERE id = ?",
+                             [(item["quantity"], item["product_id"]) for item in items])
+        self._products_changed([item["product_id"] for item in items])
+        return True
+
+    def release_expired_reservations(self, max_age: float) -> int:
+        """Release every reservation pending for longer than max_age seconds; returns how many."""
+        expired = self.db.fetchall("SELECT id FROM reservations WHERE status = 'reserved' AND created_at < ?", (time.time() - max_age,))
+        return sum(self.release_reservation(row["id"]) for row in expired)
+
+    def get_reservation(self, reservation_id: int):
+        reservation = self.db.fetchone("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
+        if reservation:
+            reservation["items"] = self.db.fetchall("SELECT product_id, quantity FROM reservation_items WHERE reservation_id = ?", (reservation_id,))
+        return reservation
+
     def get_product(self, product_id: str):
-        return self.db.fetchone("SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id WHERE p.id = ?", (product_id,))
+        return self.db.fetchone("SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id WHERE p.id = ?", (product_id,), read_only=True)
 
     def get_all_products(self):
-        return self.db.fetchall("SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id")
+        return self.db.fetchall("SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id", read_only=True)
+
+    def get_products_page(self, limit: int, after: str = None):
+        """Up to limit products ordered by id, starting after the product id `after`."""
+        return self.db.fetchall("SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id WHERE p.id > ? ORDER BY p.id LIMIT ?", (after or "", limit), read_only=True)
+
+    def iter_products(self, batch_size: int = 500) -> Iterator[dict]:
+        return self.db.iterate("SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id ORDER BY p.id", batch_size=batch_size, read_only=True)
 
     def get_products_by_category(self, category_name: str):
         category = self.db.fetchone("SELECT id FROM categories WHERE name = ?", (category_name,))
@@ -78,14 +827,83 @@ class Inventory:
             return self.db.fetchall("SELECT id, name, price, quantity FROM products WHERE category_id = ?", (category["id"],))
         return []
 
+    def filter_products(self, category: str = None, min_price: float = None, max_price: float = None,
+                        min_quantity: int = None, max_quantity: int = None):
+        """Products matching every given bound (inclusive), optionally within one category."""
+        conditions, params = [], []
+        for condition, value in (("c.name = ?", category), ("p.price >= ?", min_price), ("p.price <= ?", max_price),
+                                 ("p.quantity >= ?", min_quantity), ("p.quantity <= ?", max_quantity)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.db.fetchall(f"SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p LEFT JOIN categories c ON p.category_id = c.id {where}", tuple(params))
+
+    def search_products(self, query: str = None, category: str = None, min_price: float = None,
+                        max_price: float = None, in_stock: bool = False, limit: int = 50, offset: int = 0,
+                        facets: bool = True, rank: bool = True) -> dict:
+        """
+        Search products by name and filters. Every word of query must match; the last one
+        is prefix-matched so the search works as-you-type.
+
+        Returns {"items": [...], "facets": {category_name: count}}. Text matches are ordered
+        by relevance (rank=False keeps index order, which avoids scoring every match of a
+        very common word), otherwise by id. Facet counts apply every filter except category,
+        so they show how the result set splits across categories; they cost a pass over
+        every match, so pass facets=False when they are not displayed.
+        """
+        joins = ""
+        conditions = []
+        params = []
+        terms = re.findall(r"\w+", query or "")
+        if terms:
+            joins = "JOIN products_fts f ON f.rowid = p.rowid"
+            conditions.append("products_fts MATCH ?")
+            params.append(" ".join(f'"{term}"' for term in terms) + "*")
+        if min_price is not None:
+            conditions.append("p.price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("p.price <= ?")
+            params.append(max_price)
+        if in_stock:
+            conditions.append("p.quantity > 0")
+
+        facet_counts = {}
+        if facets:
+            facet_where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = self.db.fetchall(f"SELECT p.category_id, COUNT(*) AS count FROM products p {joins} {facet_where} GROUP BY p.category_id", tuple(params))
+            names = {c["id"]: c["name"] for c in self.db.fetchall("SELECT id, name FROM categories")}
+            facet_counts = {names[row["category_id"]]: row["count"] for row in rows if row["category_id"] in names}
+
+        if category is not None:
+            conditions.append("p.category_id = (SELECT id FROM categories WHERE name = ?)")
+            params.append(category)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = ("f.rank" if rank else "f.rowid") if terms else "p.id"
+        items = self.db.fetchall(f"SELECT p.id, p.name, p.price, p.quantity, c.name as category FROM products p {joins} LEFT JOIN categories c ON p.category_id = c.id {where} ORDER BY {order} LIMIT ? OFFSET ?", (*params, limit, offset))
+        return {"items": items, "facets": facet_counts}
+
+    def rebuild_search_index(self):
+        """Re-index every product name, e.g. after a VACUUM has renumbered product rowids."""
+        self.db.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
     def get_category(self, category_name: str):
-        return self.db.fetchone("SELECT * FROM categories WHERE name = ?", (category_name,))
+        return self.db.fetchone("SELECT * FROM categories WHERE name = ?", (category_name,), read_only=True)
 
     def get_all_categories(self):
-        return self.db.fetchall("SELECT * FROM categories")
+        return self.db.fetchall("SELECT * FROM categories", read_only=True)
+
+    def get_categories_page(self, limit: int, after: int = None):
+        """Up to limit categories ordered by id, starting after the category id `after`."""
+        return self.db.fetchall("SELECT * FROM categories WHERE id > ? ORDER BY id LIMIT ?", (after or 0, limit), read_only=True)
+
+    def iter_categories(self, batch_size: int = 500) -> Iterator[dict]:
+        return self.db.iterate("SELECT * FROM categories ORDER BY id", batch_size=batch_size, read_only=True)
 
     
     def __str__(self):
-        total_products = self.db.fetchone('SELECT COUNT(*) as count FROM products')["count"]
-        total_categories = self.db.fetchone('SELECT COUNT(*) as count FROM categories')["count"]
+        counts = self.db.fetchone("SELECT (SELECT IFNULL(SUM(product_count), 0) FROM category_stats) AS products, "
+                                  "(SELECT COUNT(*) FROM categories) AS categories")
+        total_products, total_categories = counts["products"], counts["categories"]
         return f"Inventory with {total_products} products and {total_categories} categories."
@@ -1,27 +1,204 @@
-from flask import Flask, request, jsonify
-from models import Inventory, Database
+from flask import Flask, Response, request
+from models import Inventory, Database, InsufficientStockError, ProductNotFoundError
+from cache import CachedInventory, create_cache
+from analytics import Analytics
+from changes import ChangeLog, ChangesExpiredError
+from export import CHUNK_SIZE, EXPORTS, EXTENSIONS, FORMATS, backup_chunks, export_chunks
+from httpcache import (COMPRESSIBLE_TYPES, MIN_COMPRESS_SIZE, TableVersions, compress, compress_chunks, dumps,
+                       negotiate, not_modified, validator_headers)
+from snapshot import CatalogSnapshot
+import metrics
+import atexit
+import csv
+import functools
+import io
+import json
 import logging
+import os
 
 app = Flask(__name__)
 
-db = Database()
-inventory = Inventory(db)
+# GETs read through INVENTORY_READ_POOL read-only, memory-mapped connections (0 reads through
+# the writer's pool). INVENTORY_IMMUTABLE=1 is for workers serving a file nothing writes to;
+# their write routes answer 503.
+db = Database(os.environ.get("INVENTORY_DB", "inventory.db"),
+              group_commit=os.environ.get("INVENTORY_GROUP_COMMIT") == "1",
+              read_pool_size=int(os.environ.get("INVENTORY_READ_POOL", 8)),
+              immutable=os.environ.get("INVENTORY_IMMUTABLE") == "1")
+# INVENTORY_VALIDATOR_TTL=<seconds> reuses table versions in-process for that long, so conditional
+# GETs are answered without querying the database. Writes through this process invalidate them at
+# once; writes through other worker processes can be answered with stale 304s for up to that long.
+versions = TableVersions(db, max_staleness=float(os.environ.get("INVENTORY_VALIDATOR_TTL", 1)))
+# INVENTORY_CACHE selects the read cache: "memory" (per process), "file" (shared by all
+# worker processes on the host; the default under gunicorn with several workers) or "none".
+# Cached rows are tied to the table versions above, so they are never older than their ETag.
+cache = create_cache(os.environ.get("INVENTORY_CACHE", "memory"))
+inventory = CachedInventory(db, cache, versions) if cache is not None else Inventory(db)
+analytics = Analytics(db)
+change_log = ChangeLog(db)
+# INVENTORY_CHANGES_MAX_AGE=<seconds> compacts the change log and trims older entries every minute.
+if os.environ.get("INVENTORY_CHANGES_MAX_AGE"):
+    if db.immutable:
+        raise ValueError("INVENTORY_CHANGES_MAX_AGE trims the change log, which INVENTORY_IMMUTABLE=1 forbids")
+    change_log.start_maintenance(60, max_age=float(os.environ["INVENTORY_CHANGES_MAX_AGE"]))
+# INVENTORY_SNAPSHOT=1 serves product listings and filters from an in-memory columnar snapshot.
+snapshot = CatalogSnapshot(db) if os.environ.get("INVENTORY_SNAPSHOT") == "1" else None
+atexit.register(db.close)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# INVENTORY_METRICS=1 times every query and route and serves them at GET /metrics.
+if os.environ.get("INVENTORY_METRICS") == "1":
+    metrics.init_app(app, db, slow_query_threshold=float(os.environ.get("INVENTORY_SLOW_QUERY_MS", 100)) / 1000)
 
-def response(success: bool, message: str, data=None, status_code=200):
+
+MAX_PAGE_SIZE = 1000
+MAX_CHANGES_PAGE = 10000
+
+
+def response(success: bool, message: str, data=None, status_code=200, **extra):
     """Helper function to format API responses."""
     response_data = {"success": success, "message": message}
     if data is not None:
         response_data["data"] = data
-    return jsonify(response_data), status_code
+    response_data.update(extra)
+    return Response(dumps(response_data), mimetype="application/json"), status_code
+
+
+def raw_response(message: str, data: bytes):
+    """The response() envelope around an already serialized JSON payload."""
+    head = json.dumps({"success": True, "message": message})[:-1].encode()
+    return Response(head + b', "data": ' + data + b"}", mimetype="application/json")
+
+
+def stream_response(message: str, rows, mode: str):
+    """Stream rows as NDJSON lines or as the usual JSON envelope, one row at a time."""
+    if mode == "ndjson":
+        return Response((dumps(row) + b"\n" for row in rows), mimetype="application/x-ndjson")
+
+    def generate():
+        yield json.dumps({"success": True, "message": message})[:-1].encode() + b', "data": ['
+        for i, row in enumerate(rows):
+            yield (b"," if i else b"") + dumps(row)
+        yield b"]}"
+
+    return Response(generate(), mimetype="application/json")
+
+
+def conditional(*tables: str):
+    """
+    Answer GETs whose validators still match with 304 before the view reads anything; label 200s with them.
+
+    Validators are per table, also on single-item routes: any write to one of the tables
+    changes the ETag of every item, which costs a full 200 but never serves a stale 304.
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = versions.validators(*tables)
+            headers = validator_headers(etag, last_modified)
+            if not_modified(request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since"),
+                            etag, last_modified):
+                return Response(status=304, headers=headers)
+            resp = app.make_response(view(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.headers.update(headers)
+            return resp
+        return wrapper
+    return decorate
+
+
+@app.before_request
+def reject_writes_when_immutable():
+    """With INVENTORY_IMMUTABLE=1 the readers would never see a write, so the write routes answer 503."""
+    if db.immutable and request.method not in ("GET", "HEAD", "OPTIONS") and request.url_rule is not None:
+        return response(False, "Service is read-only (INVENTORY_IMMUTABLE=1)", status_code=503)
+
+
+@app.after_request
+def compress_response(resp):
+    """Compress streams and bodies of at least MIN_COMPRESS_SIZE bytes with the client's preferred coding."""
+    if (resp.status_code in (204, 304) or resp.direct_passthrough or "Content-Encoding" in resp.headers
+            or resp.mimetype not in COMPRESSIBLE_TYPES):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return resp
+    if resp.is_streamed:
+        resp.response = compress_chunks(resp.response, encoding)
+    elif resp.content_length is not None and resp.content_length >= MIN_COMPRESS_SIZE:
+        resp.set_data(compress(resp.get_data(), encoding))
+    else:
+        return resp
+    resp.headers["Content-Encoding"] = encoding
+    return resp
+
+
+@app.after_request
+def invalidate_validators(resp):
+    """Make this process's own writes visible to the next conditional GET, whatever INVENTORY_VALIDATOR_TTL is."""
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        versions.invalidate()
+    return resp
+
+
+@app.errorhandler(404)
+def not_found(e):
+    return response(False, "Not Found", status_code=404)
+
+
+@app.errorhandler(405)
+def method_not_allowed(e):
+    resp, status = response(False, "Method Not Allowed", status_code=405)
+    resp.headers["Allow"] = ", ".join(e.valid_methods or ())
+    return resp, status
+
+
+def page_size():
+    """The ?limit= query parameter, or None when the full listing was requested."""
+    limit = request.args.get("limit")
+    if limit is None:
+        return None
+    limit = int(limit)
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def product_filters(args) -> dict:
+    """The ?category=&min_price=&max_price=&min_quantity=&max_quantity= filters of GET /products."""
+    filters = {"category": args["category"]} if "category" in args else {}
+    for key, cast in (("min_price", float), ("max_price", float), ("min_quantity", int), ("max_quantity", int)):
+        if key in args:
+            filters[key] = cast(args[key])
+    return filters
 
 
 @app.route('/products', methods=['GET'])
+@conditional("products", "categories")
 def get_all_products():
-    """Retrieve all products"""
+    """Retrieve all products, a page of products (?limit=&after=), a stream (?stream=json|ndjson) or products filtered by category, price and quantity ranges"""
+    try:
+        limit = page_size()
+        filters = product_filters(request.args)
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+
     try:
+        if filters:
+            if snapshot is not None:
+                return raw_response("Products retrieved successfully", snapshot.json(snapshot.select(**filters)))
+            return response(True, "Products retrieved successfully", inventory.filter_products(**filters))
+        stream = request.args.get("stream")
+        if stream:
+            return stream_response("Products retrieved successfully", inventory.iter_products(), stream)
+        if limit:
+            products = inventory.get_products_page(limit, request.args.get("after"))
+            next_cursor = products[-1]["id"] if len(products) == limit else None
+            return response(True, "Products retrieved successfully", products, next=next_cursor)
+        if snapshot is not None:
+            return raw_response("Products retrieved successfully", snapshot.products_json())
         products = inventory.get_all_products()
         return response(True, "Products retrieved successfully", products)
     except Exception as e:
@@ -29,7 +206,43 @@ def get_all_products():
         return response(False, "Internal Server Error", status_code=500)
 
 
+def search_params(args) -> dict:
+    """Parse the /products/search query string into Inventory.search_products arguments."""
+    limit = int(args.get("limit", 50))
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return {
+        "query": args.get("q"),
+        "category": args.get("category"),
+        "min_price": float(args["min_price"]) if "min_price" in args else None,
+        "max_price": float(args["max_price"]) if "max_price" in args else None,
+        "in_stock": args.get("in_stock", "").lower() in ("1", "true", "yes"),
+        "limit": limit,
+        "offset": max(int(args.get("offset", 0)), 0),
+        "facets": args.get("facets", "1").lower() not in ("0", "false", "no"),
+        "rank": args.get("sort", "relevance") == "relevance",
+    }
+
+
+@app.route('/products/search', methods=['GET'])
+@conditional("products", "categories")
+def search_products():
+    """Search products by name (?q=) with category, price range and in-stock filters and category facets (?sort=relevance|index, ?facets=0)"""
+    try:
+        params = search_params(request.args)
+    except ValueError as e:
+        return response(False, f"Invalid search parameters: {e}", status_code=400)
+
+    try:
+        result = inventory.search_products(**params)
+        return response(True, "Products retrieved successfully", result["items"], facets=result["facets"])
+    except Exception as e:
+        logging.error(f"Error searching products: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+
+
 @app.route('/products/<string:product_id>', methods=['GET'])
+@conditional("products", "categories")
 def get_product(product_id):
     """Retrieve a specific product"""
     product = inventory.get_product(product_id)
@@ -39,9 +252,23 @@ def get_product(product_id):
 
 
 @app.route('/categories', methods=['GET'])
+@conditional("categories")
 def get_all_categories():
-    """Retrieve all categories"""
+    """Retrieve all categories, a page of categories (?limit=&after=) or a stream (?stream=json|ndjson)"""
     try:
+        limit = page_size()
+        after = int(request.args.get("after", 0))
+    except ValueError as e:
+        return response(False, f"Invalid pagination parameters: {e}", status_code=400)
+
+    try:
+        stream = request.args.get("stream")
+        if stream:
+            return stream_response("Categories retrieved successfully", inventory.iter_categories(), stream)
+        if limit:
+            categories = inventory.get_categories_page(limit, after)
+            next_cursor = categories[-1]["id"] if len(categories) == limit else None
+            return response(True, "Categories retrieved successfully", categories, next=next_cursor)
         categories = inventory.get_all_categories()
         return response(True, "Categories retrieved successfully", categories)
     except Exception as e:
@@ -50,6 +277,7 @@ def get_all_categories():
 
 
 @app.route('/categories/<string:category_name>', methods=['GET'])
+@conditional("categories")
 def get_category(category_name):
     """Retrieve a specific category"""
     category = inventory.get_category(category_name)
@@ -58,13 +286,126 @@ def get_category(category_name):
     return response(True, "Category retrieved successfully", category)
 
 
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss statistics of the read cache"""
+    if cache is None:
+        return response(False, "Caching is disabled", status_code=404)
+    return response(True, "Cache statistics retrieved successfully", cache.stats())
+
+
+def low_stock_params(args) -> dict:
+    """Parse the /stats/low-stock query string into Analytics.low_stock arguments."""
+    limit = int(args.get("limit", 100))
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return {
+        "threshold": int(args["threshold"]) if "threshold" in args else None,
+        "category": args.get("category"),
+        "limit": limit,
+    }
+
+
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """Rows changed after ?since=<seq>, one delta per row, paged with ?limit= or streamed with ?stream=json|ndjson"""
+    try:
+        since = int(request.args.get("since", 0))
+        limit = int(request.args.get("limit", 1000))
+        if not 0 < limit <= MAX_CHANGES_PAGE:
+            raise ValueError(f"limit must be between 1 and {MAX_CHANGES_PAGE}")
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+
+    try:
+        stream = request.args.get("stream")
+        if stream:
+            if since < change_log.trimmed_seq():
+                raise ChangesExpiredError(f"Changes up to seq {change_log.trimmed_seq()} have been deleted.")
+            return stream_response("Changes retrieved successfully", change_log.iter_changes(since), stream)
+        changes = change_log.read(since, limit)
+        next_cursor = changes[-1]["seq"] if changes else since
+        return response(True, "Changes retrieved successfully", changes, next=next_cursor, latest=change_log.latest_seq())
+    except ChangesExpiredError as e:
+        return response(False, str(e), status_code=410, latest=change_log.latest_seq())
+    except Exception as e:
+        logging.error(f"Error fetching changes: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+
+
+@app.route('/export/<string:table>', methods=['GET'])
+def export_table(table):
+    """Every product or category row from one consistent snapshot, streamed in chunks as ?format=csv|ndjson|columnar"""
+    if table not in EXPORTS:
+        return response(False, "Unknown export", status_code=404)
+    fmt = request.args.get("format", "ndjson")
+    try:
+        chunk_size = int(request.args.get("chunk_size", CHUNK_SIZE))
+        if fmt not in FORMATS or chunk_size < 1:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)} and chunk_size positive")
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+    return Response(export_chunks(db, table, fmt, chunk_size), mimetype=FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{table}.{EXTENSIONS[fmt]}"'})
+
+
+@app.route('/backup', methods=['GET'])
+def get_backup():
+    """A hot backup of the database, copied with SQLite's online backup API a few pages at a time"""
+    return Response(backup_chunks(db), mimetype="application/vnd.sqlite3",
+                    headers={"Content-Disposition": 'attachment; filename="inventory-backup.db"'})
+
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """Inventory-wide totals: products, categories, units, stock value, out-of-stock and low-stock counts"""
+    return response(True, "Statistics retrieved successfully", analytics.summary())
+
+
+@app.route('/stats/categories', methods=['GET'])
+def get_category_stats():
+    """Product count, units, stock value and stock alerts per category"""
+    return response(True, "Statistics retrieved successfully", analytics.category_stats())
+
+
+@app.route('/stats/categories/<string:category_name>', methods=['GET'])
+def get_category_stat(category_name):
+    """Totals for one category"""
+    stats = analytics.category_stat(category_name)
+    if not stats:
+        return response(False, "Category not found", status_code=404)
+    return response(True, "Statistics retrieved successfully", stats)
+
+
+@app.route('/stats/low-stock', methods=['GET'])
+def get_low_stock():
+    """Products at or below the low-stock threshold (?threshold=&category=&limit=), lowest quantity first"""
+    try:
+        params = low_stock_params(request.args)
+    except ValueError as e:
+        return response(False, f"Invalid parameters: {e}", status_code=400)
+    return response(True, "Low-stock products retrieved successfully", analytics.low_stock(**params))
+
+
+@app.route('/stats/low-stock', methods=['PUT'])
+def set_low_stock_threshold():
+    """Change the default low-stock threshold"""
+    data = request.get_json(silent=True)
+    try:
+        threshold = int(data["threshold"])
+    except (KeyError, TypeError, ValueError):
+        return response(False, "threshold must be an integer", status_code=400)
+    analytics.set_low_stock_threshold(threshold)
+    return response(True, "Low-stock threshold updated successfully", analytics.summary())
+
+
 @app.route('/products', methods=['POST'])
 def add_product():
     """Add a new product"""
-    data = request.json
+    data = request.get_json(silent=True)
     required_fields = {"name", "price", "quantity", "category_name", "description"}
 
-    if not data or not required_fields.issubset(data.keys()):
+    if not isinstance(data, dict) or not required_fields.issubset(data.keys()):
         return response(False, "Missing required fields", status_code=400)
 
     try:
@@ -72,9 +413,7 @@ def add_product():
         if "id" in data and data["id"].strip():
             product_id = data["id"]
         else:
-            last_product = db.fetchone("SELECT id FROM products ORDER BY CAST(SUBSTR(id, 2) AS INTEGER) DESC LIMIT 1")
-            last_number = int(last_product["id"][1:]) if last_product and last_product["id"] else 100000
-            product_id = f"P{last_number + 1:06d}"
+            product_id = inventory.next_product_id()
 
         # Add Product
         inventory.add_product(
@@ -92,39 +431,154 @@ def add_product():
         return response(False, "Internal Server Error", status_code=500)
 
 
+def iter_ndjson(stream):
+    """Yield one row per non-empty line; lines that are not valid JSON yield None."""
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+@app.route('/products/bulk', methods=['POST'])
+def add_products_bulk():
+    """Add many products from a JSON array, NDJSON or CSV body"""
+    content_type = request.mimetype
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = iter_ndjson(request.stream)
+    elif content_type == "text/csv":
+        rows = csv.DictReader(io.TextIOWrapper(request.stream, encoding="utf-8"))
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return response(False, "Expected a JSON array of products", status_code=400)
+
+    try:
+        chunk_size = int(request.args.get("chunk_size", 1000))
+        result = inventory.add_products_bulk(rows, chunk_size=max(chunk_size, 1))
+    except Exception as e:
+        logging.error(f"Error importing products: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+
+    if not result["errors"]:
+        return response(True, "Products added successfully", result, status_code=201)
+    if result["inserted"]:
+        return response(True, "Products partially added", result, status_code=207)
+    return response(False, "No products added", result, status_code=400)
+
+
 @app.route('/products/<string:product_id>', methods=['PUT'])
 def update_product(product_id):
     """Update product details (price or quantity)"""
-    data = request.json
+    data = request.get_json(silent=True) or {}
     product = inventory.get_product(product_id)
 
     if not product:
         return response(False, "Product not found", status_code=404)
 
-    update_fields = []
-    update_values = []
+    price = float(data["price"]) if "price" in data else None
+    quantity = int(data["quantity"]) if "quantity" in data else None
 
-    if "price" in data:
-        update_fields.append("price = ?")
-        update_values.append(float(data["price"]))
-    if "quantity" in data:
-        update_fields.append("quantity = ?")
-        update_values.append(int(data["quantity"]))
-
-    if not update_fields:
+    if price is None and quantity is None:
         return response(False, "No valid fields to update", status_code=400)
 
-    update_query = f"UPDATE products SET {', '.join(update_fields)} WHERE id = ?"
-    update_values.append(product_id)
-
     try:
-        db.execute(update_query, tuple(update_values))
+        inventory.update_product(product_id, price=price, quantity=quantity)
         return response(True, "Product updated successfully")
     except Exception as e:
         logging.error(f"Error updating product {product_id}: {str(e)}")
         return response(False, "Internal Server Error", status_code=500)
 
 
+def stock_items(data, key: str) -> dict:
+    """Turn [{"product_id": ..., key: n}, ...] into {product_id: n}, summing repeated products."""
+    items = {}
+    for item in data.get("items") or []:
+        items[item["product_id"]] = items.get(item["product_id"], 0) + int(item[key])
+    if not items:
+        raise ValueError("No items given")
+    return items
+
+
+def stock_error(e: Exception):
+    if isinstance(e, ProductNotFoundError):
+        return response(False, str(e), status_code=404)
+    if isinstance(e, InsufficientStockError):
+        return response(False, str(e), {"product_id": e.product_id}, status_code=409)
+    return response(False, f"Invalid request: {e}", status_code=400)
+
+
+@app.route('/products/<string:product_id>/stock', methods=['POST'])
+def adjust_stock(product_id):
+    """Atomically add or remove stock ({"delta": -2}) without overwriting concurrent changes"""
+    data = request.get_json(silent=True) or {}
+    try:
+        quantity = inventory.adjust_stock(product_id, int(data["delta"]))
+        return response(True, "Stock updated successfully", {"product_id": product_id, "quantity": quantity})
+    except (KeyError, ValueError, TypeError, ProductNotFoundError, InsufficientStockError) as e:
+        return stock_error(e)
+    except Exception as e:
+        logging.error(f"Error adjusting stock of {product_id}: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+
+
+@app.route('/stock', methods=['POST'])
+def adjust_stock_batch():
+    """Adjust several products in one transaction ({"items": [{"product_id": ..., "delta": ...}]})"""
+    data = request.get_json(silent=True) or {}
+    try:
+        quantities = inventory.adjust_stock_batch(stock_items(data, "delta"))
+        return response(True, "Stock updated successfully", quantities)
+    except (KeyError, ValueError, TypeError, ProductNotFoundError, InsufficientStockError) as e:
+        return stock_error(e)
+    except Exception as e:
+        logging.error(f"Error adjusting stock: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+
+
+@app.route('/reservations', methods=['POST'])
+def reserve_stock():
+    """Reserve stock for an order ({"items": [{"product_id": ..., "quantity": ...}]})"""
+    data = request.get_json(silent=True) or {}
+    try:
+        reservation_id = inventory.reserve_stock(stock_items(data, "quantity"))
+        return response(True, "Stock reserved successfully", {"reservation_id": reservation_id}, status_code=201)
+    except (KeyError, ValueError, TypeError, ProductNotFoundError, InsufficientStockError) as e:
+        return stock_error(e)
+    except Exception as e:
+        logging.error(f"Error reserving stock: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+
+
+@app.route('/reservations/<int:reservation_id>', methods=['GET'])
+def get_reservation(reservation_id):
+    """Retrieve a reservation and its items"""
+    reservation = inventory.get_reservation(reservation_id)
+    if not reservation:
+        return response(False, "Reservation not found", status_code=404)
+    return response(True, "Reservation retrieved successfully", reservation)
+
+
+@app.route('/reservations/<int:reservation_id>/<string:action>', methods=['POST'])
+def finish_reservation(reservation_id, action):
+    """Commit (stock is sold) or release (stock is returned) a pending reservation"""
+    if action not in ("commit", "release"):
+        return response(False, "Unknown reservation action", status_code=404)
+    try:
+        if action == "commit":
+            done = inventory.commit_reservation(reservation_id)
+        else:
+            done = inventory.release_reservation(reservation_id)
+    except Exception as e:
+        logging.error(f"Error finishing reservation {reservation_id}: {str(e)}")
+        return response(False, "Internal Server Error", status_code=500)
+    if not done:
+        return response(False, "Reservation not found or no longer pending", status_code=409)
+    return response(True, "Reservation committed successfully" if action == "commit" else "Reservation released successfully")
+
+
 @app.route('/products/<string:product_id>', methods=['DELETE'])
 def delete_product(product_id):
     """Delete a product"""
@@ -0,0 +1,42 @@
+"""
+Production launcher for the inventory API.
+
+    python app/serve.py --mode flask --workers 4 --bind 0.0.0.0:8000   # gunicorn serving routes:app
+    python app/serve.py --mode asgi --workers 4 --bind 0.0.0.0:8000    # uvicorn serving asgi:app
+
+Flask mode needs gunicorn and asgi mode needs uvicorn (pip install gunicorn uvicorn).
+With more than one worker INVENTORY_CACHE defaults to "file", so cache invalidations reach every worker.
+"""
+import argparse
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def command(mode: str, bind: str, workers: int, threads: int):
+    if mode == "flask":
+        return [sys.executable, "-m", "gunicorn", "--config", os.path.join(APP_DIR, "gunicorn.conf.py"),
+                "--chdir", APP_DIR, "--bind", bind, "--workers", str(workers), "--threads", str(threads), "routes:app"]
+    host, _, port = bind.rpartition(":")
+    return [sys.executable, "-m", "uvicorn", "--app-dir", APP_DIR, "--host", host or "127.0.0.1", "--port", port,
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning", "asgi:app"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--bind", default=os.environ.get("INVENTORY_BIND", "127.0.0.1:8000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("INVENTORY_WORKERS", 1)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("INVENTORY_THREADS", 8)),
+                        help="request threads per gunicorn worker (flask mode)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        os.environ.setdefault("INVENTORY_CACHE", "file")
+    argv = command(args.mode, args.bind, args.workers, args.threads)
+    os.execv(argv[0], argv)
+
+
+if __name__ == "__main__":
+    main()
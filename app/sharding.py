@@ -0,0 +1,624 @@
+"""
+Inventory sharded over several SQLite files, to scale writes past one file's writer lock.
+
+A sharded catalog is a directory holding ``directory.db`` and ``shard-000.db`` ...
+``shard-<N-1>.db``. Every shard is a regular Database with the full schema. The directory
+is the global category directory and ID allocator: categories get their ids there and are
+copied into every shard, so products keep a local foreign key and shard-local joins,
+triggers and summary tables keep working.
+
+Products are routed either by ID hash (``shard_by="id"``, crc32 of the id) or by category
+(``shard_by="category"``; the directory assigns each category a shard). When routing by
+category the directory also indexes every product id with its category, which keeps ids
+unique across shards and locates a product with one query. Writes to different shards
+run in parallel. Reads that are not confined to one shard (listings, filters, search and
+counts) fan out to every shard on a thread pool; sqlite3 releases the GIL while
+statements run. The results are merged by id.
+
+Cross-shard stock batches and reservations are applied one shard at a time and undone on
+failure. They are atomic in outcome but not isolated: readers may see a partial batch
+while it is being applied.
+
+ShardedInventory is a library-level backend for batch jobs and services built on the
+Inventory interface; routes.py and asgi.py are not wired to it and always serve one
+Database. Their changes feed, analytics, snapshot, HTTP validators (table_versions) and
+the ASGI single-writer executor all work on a single file, and none has a sharded
+counterpart yet.
+
+    python sharding.py status --dir shards/
+    python sharding.py rebalance --dir shards/        # by category: even out products per shard
+    python sharding.py reshard --dir shards/ --shards 8   # by id: change the number of shards
+
+Both maintenance commands move products, with their reservations, between files and are
+meant to run with writers stopped. Each records what it is doing in the directory first,
+so an interrupted run can be finished (see rebalance and reshard).
+"""
+import argparse
+import heapq
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from typing import Iterable, Iterator, List
+
+from models import Database, IdSequence, Inventory, ProductNotFoundError
+
+PRODUCT_COLUMNS = "id, name, price, quantity, category_id"
+SHARD_BY = ("id", "category")
+
+
+class DirectoryStore(Database):
+    """The global directory: categories, ID sequences, the category -> shard map and the product id index."""
+
+    def create_tables(self):
+        super().create_tables()
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS category_shards (category_id INTEGER PRIMARY KEY, shard INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS product_index (id TEXT PRIMARY KEY, category_id INTEGER NOT NULL)")
+
+
+def shard_path(root: str, index: int) -> str:
+    return os.path.join(root, f"shard-{index:03d}.db")
+
+
+def hash_shard(product_id: str, shard_count: int) -> int:
+    return zlib.crc32(str(product_id).encode()) % shard_count
+
+
+class ShardedInventory(Inventory):
+    """
+    Inventory over the shards of the catalog in root.
+
+    shard_count and shard_by are recorded in the directory when the catalog is created;
+    opening it later with different values raises ValueError (see reshard), as does opening
+    it while a reshard is unfinished. A category move left half done by an interrupted
+    rebalance is finished on open. Categories, IDs and the category listing methods
+    inherited from Inventory use the directory.
+    """
+
+    def __init__(self, root: str, shard_count: int = None, shard_by: str = None, workers: int = None,
+                 id_block_size: int = 1, **db_options):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        directory = DirectoryStore(os.path.join(root, "directory.db"), **db_options)
+        self.shard_count, self.shard_by = self._layout(directory, shard_count, shard_by)
+        super().__init__(directory, id_block_size)
+        self.shards = [Inventory(Database(shard_path(root, i), **db_options)) for i in range(self.shard_count)]
+        self.reservation_ids = IdSequence(directory, "reservations")
+        self.pool = ThreadPoolExecutor(max_workers=workers or self.shard_count, thread_name_prefix="shard")
+        self._category_shards = {}     # category id -> shard index
+        self._known_categories = {}     # name -> category id
+        self._finish_category_move()
+
+    @staticmethod
+    def _layout(directory: Database, shard_count: int, shard_by: str) -> tuple:
+        with directory.transaction() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = dict(conn.execute("SELECT name, value FROM settings "
+                                       "WHERE name IN ('shard_count', 'shard_by', 'reshard_to')").fetchall())
+            if "reshard_to" in stored:
+                raise ValueError(f"A reshard to {stored['reshard_to']} shards was interrupted; run reshard again to finish it.")
+            if not stored:
+                stored = {"shard_count": shard_count or 4, "shard_by": shard_by or "id"}
+                if stored["shard_by"] not in SHARD_BY or int(stored["shard_count"]) < 1:
+                    raise ValueError(f"shard_by must be one of {SHARD_BY} and shard_count positive")
+                conn.executemany("INSERT INTO settings (name, value) VALUES (?, ?)", stored.items())
+        if (shard_count is not None and shard_count != int(stored["shard_count"])
+                or shard_by is not None and shard_by != stored["shard_by"]):
+            raise ValueError(f"Catalog is sharded {stored['shard_count']} ways by {stored['shard_by']}; "
+                             f"use the reshard tool to change it.")
+        return int(stored["shard_count"]), stored["shard_by"]
+
+    def _finish_category_move(self):
+        """Complete the category move recorded by a rebalance that stopped before updating the directory."""
+        row = self.db.fetchone("SELECT value FROM settings WHERE name = 'rebalance_move'")
+        if row is None:
+            return
+        category_id, source, target = map(int, row["value"].split(":"))
+        logging.warning("Finishing the interrupted move of category %s from shard %d to shard %d", category_id, source, target)
+        with self.shards[source].db.connection() as conn:
+            _move_products(conn, shard_path(self.root, target), "category_id = ?", (category_id,),
+                           self.shards[source].db.query_observer)
+        self._assign_category(category_id, target)
+
+    def _assign_category(self, category_id: int, shard: int):
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE category_shards SET shard = ? WHERE category_id = ?", (shard, category_id))
+            conn.execute("DELETE FROM settings WHERE name = 'rebalance_move'")
+        self._category_shards.pop(category_id, None)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for shard in self.shards:
+            shard.db.close()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -- routing -----------------------------------------------------------
+
+    def _scatter(self, fn, shards: Iterable[Inventory] = None) -> list:
+        """fn(shard) for every shard in parallel, results in shard order."""
+        shards = self.shards if shards is None else list(shards)
+        if len(shards) == 1:
+            return [fn(shards[0])]
+        return list(self.pool.map(fn, shards))
+
+    def _category_shard(self, category_id: int) -> Inventory:
+        shard = self._category_shards.get(category_id)
+        if shard is None:
+            row = self.db.fetchone("SELECT shard FROM category_shards WHERE category_id = ?", (category_id,))
+            if row is None:
+                raise LookupError(f"Category {category_id} has no shard assigned.")
+            shard = self._category_shards[category_id] = row["shard"]
+        return self.shards[shard]
+
+    def _shard_for(self, product_id: str, category_id: int = None) -> Inventory:
+        if self.shard_by == "id":
+            return self.shards[hash_shard(product_id, self.shard_count)]
+        return self._category_shard(category_id)
+
+    def _locate(self, product_ids) -> dict:
+        """{product_id: shard} for the given products that exist."""
+        product_ids = list(product_ids)
+        if self.shard_by == "id":
+            return {product_id: self._shard_for(product_id) for product_id in product_ids}
+        params = ",".join("?" * len(product_ids))
+        rows = self.db.fetchall(f"SELECT id, category_id FROM product_index WHERE id IN ({params})", product_ids)
+        return {row["id"]: self._category_shard(row["category_id"]) for row in rows}
+
+    def _index_products(self, entries: list) -> list:
+        """
+        Claim ids in the directory's product index, as [(product_id, category_id)]; returns
+        the positions of the entries whose id was already taken. Only used when routing by
+        category: routing by id sends equal ids to the same shard, whose primary key rejects
+        the duplicate.
+        """
+        taken = []
+        with self.db.transaction() as conn:
+            for position, (product_id, category_id) in enumerate(entries):
+                if conn.execute("INSERT OR IGNORE INTO product_index (id, category_id) VALUES (?, ?)",
+                                (product_id, category_id)).rowcount == 0:
+                    taken.append(position)
+        return taken
+
+    def _unindex_products(self, product_ids: list):
+        if self.shard_by == "category" and product_ids:
+            with self.db.transaction() as conn:
+                conn.executemany("DELETE FROM product_index WHERE id = ?", [(product_id,) for product_id in product_ids])
+
+    def _group(self, items: dict) -> dict:
+        """Split {product_id: value} into {shard index: {product_id: value}}; unknown products raise."""
+        located = self._locate(items)
+        grouped = {}
+        for product_id, value in items.items():
+            if product_id not in located:
+                raise ProductNotFoundError(f"Product {product_id} not found.")
+            grouped.setdefault(self.shards.index(located[product_id]), {})[product_id] = value
+        return grouped
+
+    # -- categories --------------------------------------------------------
+
+    def _category_id(self, category_name: str, description: str = "") -> int:
+        """The global id of a category, creating it on first use; known names cost no query."""
+        category_id = self._known_categories.get(category_name)
+        if category_id is None:
+            category = self.get_category(category_name) or self.add_category(category_name, description)
+            category_id = self._known_categories[category_name] = category["id"]
+        return category_id
+
+    def add_category(self, category_name: str, description: str):
+        super().add_category(category_name, description)
+        category = self.db.fetchone("SELECT * FROM categories WHERE name = ?", (category_name,))
+        self._scatter(lambda shard: shard.db.execute(
+            "INSERT OR IGNORE INTO categories (id, name, description) VALUES (?, ?, ?)",
+            (category["id"], category["name"], category["description"])))
+        if self.shard_by == "category":
+            with self.db.transaction() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("SELECT 1 FROM category_shards WHERE category_id = ?", (category["id"],)).fetchone() is None:
+                    # New categories go to the shard holding the fewest categories.
+                    counts = dict(conn.execute("SELECT shard, COUNT(*) FROM category_shards GROUP BY shard").fetchall())
+                    shard = min(range(self.shard_count), key=lambda i: counts.get(i, 0))
+                    conn.execute("INSERT INTO category_shards (category_id, shard) VALUES (?, ?)", (category["id"], shard))
+        return category
+
+    def remove_category(self, category_name: str):
+        category = self.get_category(category_name)
+        if not category:
+            return False
+        if any(self._scatter(lambda shard: shard.db.fetchone(
+                "SELECT 1 FROM products WHERE category_id = ? LIMIT 1", (category["id"],)))):
+            raise Exception("Cannot delete category with existing products.")
+        self._scatter(lambda shard: shard.db.execute("DELETE FROM categories WHERE id = ?", (category["id"],)))
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM category_shards WHERE category_id = ?", (category["id"],))
+            conn.execute("DELETE FROM categories WHERE id = ?", (category["id"],))
+        self._category_shards.pop(category["id"], None)
+        self._known_categories.pop(category_name, None)
+        return True
+
+    def _category_ids(self, descriptions: dict) -> dict:
+        """{name: global id} for the names in {name: description}, creating missing categories."""
+        return {name: self._category_id(name, description) for name, description in descriptions.items()}
+
+    # -- product writes ----------------------------------------------------
+
+    def add_product(self, product_id: str, name: str, price: float, category_name: str, description: str, quantity: int):
+        self.reserve_product_id(product_id)
+        category_id = self._category_id(category_name, description)
+        if self.shard_by == "category" and self._index_products([(product_id, category_id)]):
+            raise sqlite3.IntegrityError("UNIQUE constraint failed: products.id")
+        try:
+            self._shard_for(product_id, category_id).db.execute(
+                f"INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?)", (product_id, name, price, quantity, category_id))
+        except Exception:
+            self._unindex_products([product_id])
+            raise
+
+    def add_products_bulk(self, rows: Iterable[dict], chunk_size: int = 1000) -> dict:
+        """Inventory.add_products_bulk, with each chunk split by shard and the shards written in parallel."""
+        inserted = 0
+        errors = []
+        chunk = []
+
+        def flush():
+            nonlocal inserted
+            categories = self._category_ids({record[4]: record[5] for _, record in reversed(chunk)})
+            # Move the sequence past the chunk's own P###### ids before generating any (see Inventory._insert_chunk).
+            prefix = self.PRODUCT_ID_PREFIX
+            explicit = [int(record[0][len(prefix):]) for _, record in chunk
+                        if record[0] and record[0].startswith(prefix) and record[0][len(prefix):].isdigit()]
+            if explicit:
+                self.product_ids.advance_to(max(explicit))
+            generated = iter(self.next_product_ids(sum(1 for _, record in chunk if record[0] is None)))
+            records = [(index, (record[0] or next(generated),) + record[1:]) for index, record in chunk]
+            if self.shard_by == "category":
+                taken = set(self._index_products([(record[0], categories[record[4]]) for _, record in records]))
+                errors.extend({"row": records[position][0], "error": "UNIQUE constraint failed: products.id"}
+                              for position in sorted(taken))
+                records = [entry for position, entry in enumerate(records) if position not in taken]
+            by_shard = {}
+            for index, record in records:
+                by_shard.setdefault(self._shard_for(record[0], categories[record[4]]), []).append((index, record))
+            failed_before = {error["row"] for error in errors}
+            inserted += sum(self._scatter(lambda shard: shard._insert_chunk(by_shard[shard], categories, errors),
+                                          by_shard))
+            failed = {error["row"] for error in errors} - failed_before
+            self._unindex_products([record[0] for index, record in records if index in failed])
+
+        for index, row in enumerate(rows):
+            try:
+                chunk.append((index, self._bulk_record(row)))
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append({"row": index, "error": str(e)})
+            if len(chunk) >= chunk_size:
+                flush()
+                chunk = []
+        if chunk:
+            flush()
+        errors.sort(key=lambda error: error["row"])
+        return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+    def _product_shards(self, product_id: str) -> list:
+        """The shard holding the product (a list, empty when routing by category and it does not exist)."""
+        if self.shard_by == "id":
+            return [self._shard_for(product_id)]
+        return list(self._locate([product_id]).values())
+
+    def update_product(self, product_id: str, price: float = None, quantity: int = None):
+        self._scatter(lambda shard: shard.update_product(product_id, price, quantity), self._product_shards(product_id))
+
+    def remove_product(self, product_id: str):
+        self._scatter(lambda shard: shard.remove_product(product_id), self._product_shards(product_id))
+        self._unindex_products([product_id])
+
+    def adjust_stock_batch(self, deltas: dict) -> dict:
+        """Apply {product_id: delta} shard by shard; if one shard fails, the shards already done are reverted."""
+        deltas = {product_id: int(delta) for product_id, delta in deltas.items()}
+        applied, quantities = [], {}
+        try:
+            for index, items in self._group(deltas).items():
+                quantities.update(self.shards[index].adjust_stock_batch(items))
+                applied.append((index, items))
+        except Exception:
+            for index, items in applied:
+                self.shards[index].adjust_stock_batch({product_id: -delta for product_id, delta in items.items()})
+            raise
+        self._products_changed(quantities)
+        return quantities
+
+    # -- reservations ------------------------------------------------------
+
+    def reserve_stock(self, items: dict) -> int:
+        """Inventory.reserve_stock; the reservation id comes from the directory and is shared by every shard involved."""
+        for product_id, quantity in items.items():
+            if int(quantity) <= 0:
+                raise ValueError(f"Reserved quantity for product {product_id} must be positive.")
+        reservation_id = self.reservation_ids.next_value()
+        done = []
+        try:
+            for index, shard_items in self._group(items).items():
+                with self.shards[index].db.transaction() as conn:
+                    conn.execute("INSERT INTO reservations (id, created_at) VALUES (?, ?)", (reservation_id, time.time()))
+                    for product_id, quantity in shard_items.items():
+                        Inventory._apply_stock_delta(conn, product_id, -int(quantity))
+                    conn.executemany("INSERT INTO reservation_items (reservation_id, product_id, quantity) VALUES (?, ?, ?)",
+                                     [(reservation_id, product_id, int(quantity)) for product_id, quantity in shard_items.items()])
+                done.append(self.shards[index])
+        except Exception:
+            for shard in done:
+                shard.release_reservation(reservation_id)
+            raise
+        self._products_changed(items)
+        return reservation_id
+
+    def commit_reservation(self, reservation_id: int) -> bool:
+        return any(self._scatter(lambda shard: shard.commit_reservation(reservation_id)))
+
+    def release_reservation(self, reservation_id: int) -> bool:
+        return any(self._scatter(lambda shard: shard.release_reservation(reservation_id)))
+
+    def release_expired_reservations(self, max_age: float) -> int:
+        expired = set()
+        for rows in self._scatter(lambda shard: shard.db.fetchall(
+                "SELECT id FROM reservations WHERE status = 'reserved' AND created_at < ?", (time.time() - max_age,))):
+            expired.update(row["id"] for row in rows)
+        return sum(self.release_reservation(reservation_id) for reservation_id in expired)
+
+    def get_reservation(self, reservation_id: int):
+        parts = [part for part in self._scatter(lambda shard: shard.get_reservation(reservation_id)) if part]
+        if not parts:
+            return None
+        reservation = parts[0]
+        reservation["items"] = [item for part in parts for item in part["items"]]
+        return reservation
+
+    # -- product reads -----------------------------------------------------
+
+    def get_product(self, product_id: str):
+        for product in self._scatter(lambda shard: shard.get_product(product_id), self._product_shards(product_id)):
+            if product:
+                return product
+        return None
+
+    def get_all_products(self):
+        return [product for products in self._scatter(lambda shard: shard.get_all_products()) for product in products]
+
+    def get_products_page(self, limit: int, after: str = None):
+        pages = self._scatter(lambda shard: shard.get_products_page(limit, after))
+        return list(heapq.merge(*pages, key=lambda product: product["id"]))[:limit]
+
+    def iter_products(self, batch_size: int = 500) -> Iterator[dict]:
+        return heapq.merge(*(shard.iter_products(batch_size) for shard in self.shards), key=lambda product: product["id"])
+
+    def _category_scope(self, category_name: str) -> list:
+        """The shards that can hold products of the category."""
+        if self.shard_by == "category" and category_name is not None:
+            category = self.get_category(category_name)
+            return [self._category_shard(category["id"])] if category else []
+        return self.shards
+
+    def get_products_by_category(self, category_name: str):
+        shards = self._category_scope(category_name)
+        return [p for products in self._scatter(lambda shard: shard.get_products_by_category(category_name), shards)
+                for p in products] if shards else []
+
+    def filter_products(self, category: str = None, min_price: float = None, max_price: float = None,
+                        min_quantity: int = None, max_quantity: int = None) -> list:
+        shards = self._category_scope(category)
+        if not shards:
+            return []
+        return [p for products in self._scatter(lambda shard: shard.filter_products(
+            category, min_price, max_price, min_quantity, max_quantity), shards) for p in products]
+
+    def search_products(self, query: str = None, category: str = None, min_price: float = None,
+                        max_price: float = None, in_stock: bool = False, limit: int = 50, offset: int = 0,
+                        facets: bool = True, rank: bool = True) -> dict:
+        """
+        Inventory.search_products over every shard. Each shard returns its first offset+limit
+        matches; ranked text matches are interleaved shard by shard (relevance is scored per
+        shard), everything else is merged by id.
+        """
+        # Facets ignore the category filter, so they need every shard.
+        shards = self.shards if facets else self._category_scope(category)
+        results = self._scatter(lambda shard: shard.search_products(
+            query, category, min_price, max_price, in_stock, offset + limit, 0, facets, rank), shards)
+        lists = [result["items"] for result in results]
+        if rank and query and any(c.isalnum() for c in query):
+            merged = [item for group in zip_longest(*lists) for item in group if item is not None]
+        else:
+            merged = list(heapq.merge(*lists, key=lambda product: product["id"]))
+        facet_counts = {}
+        for result in results:
+            for name, count in result["facets"].items():
+                facet_counts[name] = facet_counts.get(name, 0) + count
+        return {"items": merged[offset:offset + limit], "facets": facet_counts}
+
+    def rebuild_search_index(self):
+        self._scatter(lambda shard: shard.rebuild_search_index())
+
+    # -- counts ------------------------------------------------------------
+
+    def product_counts(self) -> List[int]:
+        """Number of products on each shard, from the shards' summary tables."""
+        return [row["count"] for row in self._scatter(lambda shard: shard.db.fetchone(
+            "SELECT IFNULL(SUM(product_count), 0) AS count FROM category_stats"))]
+
+    def summary(self) -> dict:
+        """Catalog-wide product count, units, stock value and out-of-stock count, summed over the shards."""
+        rows = self._scatter(lambda shard: shard.db.fetchone(
+            "SELECT IFNULL(SUM(product_count), 0) AS products, IFNULL(SUM(total_quantity), 0) AS total_quantity, "
+            "TOTAL(stock_value) AS stock_value, IFNULL(SUM(out_of_stock), 0) AS out_of_stock FROM category_stats"))
+        totals = {key: sum(row[key] for row in rows) for key in rows[0]}
+        totals["stock_value"] = round(totals["stock_value"], 2)
+        totals["categories"] = self.db.fetchone("SELECT COUNT(*) AS count FROM categories")["count"]
+        return totals
+
+    def __str__(self):
+        totals = self.summary()
+        return (f"Inventory with {totals['products']} products and {totals['categories']} categories "
+                f"on {self.shard_count} shards.")
+
+
+# -- maintenance --------------------------------------------------------------
+
+
+def _move_products(conn: sqlite3.Connection, target_path: str, where: str, params=(), observer=None) -> int:
+    """
+    Move the products matching where from conn's shard into the shard at target_path, with
+    their reservation items and the reservations those belong to; returns how many products.
+    A reservation spanning products on both shards ends up with a row on each, like one
+    made across shards by ShardedInventory.reserve_stock. observer is the source shard's
+    Database.query_observer, which gets the move's duration as "transaction _move_products".
+    """
+    moving = f"SELECT id FROM main.products WHERE {where}"
+    start = time.perf_counter()
+    conn.execute("ATTACH DATABASE ? AS target", (target_path,))
+    try:
+        # One transaction over both files; the shards' triggers keep their summaries and indexes
+        # current. In WAL mode the commit is atomic per file only, so a crash can leave rows
+        # copied but not yet deleted: rows already in the target are skipped, and running the
+        # same move again finishes it.
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO target.reservations (id, status, created_at) "
+                         "SELECT id, status, created_at FROM main.reservations WHERE id IN "
+                         f"(SELECT reservation_id FROM main.reservation_items WHERE product_id IN ({moving}))", params)
+            conn.execute("INSERT OR IGNORE INTO target.reservation_items (reservation_id, product_id, quantity) "
+                         "SELECT reservation_id, product_id, quantity FROM main.reservation_items "
+                         f"WHERE product_id IN ({moving})", params)
+            conn.execute("DELETE FROM main.reservations WHERE id IN "
+                         f"(SELECT reservation_id FROM main.reservation_items WHERE product_id IN ({moving})) "
+                         "AND NOT EXISTS (SELECT 1 FROM main.reservation_items AS i WHERE i.reservation_id = reservations.id "
+                         f"AND i.product_id NOT IN ({moving}))", params * 2)
+            conn.execute(f"DELETE FROM main.reservation_items WHERE product_id IN ({moving})", params)
+            conn.execute(f"INSERT OR IGNORE INTO target.products ({PRODUCT_COLUMNS}) "
+                         f"SELECT {PRODUCT_COLUMNS} FROM main.products WHERE {where}", params)
+            return conn.execute(f"DELETE FROM main.products WHERE {where}", params).rowcount
+    finally:
+        conn.execute("DETACH DATABASE target")
+        if observer is not None:
+            observer("transaction _move_products", time.perf_counter() - start, 0)
+
+
+def rebalance(inventory: ShardedInventory, tolerance: float = 0.1) -> List[dict]:
+    """
+    Even out products per shard of a catalog sharded by category, moving whole categories
+    from the fullest to the emptiest shard while that narrows the gap by more than
+    tolerance of the average load. Products take their reservation items along. Returns
+    the moves made.
+    """
+    if inventory.shard_by != "category":
+        raise ValueError("rebalance applies to catalogs sharded by category; use reshard for id sharding.")
+    sizes = {}
+    for index, shard in enumerate(inventory.shards):
+        for row in shard.db.fetchall("SELECT category_id, product_count FROM category_stats WHERE product_count > 0"):
+            sizes[row["category_id"]] = (index, row["product_count"])
+    loads = [0] * inventory.shard_count
+    for index, count in sizes.values():
+        loads[index] += count
+    average = sum(loads) / inventory.shard_count
+    moves = []
+    while True:
+        fullest = max(range(inventory.shard_count), key=loads.__getitem__)
+        emptiest = min(range(inventory.shard_count), key=loads.__getitem__)
+        gap = loads[fullest] - loads[emptiest]
+        # The category whose move leaves the smallest gap between the two shards.
+        candidates = [(abs(gap - 2 * count), category_id, count) for category_id, (index, count) in sizes.items()
+                      if index == fullest and 0 < count < gap]
+        if not candidates:
+            break
+        new_gap, category_id, count = min(candidates)
+        if gap - new_gap <= tolerance * average:
+            break
+        # Recorded first, so that a crash between the move and the map update is finished on the next open.
+        inventory.db.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('rebalance_move', ?)",
+                             (f"{category_id}:{fullest}:{emptiest}",))
+        source = inventory.shards[fullest].db
+        with source.connection() as conn:
+            moved = _move_products(conn, shard_path(inventory.root, emptiest), "category_id = ?", (category_id,),
+                                   source.query_observer)
+        inventory._assign_category(category_id, emptiest)
+        sizes[category_id] = (emptiest, count)
+        loads[fullest] -= count
+        loads[emptiest] += count
+        moves.append({"category_id": category_id, "products": moved, "from": fullest, "to": emptiest})
+        logging.info("Moved category %s (%d products) from shard %d to shard %d", category_id, moved, fullest, emptiest)
+    return moves
+
+
+def reshard(root: str, shard_count: int, **db_options) -> List[int]:
+    """
+    Change the number of shards of a catalog sharded by id, moving every product (and its
+    reservation items) whose hash now maps to another shard. Shard files beyond the new
+    count are left empty and removed. Returns the new product count per shard.
+
+    The target count is recorded in the directory before anything moves and cleared when
+    the new layout is in place; until then the catalog refuses to open, and running
+    reshard again with the same count resumes the interrupted one.
+    """
+    with DirectoryStore(os.path.join(root, "directory.db"), **db_options) as directory:
+        stored = {row["name"]: row["value"] for row in directory.fetchall(
+            "SELECT name, value FROM settings WHERE name IN ('shard_count', 'shard_by', 'reshard_to')")}
+        if stored.get("shard_by") != "id":
+            raise ValueError("reshard applies to catalogs sharded by id; use rebalance for category sharding.")
+        if "reshard_to" in stored and int(stored["reshard_to"]) != shard_count:
+            raise ValueError(f"A reshard to {stored['reshard_to']} shards was interrupted; finish it first.")
+        old_count = int(stored["shard_count"])
+        categories = directory.fetchall("SELECT id, name, description FROM categories")
+        directory.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('reshard_to', ?)", (shard_count,))
+    for index in range(old_count, shard_count):
+        with Database(shard_path(root, index), **db_options) as shard:
+            with shard.transaction() as conn:
+                conn.executemany("INSERT OR IGNORE INTO categories (id, name, description) VALUES (?, ?, ?)",
+                                 [(c["id"], c["name"], c["description"]) for c in categories])
+    # A resumed run finds products on any of the old and new shards; every move is idempotent.
+    for source_index in range(max(old_count, shard_count)):
+        with Database(shard_path(root, source_index), **db_options) as source:
+            with source.connection() as conn:
+                conn.create_function("shard_of", 1, lambda product_id: hash_shard(product_id, shard_count),
+                                     deterministic=True)
+                for target_index in range(shard_count):
+                    if target_index != source_index:
+                        _move_products(conn, shard_path(root, target_index), "shard_of(id) = ?", (target_index,))
+    for index in range(shard_count, old_count):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(shard_path(root, index) + suffix):
+                os.remove(shard_path(root, index) + suffix)
+    with DirectoryStore(os.path.join(root, "directory.db"), **db_options) as directory:
+        with directory.transaction() as conn:
+            conn.execute("UPDATE settings SET value = ? WHERE name = 'shard_count'", (shard_count,))
+            conn.execute("DELETE FROM settings WHERE name = 'reshard_to'")
+    with ShardedInventory(root, **db_options) as inventory:
+        return inventory.product_counts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("status", "rebalance", "reshard"))
+    parser.add_argument("--dir", required=True, help="directory of the sharded catalog")
+    parser.add_argument("--shards", type=int, help="reshard: the new number of shards")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="rebalance: smallest worthwhile improvement")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.command == "reshard":
+        if not args.shards:
+            parser.error("reshard needs --shards")
+        print(f"products per shard: {reshard(args.dir, args.shards)}")
+        return
+    with ShardedInventory(args.dir) as inventory:
+        if args.command == "rebalance":
+            print(f"{len(rebalance(inventory, args.tolerance))} categories moved")
+        print(f"{inventory}\nproducts per shard: {inventory.product_counts()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+In-process columnar snapshot of the catalog for read-mostly workloads.
+
+Products are held in parallel column arrays instead of one dict per row: prices and
+quantities in ``array`` columns, category ids pointing at interned category names, and
+each product's ``{"id": ..., "name": ...`` JSON prefix pre-encoded into one shared byte
+buffer. Listings and range filters scan the columns and serialize straight from them,
+without building a ``sqlite3.Row`` or dict per product.
+
+The snapshot follows the ``changes`` log (migration 6): every read first applies the
+rows changed since the last one, so it sees writes from any connection or process,
+including raw SQL. It falls back to a full reload when retention has trimmed the log
+past its position or when a large part of the catalog changed.
+"""
+import json
+import sys
+import threading
+import time
+from array import array
+
+from models import Database
+
+HEAD_PREFIX = b'{"id":'
+INF = float("inf")
+REFRESH_CHUNK = 500
+
+
+class CatalogSnapshot:
+    def __init__(self, db: Database, max_staleness: float = 0.0, reload_ratio: float = 0.25):
+        self.db = db
+        # Reads within max_staleness seconds of the last refresh skip checking the change log.
+        self.max_staleness = max_staleness
+        # A refresh touching more than this fraction of the rows reloads everything instead.
+        self.reload_ratio = reload_ratio
+        self.seq = 0
+        self.reloads = 0
+        self._checked_at = float("-inf")
+        self._lock = threading.RLock()
+        with self._lock:
+            self.reload()
+
+    # -- maintenance -------------------------------------------------------
+
+    def _reset(self):
+        self._ids = []                  # product id per row, None for a free row
+        self._index = {}                # product id -> row
+        self._free = []                 # rows of deleted products, reused by inserts
+        self._heads = bytearray()       # b'{"id":"P1","name":"Laptop"' per row
+        self._live_bytes = 0
+        self._head_start = array("Q")
+        self._head_len = array("I")
+        self._name_offset = array("I")  # where the name's opening quote starts within the row's head
+        self._price = array("d")
+        self._quantity = array("q")
+        self._category = array("i")     # category id, 0 for none
+        self._by_category = {}          # category id -> array of its rows
+        self._categories = {}           # category id -> interned name
+        self._category_ids = {}         # name -> category id
+        self._category_json = {0: b"null"}
+        self._json_cache = {}           # serialized unfiltered listings, dropped on every change
+
+    def reload(self):
+        """Rebuild the whole snapshot from one consistent read of the database."""
+        with self._lock, self.db.transaction() as conn:
+            conn.execute("BEGIN")
+            self._reset()
+            self.seq = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM changes").fetchone()[0]
+            for category_id, name in conn.execute("SELECT id, name FROM categories"):
+                self._set_category(category_id, name)
+            for row in conn.execute("SELECT id, name, price, quantity, IFNULL(category_id, 0) FROM products"):
+                self._set_product(*row)
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+
+    def refresh(self):
+        """Apply every logged change since the last refresh."""
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.max_staleness:
+                return
+            if not self._apply_changes():
+                self.reload()
+            self._checked_at = time.monotonic()
+
+    def _apply_changes(self) -> bool:
+        """Apply the logged changes incrementally; False when a full reload is needed instead."""
+        with self.db.transaction() as conn:
+            conn.execute("BEGIN")
+            last = conn.execute("SELECT MAX(seq) FROM changes WHERE seq > ?", (self.seq,)).fetchone()[0]
+            if last is None:
+                return True
+            trimmed = conn.execute("SELECT value FROM settings WHERE name = 'changes_trimmed_seq'").fetchone()[0]
+            if trimmed > self.seq or last - self.seq > self.reload_ratio * max(len(self._index), 1000):
+                return False
+            changed = {"products": set(), "categories": set()}
+            for table, row_id in conn.execute("SELECT table_name, row_id FROM changes WHERE seq > ? AND seq <= ?",
+                                              (self.seq, last)):
+                changed[table].add(row_id)
+            self._apply_categories(conn, changed["categories"])
+            self._apply_products(conn, changed["products"])
+            self._json_cache.clear()
+            self.seq = last
+        # Updated names leave their old bytes behind; start over once most of the buffer is garbage.
+        return len(self._heads) <= 2 * self._live_bytes + (1 << 20)
+
+    def _apply_categories(self, conn, category_ids: set):
+        found = set()
+        for chunk in _chunks(list(category_ids)):
+            for category_id, name in conn.execute(
+                    f"SELECT id, name FROM categories WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                self._set_category(category_id, name)
+                found.add(category_id)
+        for category_id in category_ids - found:
+            name = self._categories.pop(category_id, None)
+            self._category_json.pop(category_id, None)
+            if name is not None and self._category_ids.get(name) == category_id:
+                del self._category_ids[name]
+
+    def _apply_products(self, conn, product_ids: set):
+        found = set()
+        for chunk in _chunks(list(product_ids)):
+            for row in conn.execute(f"SELECT id, name, price, quantity, IFNULL(category_id, 0) FROM products "
+                                    f"WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                self._set_product(*row)
+                found.add(row[0])
+        for product_id in product_ids - found:
+            row = self._index.pop(product_id, None)
+            if row is not None:
+                self._live_bytes -= self._head_len[row]
+                self._by_category[self._category[row]].remove(row)
+                self._ids[row] = None
+                self._free.append(row)
+
+    def _set_category(self, category_id: int, name: str):
+        name = sys.intern(name)
+        previous = self._categories.get(category_id)
+        if previous is not None and self._category_ids.get(previous) == category_id:
+            del self._category_ids[previous]
+        self._categories[category_id] = name
+        self._category_ids[name] = category_id
+        self._category_json[category_id] = json.dumps(name, ensure_ascii=False).encode()
+
+    def _set_product(self, product_id: str, name: str, price: float, quantity: int, category_id: int):
+        id_json = json.dumps(product_id, ensure_ascii=False).encode()
+        head = b'%s%s,"name":%s' % (HEAD_PREFIX, id_json, json.dumps(name, ensure_ascii=False).encode())
+        row = self._index.get(product_id)
+        if row is None:
+            row = self._free.pop() if self._free else len(self._ids)
+            if row == len(self._ids):
+                self._ids.append(None)
+                for column in (self._head_start, self._head_len, self._name_offset, self._price, self._quantity, self._category):
+                    column.append(0)
+        else:
+            if self._category[row] != category_id:
+                self._by_category[self._category[row]].remove(row)
+            start = self._head_start[row]
+            if self._heads[start:start + self._head_len[row]] == head:
+                # Stock and price updates leave the encoded id and name as they are.
+                head = None
+            else:
+                self._live_bytes -= self._head_len[row]
+        if self._ids[row] is None or self._category[row] != category_id:
+            self._by_category.setdefault(category_id, array("I")).append(row)
+        if head is not None:
+            self._head_start[row] = len(self._heads)
+            self._head_len[row] = len(head)
+            self._name_offset[row] = len(HEAD_PREFIX) + len(id_json) + len(',"name":')
+            self._heads += head
+            self._live_bytes += len(head)
+        self._ids[row] = product_id
+        self._index[product_id] = row
+        self._price[row] = float(price)
+        self._quantity[row] = int(quantity)
+        self._category[row] = category_id
+
+    # -- reads -------------------------------------------------------------
+
+    def select(self, category: str = None, min_price: float = None, max_price: float = None,
+               min_quantity: int = None, max_quantity: int = None) -> list:
+        """Rows of the products matching every given bound (inclusive), in snapshot order."""
+        self.refresh()
+        return self._select(category, min_price, max_price, min_quantity, max_quantity)
+
+    def _select(self, category=None, min_price=None, max_price=None, min_quantity=None, max_quantity=None) -> list:
+        with self._lock:
+            if category is not None:
+                rows = self._by_category.get(self._category_ids.get(category), ())
+            elif self._free:
+                rows = [row for row, product_id in enumerate(self._ids) if product_id is not None]
+            else:
+                rows = range(len(self._ids))
+            if min_price is not None or max_price is not None:
+                low, high, price = _bound(min_price, -INF), _bound(max_price, INF), self._price
+                rows = [row for row in rows if low <= price[row] <= high]
+            if min_quantity is not None or max_quantity is not None:
+                low, high, quantity = _bound(min_quantity, -INF), _bound(max_quantity, INF), self._quantity
+                rows = [row for row in rows if low <= quantity[row] <= high]
+            return list(rows)
+
+    def _name(self, row: int) -> str:
+        start = self._head_start[row] + self._name_offset[row]
+        encoded = self._heads[start:self._head_start[row] + self._head_len[row]]
+        if b"\\" in encoded:
+            return json.loads(encoded)
+        return encoded[1:-1].decode()
+
+    def records(self, rows: list, with_category: bool = True) -> list:
+        """The given rows as dicts shaped like Inventory.get_all_products (or get_products_by_category) rows."""
+        with self._lock:
+            ids, price, quantity, category, names = self._ids, self._price, self._quantity, self._category, self._categories
+            if with_category:
+                return [{"id": ids[row], "name": self._name(row), "price": price[row], "quantity": quantity[row],
+                         "category": names.get(category[row])} for row in rows]
+            return [{"id": ids[row], "name": self._name(row), "price": price[row], "quantity": quantity[row]}
+                    for row in rows]
+
+    def json(self, rows: list, with_category: bool = True) -> bytes:
+        """The given rows as a JSON array, written directly from the columns into one buffer."""
+        out = bytearray(b"[")
+        with self._lock:
+            heads, start, length = self._heads, self._head_start, self._head_len
+            price, quantity = self._price, self._quantity
+            if with_category:
+                category, category_json = self._category, self._category_json
+                for row in rows:
+                    out += b'%s,"price":%r,"quantity":%d,"category":%s},' % (
+                        heads[start[row]:start[row] + length[row]], price[row], quantity[row], category_json[category[row]])
+            else:
+                for row in rows:
+                    out += b'%s,"price":%r,"quantity":%d},' % (
+                        heads[start[row]:start[row] + length[row]], price[row], quantity[row])
+        if len(out) > 1:
+            out[-1:] = b"]"
+        else:
+            out += b"]"
+        return bytes(out)
+
+    def _cached_json(self, key, rows_and_flag) -> bytes:
+        with self._lock:
+            cached = self._json_cache.get(key)
+            if cached is None:
+                rows, with_category = rows_and_flag()
+                cached = self._json_cache[key] = self.json(rows, with_category)
+            return cached
+
+    def products_json(self) -> bytes:
+        """get_all_products as JSON; reused until the next change."""
+        self.refresh()
+        return self._cached_json("products", lambda: (self._select(), True))
+
+    def category_products_json(self, category_name: str) -> bytes:
+        """get_products_by_category as JSON; reused until the next change."""
+        self.refresh()
+        return self._cached_json(("category", category_name), lambda: (self._select(category_name), False))
+
+    def get_all_products(self) -> list:
+        return self.records(self.select())
+
+    def get_products_by_category(self, category_name: str) -> list:
+        return self.records(self.select(category=category_name), with_category=False)
+
+    def filter_products(self, **bounds) -> list:
+        return self.records(self.select(**bounds))
+
+    def compact(self):
+        """Reclaim the byte buffer space and free rows left behind by updates and deletes."""
+        self.reload()
+
+    def stats(self) -> dict:
+        with self._lock:
+            columns = (self._head_start, self._head_len, self._name_offset, self._price, self._quantity, self._category,
+                       *self._by_category.values())
+            size = (sys.getsizeof(self._heads) + sum(sys.getsizeof(column) for column in columns)
+                    + sys.getsizeof(self._ids) + sys.getsizeof(self._index)
+                    + sum(sys.getsizeof(product_id) for product_id in self._index))
+            return {"products": len(self._index), "categories": len(self._categories), "seq": self.seq,
+                    "reloads": self.reloads, "bytes": size,
+                    "bytes_per_product": round(size / len(self._index), 1) if self._index else 0.0}
+
+
+def _bound(value, default: float) -> float:
+    return default if value is None else value
+
+
+def _chunks(values: list, size: int = REFRESH_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
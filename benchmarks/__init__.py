@@ -0,0 +1,10 @@
+"""Performance benchmarks for the inventory API.
+
+Run a benchmark from the repository root, e.g. ``python -m benchmarks.bench_connections``.
+"""
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,112 @@
+"""
+Benchmark suite runner.
+
+Generates (once, cached in --data-dir) a synthetic catalog of --scale products, runs the
+micro-benchmarks and the HTTP benchmarks against a fresh copy of it, and writes the
+results as JSON. With --compare, the results are checked against an earlier run and the
+exit status is 1 if any benchmark's p50 latency regressed by more than --tolerance.
+
+    python -m benchmarks run --scale 100000 --output results.json
+    python -m benchmarks run --scale 100000 --compare baseline.json
+    python -m benchmarks compare baseline.json results.json --tolerance 0.15
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+
+os.environ.setdefault("INVENTORY_DB", os.path.join(tempfile.gettempdir(), "inventory_bench.db"))
+from benchmarks import datagen, e2e, micro, report  # noqa: E402
+
+SUITES = ("micro", "client", "server")
+
+
+def dataset(data_dir: str, scale: int, categories: int) -> str:
+    """Path of the cached catalog for this scale, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"catalog-{scale}-{categories}.db")
+    if not os.path.exists(path):
+        print(f"generating {scale} products into {path} ...", file=sys.stderr)
+        start = time.perf_counter()
+        partial = path + ".partial"
+        datagen.populate(partial, scale, categories).close()
+        os.replace(partial, path)
+        print(f"generated in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return path
+
+
+def scratch_copy(source: str, directory: str, name: str) -> str:
+    path = os.path.join(directory, name)
+    shutil.copyfile(source, path)
+    return path
+
+
+def run(args) -> int:
+    source = dataset(args.data_dir, args.scale, args.categories)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if "micro" in args.suites:
+            results.update(micro.run(scratch_copy(source, tmp, "micro.db"), args.scale, args.categories,
+                                     args.min_time, args.only))
+        if "client" in args.suites:
+            results.update(e2e.run_client(scratch_copy(source, tmp, "client.db"), args.scale, args.categories,
+                                          args.min_time, args.only))
+        if "server" in args.suites:
+            results.update(e2e.run_server(scratch_copy(source, tmp, "server.db"), args.scale, args.server_mode,
+                                          args.concurrency, args.duration))
+    report.print_results(results)
+
+    meta = report.metadata(scale=args.scale, categories=args.categories, suites=list(args.suites))
+    if args.output:
+        report.save(args.output, results, meta)
+    if args.compare:
+        rows = report.compare(report.load(args.compare), {"meta": meta, "results": results}, args.tolerance)
+        print()
+        report.print_comparison(rows)
+        return 1 if any(row["regressed"] for row in rows) else 0
+    return 0
+
+
+def compare(args) -> int:
+    rows = report.compare(report.load(args.baseline), report.load(args.current), args.tolerance, args.metric)
+    report.print_comparison(rows, args.metric)
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite")
+    run_parser.add_argument("--scale", type=int, default=10000, help="number of products (10k-10M)")
+    run_parser.add_argument("--categories", type=int, default=100)
+    run_parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    run_parser.add_argument("--only", help="only run benchmarks whose name contains this string")
+    run_parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent on each benchmark")
+    run_parser.add_argument("--server-mode", choices=("flask", "asgi"), default="flask")
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    run_parser.add_argument("--duration", type=float, default=3.0, help="seconds per server load level")
+    run_parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "inventory_benchmarks"))
+    run_parser.add_argument("--output", help="write the results to this JSON file")
+    run_parser.add_argument("--compare", help="baseline JSON file to check the results against")
+    run_parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown, e.g. 0.10 = 10%%")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10)
+    compare_parser.add_argument("--metric", choices=("p50_us", "p99_us", "mean_us"), default="p50_us")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Throughput of bulk product import compared with one add_product call per row.
+
+Every path inserts the same rows into a fresh database. The "upkeep" column keeps the
+derived tables (full-text index, category_stats, change log, table_versions) current as
+the app does; "no upkeep" drops the product insert triggers and skips the bulk path's
+per-chunk upkeep, which is the floor set by the products table and its indexes alone.
+"executemany, per-row triggers" is the bulk path before its upkeep moved to once per chunk.
+
+    python -m benchmarks.bench_bulk --rows 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+
+os.environ.setdefault("INVENTORY_DB", os.path.join(tempfile.gettempdir(), "inventory_bench.db"))
+import models  # noqa: E402
+import routes  # noqa: E402
+from models import Database, Inventory  # noqa: E402
+
+INSERT_TRIGGERS = ("products_fts_insert", "category_stats_product_insert", "products_changes_insert",
+                   "changes_table_version")
+
+
+def catalog(rows: int, categories: int = 50):
+    for i in range(rows):
+        yield {"name": f"Item {i}", "price": 1.0 + i % 500, "quantity": i % 100,
+               "category_name": f"Category {i % categories}", "description": "benchmark"}
+
+
+def fresh(path: str, upkeep: bool) -> Inventory:
+    inventory = Inventory(Database(path))
+    if not upkeep:
+        with inventory.db.transaction() as conn:
+            for trigger in INSERT_TRIGGERS:
+                conn.execute(f"DROP TRIGGER {trigger}")
+    return inventory
+
+
+def per_row(inventory: Inventory, rows: int):
+    for row in catalog(rows):
+        inventory.add_product(inventory.next_product_id(), row["name"], row["price"], row["category_name"],
+                              row["description"], row["quantity"])
+
+
+def per_row_triggers(inventory: Inventory, rows: int, chunk_size: int):
+    """Chunks of plain executemany, every derived table maintained by the row triggers."""
+    categories = {}
+    for name in {row["category_name"] for row in catalog(min(rows, 1000))}:
+        inventory.add_category(name, "benchmark")
+        categories[name] = inventory.get_category(name)["id"]
+    ids = iter(inventory.next_product_ids(rows))
+    params = [(next(ids), row["name"], row["price"], row["quantity"], categories[row["category_name"]])
+              for row in catalog(rows)]
+    for start in range(0, rows, chunk_size):
+        with inventory.db.transaction() as conn:
+            conn.executemany("INSERT INTO products (id, name, price, quantity, category_id) VALUES (?, ?, ?, ?, ?)",
+                             params[start:start + chunk_size])
+
+
+def bulk(inventory: Inventory, rows: int, chunk_size: int, upkeep: bool):
+    with mock.patch.object(models, "BULK_INSERT_UPKEEP", models.BULK_INSERT_UPKEEP if upkeep else []):
+        result = inventory.add_products_bulk(catalog(rows), chunk_size=chunk_size)
+    assert result["inserted"] == rows, result["errors"][:3]
+
+
+def http(inventory: Inventory, rows: int, upkeep: bool):
+    routes.db, routes.inventory = inventory.db, inventory
+    body = "\n".join(json.dumps(row) for row in catalog(rows))
+    with mock.patch.object(models, "BULK_INSERT_UPKEEP", models.BULK_INSERT_UPKEEP if upkeep else []):
+        resp = routes.app.test_client().post("/products/bulk", data=body, content_type="application/x-ndjson")
+    assert resp.status_code < 300, resp.get_data()
+
+
+def rate(path: str, upkeep: bool, rows: int, fn) -> float:
+    inventory = fresh(path, upkeep)
+    try:
+        start = time.perf_counter()
+        fn(inventory, upkeep)
+        return rows / (time.perf_counter() - start)
+    finally:
+        inventory.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="rows inserted by every path")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    rows, chunk_size = args.rows, args.chunk_size
+
+    paths = {
+        "add_product per row": lambda inventory, upkeep: per_row(inventory, rows),
+        "executemany, per-row triggers": lambda inventory, upkeep: per_row_triggers(inventory, rows, chunk_size),
+        "add_products_bulk": lambda inventory, upkeep: bulk(inventory, rows, chunk_size, upkeep),
+        "POST /products/bulk (NDJSON)": lambda inventory, upkeep: http(inventory, rows, upkeep),
+    }
+    print(f"rows/s inserting {rows} rows, chunk size {chunk_size}")
+    print(f"{'path':<34}{'upkeep':>12}{'no upkeep':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, (label, fn) in enumerate(paths.items()):
+            rates = [rate(os.path.join(tmp, f"{n}-{upkeep}.db"), upkeep, rows, fn) for upkeep in (True, False)]
+            print(f"{label:<34}" + "".join(f"{r:>12.0f}" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
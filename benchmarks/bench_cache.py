@@ -0,0 +1,46 @@
+"""Hot-key read latency of get_product/get_category with and without the read cache.
+
+    python -m benchmarks.bench_cache --reads 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from cache import CachedInventory, FileCache, LRUCache
+from models import Database, Inventory
+
+
+def latency_us(fn, reads: int) -> float:
+    start = time.perf_counter()
+    for _ in range(reads):
+        fn()
+    return (time.perf_counter() - start) / reads * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "cache.db"))
+        Inventory(db).add_products_bulk(
+            {"id": f"P{i:06d}", "name": f"Item {i}", "price": 1.0, "quantity": 1, "category_name": f"C{i % 10}"}
+            for i in range(10000))
+
+        print(f"{'inventory':<28}{'get_product us':>16}{'get_category us':>17}")
+        for label, inventory in (
+            ("Inventory (no cache)", Inventory(db)),
+            ("CachedInventory + LRUCache", CachedInventory(db, LRUCache())),
+            ("CachedInventory + FileCache", CachedInventory(db, FileCache(os.path.join(tmp, "shared.db")))),
+        ):
+            product = latency_us(lambda: inventory.get_product("P000042"), args.reads)
+            category = latency_us(lambda: inventory.get_category("C3"), args.reads)
+            print(f"{label:<28}{product:>16.1f}{category:>17.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Requests/sec of the Flask routes with and without connection pooling.
+
+    python -m benchmarks.bench_connections --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+
+os.environ.setdefault("INVENTORY_DB", os.path.join(tempfile.gettempdir(), "inventory_bench.db"))
+import routes  # noqa: E402
+from models import Database, Inventory  # noqa: E402
+
+
+def use_database(db: Database):
+    routes.db = db
+    routes.inventory = Inventory(db)
+
+
+def run(client, requests: int, method: str, path: str, payload=None):
+    start = time.perf_counter()
+    for _ in range(requests):
+        if method == "GET":
+            resp = client.get(path)
+        else:
+            resp = client.post(path, json=payload)
+        assert resp.status_code < 400, resp.get_data(as_text=True)
+    elapsed = time.perf_counter() - start
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=200)
+    args = parser.parse_args()
+
+    client = routes.app.test_client()
+    payload = {"name": "Widget", "price": 9.99, "quantity": 5, "category_name": "Bench", "description": "benchmark"}
+
+    print(f"{'mode':<30}{'GET /products/<id>':>20}{'GET /products':>16}{'POST /products':>16}")
+    for label, options in (
+        ("connection per call (before)", {"pool_size": 0, "journal_mode": "DELETE", "synchronous": "FULL"}),
+        ("pooled + WAL (after)", {}),
+    ):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bench.db"), **options)
+            use_database(db)
+            for i in range(args.products):
+                routes.inventory.add_product(f"B{i:06d}", f"Item {i}", 1.0 + i, "Bench", "benchmark", 10)
+
+            get_one = run(client, args.requests, "GET", "/products/B000001")
+            get_all = run(client, max(args.requests // 10, 1), "GET", "/products")
+            post = run(client, args.requests, "POST", "/products", payload)
+            print(f"{label:<30}{get_one:>17.0f}/s{get_all:>13.0f}/s{post:>13.0f}/s")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput and peak memory of the streaming exports, and writer latency during a hot backup.
+
+    python -m benchmarks.bench_export --products 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from benchmarks import datagen
+from benchmarks.report import percentile
+from export import FORMATS, backup, export_chunks
+from models import Inventory
+
+
+def traced(fn):
+    """(seconds, peak traced bytes, result) of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def writer_latencies(inventory, stop: threading.Event) -> list:
+    """Time stock adjustments in a loop until stop is set."""
+    timings = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        inventory.adjust_stock(datagen.product_id(len(timings) % 1000), 1)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--db", help="reuse (or create) this database file instead of a temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = datagen.populate(args.db or os.path.join(tmp, "export.db"), args.products)
+        inventory = Inventory(db)
+
+        elapsed, peak, _ = traced(lambda: json.dumps(inventory.get_all_products()).encode())
+        print(f"{'get_all_products + json.dumps':<32}{elapsed:>8.2f}s{peak / 2 ** 20:>10.1f} MiB peak")
+        for fmt in FORMATS:
+            elapsed, peak, size = traced(lambda: sum(len(chunk) for chunk in export_chunks(db, "products", fmt)))
+            print(f"{'export ' + fmt:<32}{elapsed:>8.2f}s{peak / 2 ** 20:>10.1f} MiB peak"
+                  f"{size / 2 ** 20:>10.1f} MiB{args.products / elapsed:>12.0f} rows/s")
+
+        for label, options in (("backup in one step", {"pages": -1}),
+                               ("backup 1024 pages/step", {"pages": 1024, "pause": 0.005})):
+            stop, result = threading.Event(), {}
+            writer = threading.Thread(target=lambda: result.update(timings=writer_latencies(inventory, stop)))
+            writer.start()
+            stats = backup(db, os.path.join(tmp, "backup.db"), **options)
+            stop.set()
+            writer.join()
+            timings = sorted(result["timings"])
+            print(f"{label:<32}{stats['seconds']:>8.2f}s  restarts {stats['restarts']}  writes {len(timings)}  "
+                  f"write p99 {percentile(timings, 0.99) * 1000:.1f} ms  max {timings[-1] * 1000:.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Write throughput of concurrent Database.execute calls against group-commit batch size.
+
+The last two rows use a single writer thread, as asgi.py does: every write waits for the
+previous one, so group commit only ever flushes batches of one.
+
+    python -m benchmarks.bench_group_commit --threads 32 --writes 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from models import Database
+
+
+def run(path: str, threads: int, writes: int, **options) -> float:
+    db = Database(path, synchronous="FULL", pool_size=threads, **options)
+
+    def writer(n: int):
+        for i in range(writes):
+            db.execute("INSERT INTO categories (name, description) VALUES (?, ?)", (f"{n}-{i}", "benchmark"))
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return threads * writes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=200, help="writes per thread")
+    parser.add_argument("--flush-interval", type=float, default=0.002)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128, 512])
+    args = parser.parse_args()
+
+    print("synchronous=FULL, one INSERT per execute() call")
+    print(f"{'mode':<32}{'writes/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = run(os.path.join(tmp, "baseline.db"), args.threads, args.writes)
+        print(f"{'commit per statement':<32}{baseline:>12.0f}")
+        for max_batch in args.batch_sizes:
+            throughput = run(os.path.join(tmp, f"group-{max_batch}.db"), args.threads, args.writes, group_commit=True,
+                             flush_interval=args.flush_interval, max_batch=max_batch)
+            print(f"{f'group commit, max_batch={max_batch}':<32}{throughput:>12.0f}")
+        single = args.threads * args.writes
+        baseline = run(os.path.join(tmp, "single.db"), 1, single)
+        print(f"{'one writer, commit per statement':<32}{baseline:>12.0f}")
+        throughput = run(os.path.join(tmp, "single-group.db"), 1, single, group_commit=True,
+                         flush_interval=args.flush_interval)
+        print(f"{'one writer, group commit':<32}{throughput:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Bytes and server time per poll of GET /products: full, compressed and conditional (304), and serializer cost.
+
+    python -m benchmarks.bench_httpcache --products 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from benchmarks import datagen
+from httpcache import TableVersions, compress, dumps, negotiate
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-repeat seconds for one call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["INVENTORY_DB"] = os.path.join(tmp, "routes.db")
+        import routes
+        from models import Inventory
+
+        db = datagen.populate(os.path.join(tmp, "httpcache.db"), args.products)
+        routes.inventory, routes.versions = Inventory(db), TableVersions(db)
+        client = routes.app.test_client()
+        etag = client.get("/products").headers["ETag"]
+
+        print(f"{'GET /products':<34}{'bytes':>12}{'ms':>10}")
+        for label, headers in (("identity", {}),
+                               ("gzip", {"Accept-Encoding": "gzip"}),
+                               ("zstd", {"Accept-Encoding": "zstd"}),
+                               ("If-None-Match (304)", {"If-None-Match": etag})):
+            if label == "zstd" and negotiate("zstd") is None:
+                print(f"{label:<34}{'(zstandard not installed)':>22}")
+                continue
+            size = len(client.get("/products", headers=headers).get_data())
+            elapsed = timed(lambda: client.get("/products", headers=headers).get_data(), args.repeat)
+            print(f"{label:<34}{size:>12}{elapsed * 1000:>10.2f}")
+        for label, ttl in (("304, validators from the db", 0), ("304, validators cached 1s", 1)):
+            routes.versions = TableVersions(db, max_staleness=ttl)
+            elapsed = timed(lambda: client.get("/products/P000001", headers={"If-None-Match": etag}), args.repeat * 100)
+            print(f"{label:<34}{'':>12}{elapsed * 1000:>10.3f}")
+
+        envelope = {"success": True, "message": "Products retrieved successfully", "data": routes.inventory.get_all_products()}
+        with routes.app.app_context():
+            for label, fn in (("flask.jsonify", lambda: routes.app.json.response(envelope).get_data()),
+                              ("json.dumps", lambda: json.dumps(envelope).encode()),
+                              ("httpcache.dumps", lambda: dumps(envelope)),
+                              ("gzip of the body", lambda: compress(dumps(envelope), "gzip"))):
+                print(f"{label:<34}{'':>12}{timed(fn, args.repeat) * 1000:>10.2f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
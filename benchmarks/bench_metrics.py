@@ -0,0 +1,66 @@
+"""Overhead of the instrumentation layer (INVENTORY_METRICS) on queries and routes.
+
+    python -m benchmarks.bench_metrics --requests 3000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from metrics import QueryTimer
+from models import Database, Inventory
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def route_benchmark(requests: int):
+    """Runs in a child process so the Flask app is built with or without metrics from the start."""
+    import routes
+
+    client = routes.app.test_client()
+    routes.inventory.add_product("M000001", "Item", 1.0, "Bench", "", 1)
+    per_request = per_call_us(lambda: client.get("/products/M000001"), requests)
+    print(f"{per_request:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return route_benchmark(args.requests)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "metrics.db"))
+        inventory = Inventory(db)
+        inventory.add_product("M000001", "Item", 1.0, "Bench", "", 1)
+        disabled = per_call_us(lambda: inventory.get_product("M000001"), args.requests * 5)
+        QueryTimer().install(db)
+        enabled = per_call_us(lambda: inventory.get_product("M000001"), args.requests * 5)
+        db.close()
+
+        print(f"{'':<34}{'disabled us':>12}{'enabled us':>12}{'overhead':>10}")
+        print(f"{'Inventory.get_product':<34}{disabled:>12.1f}{enabled:>12.1f}{(enabled / disabled - 1) * 100:>9.1f}%")
+
+        results = {}
+        for mode, flag in (("disabled", "0"), ("enabled", "1")):
+            env = dict(os.environ, INVENTORY_DB=os.path.join(tmp, f"routes-{mode}.db"), INVENTORY_METRICS=flag,
+                       INVENTORY_CACHE="none")
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_metrics", "--child",
+                                  "--requests", str(args.requests)], env=env, capture_output=True, text=True, check=True)
+            results[mode] = float(out.stdout.strip().splitlines()[-1])
+        overhead = (results["enabled"] / results["disabled"] - 1) * 100
+        print(f"{'GET /products/<id> (Flask)':<34}{results['disabled']:>12.1f}{results['enabled']:>12.1f}{overhead:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""GET throughput of routes.app against the number of worker processes, per read-connection mode.
+
+Every worker is a separate process serving GET /products/<id> and GET /products?limit=100
+through the Flask test client (no HTTP server, so the numbers are the app and the
+database alone), with the response cache off. Modes:
+
+* ``read-write`` -- reads share the writer's read-write connections (INVENTORY_READ_POOL=0);
+* ``read-only`` -- reads use mode=ro connections with a 1 GiB mmap;
+* ``immutable`` -- the same, opened immutable=1 (only valid because nothing writes).
+
+Throughput can only scale up to the number of cores; run it on a multi-core box.
+
+    python -m benchmarks.bench_read_replicas --products 100000 --workers 1 2 4 8 --duration 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from benchmarks import datagen
+
+MODES = {
+    "read-write": {"INVENTORY_READ_POOL": "0"},
+    "read-only": {"INVENTORY_READ_POOL": "8"},
+    "immutable": {"INVENTORY_READ_POOL": "8", "INVENTORY_IMMUTABLE": "1"},
+}
+
+
+def worker(path: str, env: dict, products: int, duration: float, start, results):
+    os.environ.update(env, INVENTORY_DB=path, INVENTORY_CACHE="none")
+    import routes
+
+    client = routes.app.test_client()
+    rng = random.Random(os.getpid())
+    start.wait()
+    requests, deadline = 0, time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        n = rng.randrange(products)
+        if requests % 10:
+            resp = client.get(f"/products/{datagen.product_id(n)}")
+        else:
+            resp = client.get(f"/products?limit=100&after={datagen.product_id(n)}")
+        assert resp.status_code == 200
+        requests += 1
+    results.put(requests)
+
+
+def run(path: str, mode: str, workers: int, products: int, duration: float) -> float:
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(path, MODES[mode], products, duration, start, results))
+                 for _ in range(workers)]
+    for p in processes:
+        p.start()
+    time.sleep(1 + 0.2 * workers)    # let every worker import the app before the clock starts
+    start.set()
+    total = sum(results.get() for _ in processes)
+    for p in processes:
+        p.join()
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement")
+    parser.add_argument("--db", help="reuse (or create) this database file instead of a temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "replicas.db")
+        datagen.populate(path, args.products).close()
+        print(f"{os.cpu_count()} CPUs, {args.products} products, GET requests/s summed over workers")
+        print(f"{'workers':<10}" + "".join(f"{mode:>14}" for mode in args.modes))
+        for workers in args.workers:
+            rates = [run(path, mode, workers, args.products, args.duration) for mode in args.modes]
+            print(f"{workers:<10}" + "".join(f"{rate:>14.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
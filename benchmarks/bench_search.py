@@ -0,0 +1,60 @@
+"""Latency of Inventory.search_products on a synthetic catalog.
+
+    python -m benchmarks.bench_search --products 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from benchmarks import datagen
+from models import Database, Inventory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--db", help="reuse (or create) this database file instead of a temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "search.db")
+        inventory = Inventory(Database(path))
+        if inventory.db.fetchone("SELECT COUNT(*) AS count FROM products")["count"] < args.products:
+            start = time.perf_counter()
+            inventory.add_products_bulk(datagen.products(args.products, args.categories), chunk_size=5000)
+            print(f"generated {args.products} products in {time.perf_counter() - start:.1f}s")
+
+        # One frequent word, a mid-frequency word, a rare word and a three-letter prefix.
+        words = datagen.vocabulary(20000)
+        cases = {
+            f"q={words[0]} (frequent)": {"query": words[0]},
+            f"q={words[200]} (mid)": {"query": words[200]},
+            f"q={words[5000]} (rare)": {"query": words[5000]},
+            f"q={words[200][:3]} (prefix)": {"query": words[200][:3]},
+            f"q={words[200]} + category": {"query": words[200], "category": "Category 7"},
+            f"q={words[200]} + price + stock": {"query": words[200], "min_price": 100, "max_price": 400, "in_stock": True},
+            f"q={words[0]}, no facets": {"query": words[0], "facets": False},
+            f"q={words[0]}, no facets/rank": {"query": words[0], "facets": False, "rank": False},
+            "category + price range": {"category": "Category 3", "min_price": 10, "max_price": 20},
+            "price range only": {"min_price": 500, "max_price": 501},
+        }
+        print(f"{'search':<34}{'mean ms':>10}{'p99 ms':>10}{'items':>8}{'facets':>8}")
+        for label, params in cases.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = inventory.search_products(limit=20, **params)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(f"{label:<34}{sum(timings) / len(timings) * 1000:>10.2f}"
+                  f"{timings[min(int(len(timings) * 0.99), len(timings) - 1)] * 1000:>10.2f}"
+                  f"{len(result['items']):>8}{len(result['facets']):>8}")
+        inventory.db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Write throughput against shard count, and the cost of scatter-gather reads.
+
+Each writer thread inserts its own products (one transaction each, synchronous=FULL),
+then adjusts the stock of products spread over every shard. With one shard every writer
+queues for the same write lock; with N, writers to different shards commit in parallel.
+
+    python -m benchmarks.bench_sharding --shards 1 2 4 8 --threads 16 --writes 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from benchmarks import datagen
+from sharding import ShardedInventory
+
+
+def timed_threads(threads: int, target) -> float:
+    workers = [threading.Thread(target=target, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - start
+
+
+def run(root: str, shard_count: int, shard_by: str, threads: int, writes: int) -> dict:
+    inventory = ShardedInventory(root, shard_count=shard_count, shard_by=shard_by,
+                                 synchronous="FULL", pool_size=threads)
+    names = datagen.categories(threads)
+    for name in names:
+        inventory.add_category(name, "benchmark")
+
+    def insert(n: int):
+        for i in range(writes):
+            inventory.add_product(datagen.product_id(n * writes + i), f"Product {i}", 1.0, names[n], "", 100)
+
+    def adjust(n: int):
+        for i in range(writes):
+            inventory.adjust_stock(datagen.product_id((n + i * threads) % (threads * writes)), -1)
+
+    result = {"insert": threads * writes / timed_threads(threads, insert),
+              "adjust": threads * writes / timed_threads(threads, adjust)}
+    start = time.perf_counter()
+    result["rows"] = len(inventory.get_all_products())
+    result["get_all_products"] = time.perf_counter() - start
+    start = time.perf_counter()
+    inventory.summary()
+    result["summary"] = time.perf_counter() - start
+    inventory.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shard-by", choices=("id", "category"), default="id")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200, help="writes per thread and phase")
+    args = parser.parse_args()
+
+    print(f"{args.threads} writer threads, synchronous=FULL, sharded by {args.shard_by}")
+    print(f"{'shards':<8}{'inserts/s':>12}{'adjusts/s':>12}{'get_all_products':>18}{'summary':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for shard_count in args.shards:
+            r = run(os.path.join(tmp, f"catalog-{shard_count}"), shard_count, args.shard_by, args.threads, args.writes)
+            print(f"{shard_count:<8}{r['insert']:>12.0f}{r['adjust']:>12.0f}"
+                  f"{r['get_all_products'] * 1000:>15.1f} ms{r['summary'] * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory per product and listing latency of the columnar CatalogSnapshot vs the SQL read path.
+
+    python -m benchmarks.bench_snapshot --products 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from benchmarks import datagen
+from models import Inventory
+from snapshot import CatalogSnapshot
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-repeat seconds for one call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def traced_bytes(fn):
+    tracemalloc.start()
+    result = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def traced_peak(fn):
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", help="reuse (or create) this database file instead of a temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = datagen.populate(args.db or os.path.join(tmp, "snapshot.db"), args.products)
+        inventory = Inventory(db)
+
+        rows, rows_bytes = traced_bytes(inventory.get_all_products)
+        snapshot, snapshot_bytes = traced_bytes(lambda: CatalogSnapshot(db))
+        count = len(rows)
+        del rows
+        print(f"memory per product: {rows_bytes / count:.0f} B as dicts, {snapshot_bytes / count:.0f} B in the snapshot")
+
+        _, sql_peak = traced_peak(lambda: json.dumps(inventory.get_all_products()).encode())
+        _, snapshot_peak = traced_peak(lambda: snapshot.json(snapshot.select()))
+        print(f"peak allocation serving the full listing: {sql_peak / count:.0f} B/product via SQL, "
+              f"{snapshot_peak / count:.0f} B/product from the snapshot")
+
+        category = "Category 3"
+        print(f"{'operation':<34}{'sql ms':>10}{'snapshot ms':>13}{'speedup':>9}")
+        for label, sql, columnar in (
+            ("get_all_products", inventory.get_all_products, snapshot.get_all_products),
+            ("get_all_products + JSON", lambda: json.dumps(inventory.get_all_products()).encode(),
+             lambda: snapshot.json(snapshot.select())),
+            ("get_all_products JSON, unchanged", lambda: json.dumps(inventory.get_all_products()).encode(),
+             snapshot.products_json),
+            ("get_products_by_category", lambda: inventory.get_products_by_category(category),
+             lambda: snapshot.get_products_by_category(category)),
+            ("category + price range + JSON",
+             lambda: json.dumps(inventory.filter_products(category=category, min_price=100, max_price=200)).encode(),
+             lambda: snapshot.json(snapshot.select(category=category, min_price=100, max_price=200))),
+            ("quantity range (count)", lambda: len(inventory.filter_products(max_quantity=1)),
+             lambda: len(snapshot.select(max_quantity=1))),
+        ):
+            sql_time, snapshot_time = timed(sql, args.repeat), timed(columnar, args.repeat)
+            print(f"{label:<34}{sql_time * 1000:>10.1f}{snapshot_time * 1000:>13.1f}{sql_time / snapshot_time:>8.1f}x")
+
+        inventory.adjust_stock_batch({datagen.product_id(k): 1 for k in range(100)})
+        print(f"refresh after 100 stock changes: {timed(snapshot.refresh, 1) * 1000:.2f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Latency of the /stats totals from the category_stats summary table vs a full recount,
+and the cost the summary triggers add to bulk imports.
+
+    python -m benchmarks.bench_stats --products 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from analytics import Analytics
+from benchmarks import datagen
+from benchmarks.report import measure
+from models import CATEGORY_STATS_SOURCE, Database, Inventory
+
+TRIGGERS = ("category_stats_product_insert", "category_stats_product_delete", "category_stats_product_update")
+
+
+def import_time(path: str, products: int, triggers: bool) -> float:
+    db = Database(path)
+    if not triggers:
+        for name in TRIGGERS:
+            db.execute(f"DROP TRIGGER {name}")
+    start = time.perf_counter()
+    Inventory(db).add_products_bulk(datagen.products(products), chunk_size=5000)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        without = import_time(os.path.join(tmp, "plain.db"), args.products, triggers=False)
+        with_triggers = import_time(os.path.join(tmp, "stats.db"), args.products, triggers=True)
+        print(f"bulk import of {args.products} products: {without:.1f}s without summary triggers, "
+              f"{with_triggers:.1f}s with (+{(with_triggers / without - 1) * 100:.0f}%)")
+
+        db = Database(os.path.join(tmp, "stats.db"))
+        analytics = Analytics(db)
+        print(f"{'query':<36}{'mean ms':>10}{'p99 ms':>10}")
+        for label, fn in (
+            ("summary (category_stats)", analytics.summary),
+            ("per-category (category_stats)", analytics.category_stats),
+            ("per-category (full recount)", lambda: db.fetchall(CATEGORY_STATS_SOURCE)),
+            ("low stock, top 100", analytics.low_stock),
+            ("Inventory.__str__", lambda: str(Inventory(db))),
+        ):
+            result = measure(fn, min_time=1.0, max_iterations=1000)
+            print(f"{label:<36}{result['mean_us'] / 1000:>10.3f}{result['p99_us'] / 1000:>10.3f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Concurrent stock decrements per second, checking that stock is never oversold.
+
+    python -m benchmarks.bench_stock --threads 32 --stock 20000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from models import Database, InsufficientStockError, Inventory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "stock.db"), pool_size=args.threads)
+        inventory = Inventory(db)
+        product_ids = [f"S{i:03d}" for i in range(args.products)]
+        for product_id in product_ids:
+            inventory.add_product(product_id, "Hot item", 1.0, "Sale", "", args.stock // args.products)
+
+        sold = [0] * args.threads
+
+        def checkout(n: int):
+            # Stop once every product in a row has been rejected as sold out.
+            i, rejected_in_a_row = n, 0
+            while rejected_in_a_row < args.products:
+                try:
+                    inventory.adjust_stock(product_ids[i % args.products], -1)
+                    sold[n] += 1
+                    rejected_in_a_row = 0
+                except InsufficientStockError:
+                    rejected_in_a_row += 1
+                i += 1
+
+        threads = [threading.Thread(target=checkout, args=(n,)) for n in range(args.threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        remaining = sum(inventory.get_product(product_id)["quantity"] for product_id in product_ids)
+        print(f"threads={args.threads} sold={sum(sold)} remaining={remaining} "
+              f"elapsed={elapsed:.2f}s throughput={sum(sold) / elapsed:.0f} decrements/s")
+        assert sum(sold) == args.products * (args.stock // args.products) and remaining == 0, "stock oversold"
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
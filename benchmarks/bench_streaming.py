@@ -0,0 +1,49 @@
+"""Peak Python memory of GET /products: full listing vs. streamed NDJSON.
+
+    python -m benchmarks.bench_streaming --sizes 1000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+
+os.environ.setdefault("INVENTORY_DB", os.path.join(tempfile.gettempdir(), "inventory_bench.db"))
+import routes  # noqa: E402
+from models import Database, Inventory  # noqa: E402
+
+
+def measure(client, path: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    resp = client.get(path, buffered=False)
+    size = sum(len(chunk) for chunk in resp.response)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed, size / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000])
+    args = parser.parse_args()
+
+    client = routes.app.test_client()
+    print(f"{'products':>10}  {'mode':<16}{'peak MiB':>10}{'seconds':>10}{'body MiB':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "stream.db"))
+            routes.db, routes.inventory = db, Inventory(db)
+            routes.inventory.add_products_bulk(
+                {"name": f"Item {i}", "price": 1.0, "quantity": 1, "category_name": f"C{i % 20}"} for i in range(size))
+            for mode, path in (("full listing", "/products"), ("stream=ndjson", "/products?stream=ndjson")):
+                peak, elapsed, body = measure(client, path)
+                print(f"{size:>10}  {mode:<16}{peak:>10.1f}{elapsed:>10.2f}{body:>10.1f}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Synthetic catalog generator.
+
+Product names are drawn Zipf-like from a large made-up vocabulary, categories get a
+skewed share of products, and ZipfSampler reproduces the hot-key read pattern of a real
+storefront. Everything is seeded, so the same arguments always produce the same catalog.
+
+    python -m benchmarks.datagen --products 1000000 --categories 200 catalog.db
+"""
+import argparse
+import bisect
+import itertools
+import random
+import time
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from models import Database, Inventory
+
+SYLLABLES = ["ka", "lo", "mi", "ta", "ren", "vo", "sil", "dra", "pex", "nu", "cor", "bel", "fin", "tro", "zu", "gar"]
+
+
+def vocabulary(size: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def product_id(n: int) -> str:
+    return f"P{n:07d}"
+
+
+class ZipfSampler:
+    """
+    Draws integers in [0, n) where value k has weight 1 / (k + 1) ** s.
+
+    Only the first max_support values are ever drawn, which keeps the weight table small
+    for 10M-row catalogs; the rest stay cold, as the long tail of a real catalog does.
+    """
+
+    def __init__(self, n: int, s: float = 1.1, seed: int = 7, max_support: int = 1000000):
+        self.rng = random.Random(seed)
+        self.cum_weights = list(itertools.accumulate(1 / (k + 1) ** s for k in range(min(n, max_support))))
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self.cum_weights, self.rng.random() * self.cum_weights[-1])
+
+
+def categories(count: int):
+    return [f"Category {i}" for i in range(count)]
+
+
+def products(count: int, category_count: int = 100, vocabulary_size: int = 20000, seed: int = 42):
+    """Yield product rows in the format Inventory.add_products_bulk accepts."""
+    rng = random.Random(seed)
+    words = vocabulary(vocabulary_size, seed)
+    word_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    names = categories(category_count)
+    category_weights = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(category_count)))
+    for i in range(count):
+        yield {
+            "id": product_id(i),
+            "name": " ".join(rng.choices(words, cum_weights=word_weights, k=3)) + f" {i % 9973}",
+            "price": round(rng.uniform(1, 1000), 2),
+            "quantity": rng.choice([0, 0, 1, 5, 20, 100]),
+            "category_name": rng.choices(names, cum_weights=category_weights)[0],
+            "description": "synthetic",
+        }
+
+
+def populate(path: str, product_count: int, category_count: int = 100, seed: int = 42) -> Database:
+    """Create (or top up to product_count) a synthetic catalog in the database at path."""
+    db = Database(path)
+    existing = db.fetchone("SELECT COUNT(*) AS count FROM products")["count"]
+    if existing < product_count:
+        rows = itertools.islice(products(product_count, category_count, seed=seed), existing, None)
+        Inventory(db).add_products_bulk(rows, chunk_size=5000)
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    populate(args.path, args.products, args.categories, args.seed).close()
+    print(f"{args.path}: {args.products} products in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+End-to-end HTTP benchmarks of routes.app.
+
+Each route is timed in-process through Flask's test client (routing, serialization and
+the database, without sockets), then a read-heavy mix is driven over real sockets against
+app/serve.py (gunicorn or uvicorn) at each requested concurrency.
+"""
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import benchmarks
+from benchmarks import datagen
+from benchmarks.load_test import wait_until_up
+from benchmarks.report import measure, summarize
+
+SERVE = os.path.join(benchmarks.APP_DIR, "serve.py")
+
+
+def client_cases(client, product_count: int, category_count: int) -> dict:
+    """{name: (callable, max_iterations)} issuing one request each through the test client."""
+    products = datagen.ZipfSampler(product_count)
+    categories = datagen.ZipfSampler(category_count, seed=11)
+    category_names = datagen.categories(category_count)
+    words = datagen.vocabulary(20000)
+    stocked = [datagen.product_id(k) for k in range(min(product_count, 1000))]
+
+    def hot_product() -> str:
+        return datagen.product_id(products.sample())
+
+    def request(method: str, path: str, payload=None, headers=None):
+        def call():
+            resp = client.open(path() if callable(path) else path, method=method, json=payload, headers=headers)
+            body = resp.get_data()  # also drains streamed responses
+            assert resp.status_code < 400, body
+        return call
+
+    listing_etag = client.get("/products?limit=100").headers["ETag"]
+
+    return {
+        "GET /products/<id>": (request("GET", lambda: f"/products/{hot_product()}"), 100000),
+        "GET /products?limit=100": (request("GET", lambda: f"/products?limit=100&after={hot_product()}"), 100000),
+        "GET /products?limit=100 (If-None-Match)": (request("GET", "/products?limit=100",
+                                                             headers={"If-None-Match": listing_etag}), 100000),
+        "GET /products?stream=ndjson": (request("GET", "/products?stream=ndjson"), 3),
+        "GET /products?stream=ndjson (gzip)": (request("GET", "/products?stream=ndjson",
+                                                        headers={"Accept-Encoding": "gzip"}), 3),
+        "GET /products/search": (request("GET", lambda: f"/products/search?q={words[products.sample() % len(words)]}"), 10000),
+        "GET /categories": (request("GET", "/categories"), 10000),
+        "GET /categories/<name>": (request("GET", lambda: f"/categories/{category_names[categories.sample()]}"), 100000),
+        "GET /stats": (request("GET", "/stats"), 100000),
+        "POST /products": (request("POST", "/products", {"name": "Widget", "price": 9.99, "quantity": 5,
+                                                         "category_name": "Category 0", "description": "benchmark"}), 100000),
+        "PUT /products/<id>": (request("PUT", lambda: f"/products/{hot_product()}", {"price": 5.0}), 100000),
+        "POST /products/<id>/stock": (request("POST", lambda: f"/products/{stocked[products.sample() % len(stocked)]}/stock",
+                                              {"delta": -1}), 100000),
+    }
+
+
+def run_client(path: str, product_count: int, category_count: int, min_time: float = 0.5, only: str = None) -> dict:
+    """Time every route through the Flask test client against the database at path."""
+    import routes
+    from analytics import Analytics
+    from cache import CachedInventory
+    from changes import ChangeLog
+    from httpcache import TableVersions
+    from models import Database, Inventory
+    from snapshot import CatalogSnapshot
+
+    # Everything routes built on its import-time database has to move to the generated catalog.
+    swapped = ("db", "inventory", "versions", "analytics", "change_log", "snapshot")
+    previous = {name: getattr(routes, name) for name in swapped}
+    routes.db = Database(path)
+    routes.versions = TableVersions(routes.db)
+    if routes.cache is not None:
+        routes.cache.clear()
+        routes.inventory = CachedInventory(routes.db, routes.cache, routes.versions)
+    else:
+        routes.inventory = Inventory(routes.db)
+    routes.analytics = Analytics(routes.db)
+    routes.change_log = ChangeLog(routes.db)
+    if previous["snapshot"] is not None:
+        routes.snapshot = CatalogSnapshot(routes.db, previous["snapshot"].max_staleness, previous["snapshot"].reload_ratio)
+    try:
+        with routes.db.transaction() as conn:
+            conn.execute("UPDATE products SET quantity = 1000000000 WHERE id < ?", (datagen.product_id(1000),))
+        results = {}
+        for name, (fn, max_iterations) in client_cases(routes.app.test_client(), product_count, category_count).items():
+            if only and only not in name:
+                continue
+            results[f"client {name}"] = measure(fn, min_time, max_iterations, warmup=0 if max_iterations <= 3 else 3)
+        return results
+    finally:
+        routes.db.close()
+        for name, value in previous.items():
+            setattr(routes, name, value)
+
+
+def load(host: str, port: int, concurrency: int, duration: float, product_count: int, write_ratio: float) -> dict:
+    """Drive GET /products/<id> (and write_ratio of stock decrements) from concurrency keep-alive clients."""
+    timings, errors = [], []
+
+    def worker(seed: int):
+        products = datagen.ZipfSampler(product_count, seed=seed)
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        deadline = time.perf_counter() + duration
+        local = []
+        while time.perf_counter() < deadline:
+            k = products.sample()
+            start = time.perf_counter()
+            try:
+                if products.rng.random() < write_ratio:
+                    conn.request("POST", f"/products/{datagen.product_id(k % 1000)}/stock",
+                                 body=json.dumps({"delta": -1}), headers={"Content-Type": "application/json"})
+                else:
+                    conn.request("GET", f"/products/{datagen.product_id(k)}")
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 400:
+                    errors.append(resp.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(type(e).__name__)
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        timings.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return dict(summarize(timings, time.perf_counter() - start), errors=len(errors))
+
+
+def run_server(path: str, product_count: int, mode: str = "flask", concurrency=(1, 16), duration: float = 3.0,
+               write_ratio: float = 0.1, port: int = 8766) -> dict:
+    """Start app/serve.py on the database at path and load test it at each concurrency."""
+    from models import Database
+
+    with Database(path) as db, db.transaction() as conn:
+        conn.execute("UPDATE products SET quantity = 1000000000 WHERE id < ?", (datagen.product_id(1000),))
+    env = dict(os.environ, INVENTORY_DB=os.path.abspath(path))
+    server = subprocess.Popen([sys.executable, SERVE, "--mode", mode, "--bind", f"127.0.0.1:{port}"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up("127.0.0.1", port)
+        return {f"server[{mode}] mix c={c}": load("127.0.0.1", port, c, duration, product_count, write_ratio)
+                for c in concurrency}
+    finally:
+        server.terminate()
+        server.wait()
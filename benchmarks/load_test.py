@@ -0,0 +1,147 @@
+"""
+Load test comparing the Flask (gunicorn) and async (uvicorn) server modes.
+
+Starts each mode with app/serve.py against its own seeded database, drives it with
+1, 16 and 128 concurrent keep-alive clients issuing a read-heavy mix (GET /products/<id>,
+with --write-ratio of POST /products/<id>/stock), and prints p50/p99 latency and throughput.
+
+    python -m benchmarks.load_test --duration 5 --concurrency 1 16 128
+    python -m benchmarks.load_test --url http://127.0.0.1:8000   # an already running server
+
+Requires gunicorn and uvicorn unless --url is given.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import benchmarks
+from models import Database, Inventory
+
+SERVE = os.path.join(benchmarks.APP_DIR, "serve.py")
+
+
+def seed(path: str, products: int):
+    db = Database(path)
+    Inventory(db).add_products_bulk(
+        {"id": f"L{i:06d}", "name": f"Item {i}", "price": 1.0, "quantity": 10 ** 6, "category_name": f"C{i % 20}"}
+        for i in range(products))
+    db.close()
+
+
+def wait_until_up(host: str, port: int, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/categories?limit=1")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on {host}:{port} did not start")
+
+
+def client(host: str, port: int, products: int, write_ratio: float, deadline: float, latencies: list, errors: list):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        product_id = f"L{rng.randrange(products):06d}"
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                conn.request("POST", f"/products/{product_id}/stock", body=json.dumps({"delta": -1}),
+                             headers={"Content-Type": "application/json"})
+            else:
+                conn.request("GET", f"/products/{product_id}")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run_load(host: str, port: int, concurrency: int, duration: float, products: int, write_ratio: float) -> dict:
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(host, port, products, write_ratio, deadline, latencies, errors))
+               for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else float("nan")
+
+    return {"concurrency": concurrency, "requests": len(latencies), "errors": len(errors),
+            "throughput": len(latencies) / duration, "p50_ms": percentile(0.50), "p99_ms": percentile(0.99)}
+
+
+def print_row(mode: str, result: dict):
+    print(f"{mode:<8}{result['concurrency']:>6}{result['throughput']:>12.0f}{result['p50_ms']:>10.2f}"
+          f"{result['p99_ms']:>10.2f}{result['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=("flask", "asgi"), default=["flask", "asgi"])
+    parser.add_argument("--url", help="load test an already running server instead of starting one per mode")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'conc':>6}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    results = []
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        for concurrency in args.concurrency:
+            result = dict(run_load(url.hostname, url.port or 80, concurrency, args.duration, args.products,
+                                   args.write_ratio), mode="external")
+            print_row("external", result)
+            results.append(result)
+    else:
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f"{mode}.db")
+                seed(path, args.products)
+                env = dict(os.environ, INVENTORY_DB=path, INVENTORY_CACHE="none" if args.workers > 1 else "memory")
+                server = subprocess.Popen([sys.executable, SERVE, "--mode", mode, "--workers", str(args.workers),
+                                           "--bind", f"127.0.0.1:{args.port}"], env=env)
+                try:
+                    wait_until_up("127.0.0.1", args.port)
+                    for concurrency in args.concurrency:
+                        result = dict(run_load("127.0.0.1", args.port, concurrency, args.duration, args.products,
+                                               args.write_ratio), mode=mode)
+                        print_row(mode, result)
+                        results.append(result)
+                finally:
+                    server.terminate()
+                    server.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Micro-benchmarks for every public Inventory method and the Database primitives.
+
+Reads pick their keys with a Zipf sampler, so hot products dominate as they would in
+production. Write benchmarks mutate the database they are given; run them against a
+scratch copy (``python -m benchmarks`` does this for you).
+"""
+import itertools
+
+import benchmarks  # noqa: F401  (puts app/ on sys.path)
+from analytics import Analytics
+from benchmarks import datagen
+from benchmarks.report import measure
+from models import Database, IdSequence, Inventory
+
+# Full-table operations are only repeated a few times; at 10M rows one call takes minutes.
+SCAN_ITERATIONS = 3
+WARMUP = 3
+# Benchmarks that consume a pre-built pool (removals, reservation commits/releases) run at
+# most this many times; their pools hold WARMUP extra entries for the warm-up calls.
+CONSUMABLE_ITERATIONS = 2000
+
+
+def cases(inventory: Inventory, product_count: int, category_count: int) -> dict:
+    """{name: (callable, max_iterations)} for the catalog populated by datagen."""
+    db = inventory.db
+    analytics = Analytics(db)
+    products = datagen.ZipfSampler(product_count)
+    categories = datagen.ZipfSampler(category_count, seed=11)
+    category_names = datagen.categories(category_count)
+    words = datagen.vocabulary(20000)
+    counter = itertools.count()
+
+    def hot_product() -> str:
+        return datagen.product_id(products.sample())
+
+    def hot_category() -> str:
+        return category_names[categories.sample()]
+
+    # Stock writes go to products that can never run out, so no call fails half way through.
+    stocked = [datagen.product_id(k) for k in range(min(product_count, 1000))]
+    with db.transaction() as conn:
+        conn.executemany("UPDATE products SET quantity = 1000000000 WHERE id = ?", [(pid,) for pid in stocked])
+    stocked_sampler = datagen.ZipfSampler(len(stocked), seed=13)
+
+    def stocked_product() -> str:
+        return stocked[stocked_sampler.sample()]
+
+    pool_size = CONSUMABLE_ITERATIONS + WARMUP
+    removable = [f"R{n:07d}" for n in range(pool_size)]
+    inventory.add_products_bulk({"id": pid, "name": "removable", "price": 1.0, "quantity": 1,
+                                 "category_name": "Removable"} for pid in removable)
+    for n in range(pool_size):
+        inventory.add_category(f"Empty {n}", "removable")
+    removable_products, removable_categories = iter(removable), (f"Empty {n}" for n in range(pool_size))
+    # Commits and releases share one pool of reservations.
+    reservations = [inventory.reserve_stock({stocked_product(): 1}) for _ in range(2 * pool_size)]
+    pending = iter(reservations)
+    sequence = IdSequence(db, "benchmark")
+
+    def bulk_rows():
+        base = next(counter) * 1000
+        return ({"id": f"B{base + i:09d}", "name": f"bulk {i}", "price": 2.5, "quantity": 3,
+                 "category_name": hot_category()} for i in range(1000))
+
+    def drain(rows):
+        for _ in rows:
+            pass
+
+    def with_connection():
+        with db.connection():
+            pass
+
+    def empty_transaction():
+        with db.transaction():
+            pass
+
+    return {
+        # Database primitives
+        "db.connection": (with_connection, 100000),
+        "db.transaction": (empty_transaction, 100000),
+        "db.fetchone": (lambda: db.fetchone("SELECT id, quantity FROM products WHERE id = ?", (hot_product(),)), 100000),
+        "db.fetchall(100)": (lambda: db.fetchall("SELECT id, name, price FROM products WHERE id >= ? LIMIT 100",
+                                                  (hot_product(),)), 100000),
+        "db.execute": (lambda: db.execute("UPDATE products SET quantity = quantity + 0 WHERE id = ?",
+                                          (hot_product(),)), 100000),
+        "db.iterate(10000)": (lambda: drain(itertools.islice(db.iterate("SELECT id, name, price FROM products"), 10000)), 1000),
+        "id_sequence.next_value": (sequence.next_value, 100000),
+        # Inventory: ids
+        "inventory.next_product_id": (inventory.next_product_id, 100000),
+        "inventory.next_product_ids(100)": (lambda: inventory.next_product_ids(100), 100000),
+        "inventory.reserve_product_id": (lambda: inventory.reserve_product_id(f"P{next(counter) % 1000:06d}"), 100000),
+        # Inventory: writes
+        "inventory.add_category": (lambda: inventory.add_category(f"New {next(counter)}", "benchmark"), 100000),
+        "inventory.add_product": (lambda: inventory.add_product(f"A{next(counter):09d}", "added", 4.5, hot_category(),
+                                                                "benchmark", 7), 100000),
+        "inventory.add_products_bulk(1000)": (lambda: inventory.add_products_bulk(bulk_rows()), 1000),
+        "inventory.update_product": (lambda: inventory.update_product(hot_product(), price=9.99), 100000),
+        "inventory.remove_product": (lambda: inventory.remove_product(next(removable_products)), CONSUMABLE_ITERATIONS),
+        "inventory.remove_category": (lambda: inventory.remove_category(next(removable_categories)), CONSUMABLE_ITERATIONS),
+        # Inventory: stock
+        "inventory.adjust_stock": (lambda: inventory.adjust_stock(stocked_product(), -1), 100000),
+        "inventory.adjust_stock_batch(10)": (lambda: inventory.adjust_stock_batch(
+            {stocked_product(): -1 for _ in range(10)}), 100000),
+        "inventory.reserve_stock": (lambda: inventory.reserve_stock({stocked_product(): 1}), 100000),
+        "inventory.commit_reservation": (lambda: inventory.commit_reservation(next(pending)), CONSUMABLE_ITERATIONS),
+        "inventory.release_reservation": (lambda: inventory.release_reservation(next(pending)), CONSUMABLE_ITERATIONS),
+        "inventory.release_expired_reservations": (lambda: inventory.release_expired_reservations(3600), 100000),
+        "inventory.get_reservation": (lambda: inventory.get_reservation(reservations[next(counter) % len(reservations)]), 100000),
+        # Inventory: reads
+        "inventory.get_product": (lambda: inventory.get_product(hot_product()), 100000),
+        "inventory.get_all_products": (inventory.get_all_products, SCAN_ITERATIONS),
+        "inventory.get_products_page(100)": (lambda: inventory.get_products_page(100, after=hot_product()), 100000),
+        "inventory.iter_products": (lambda: drain(inventory.iter_products()), SCAN_ITERATIONS),
+        "inventory.get_products_by_category": (lambda: inventory.get_products_by_category(hot_category()), 1000),
+        "inventory.search_products": (lambda: inventory.search_products(words[products.sample() % len(words)],
+                                                                        limit=20), 10000),
+        "inventory.search_products(filters)": (lambda: inventory.search_products(
+            category=hot_category(), min_price=10, max_price=20, limit=20), 10000),
+        "inventory.get_category": (lambda: inventory.get_category(hot_category()), 100000),
+        "inventory.get_all_categories": (inventory.get_all_categories, 10000),
+        "inventory.get_categories_page(100)": (lambda: inventory.get_categories_page(100), 100000),
+        "inventory.iter_categories": (lambda: drain(inventory.iter_categories()), 10000),
+        "inventory.__str__": (lambda: str(inventory), 10000),
+        "inventory.rebuild_search_index": (inventory.rebuild_search_index, 1),
+        # Analytics
+        "analytics.summary": (analytics.summary, 100000),
+        "analytics.category_stats": (analytics.category_stats, 100000),
+        "analytics.low_stock": (analytics.low_stock, 100000),
+    }
+
+
+def run(path: str, product_count: int, category_count: int, min_time: float = 0.5, only: str = None) -> dict:
+    """Run the micro-benchmarks whose name contains `only` (all by default) against the database at path."""
+    db = Database(path)
+    try:
+        inventory = Inventory(db)
+        results = {}
+        for name, (fn, max_iterations) in cases(inventory, product_count, category_count).items():
+            if only and only not in name:
+                continue
+            results[name] = measure(fn, min_time, max_iterations, warmup=0 if max_iterations <= 1000 else WARMUP)
+        return results
+    finally:
+        db.close()
@@ -0,0 +1,97 @@
+"""
+Timing, JSON result files and regression comparison shared by the benchmark suite.
+
+A result file looks like::
+
+    {"meta": {"commit": "...", "scale": 10000, ...},
+     "results": {"inventory.get_product": {"iterations": 5210, "ops_per_sec": 26050.1,
+                                           "mean_us": 38.4, "p50_us": 35.0, "p99_us": 91.2}, ...}}
+"""
+import datetime
+import json
+import platform
+import sqlite3
+import subprocess
+import time
+
+
+def percentile(ordered: list, p: float) -> float:
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)] if ordered else 0.0
+
+
+def summarize(timings: list, elapsed: float = None) -> dict:
+    """Latency summary of per-operation timings (seconds); elapsed defaults to their sum."""
+    ordered = sorted(timings)
+    elapsed = elapsed if elapsed is not None else sum(ordered)
+    return {"iterations": len(ordered), "ops_per_sec": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            "mean_us": round(sum(ordered) / len(ordered) * 1e6, 2) if ordered else 0.0,
+            "p50_us": round(percentile(ordered, 0.50) * 1e6, 2), "p99_us": round(percentile(ordered, 0.99) * 1e6, 2)}
+
+
+def measure(fn, min_time: float = 0.5, max_iterations: int = 100000, warmup: int = 3) -> dict:
+    """Call fn repeatedly for about min_time seconds (at least once, at most max_iterations times)."""
+    for _ in range(min(warmup, max_iterations - 1)):
+        fn()
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_iterations:
+        start = time.perf_counter()
+        fn()
+        end = time.perf_counter()
+        timings.append(end - start)
+        if end >= deadline:
+            break
+    return summarize(timings)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def metadata(**extra) -> dict:
+    return dict(commit=git_commit(), timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                python=platform.python_version(), sqlite=sqlite3.sqlite_version, machine=platform.machine(), **extra)
+
+
+def save(path: str, results: dict, meta: dict):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.10, metric: str = "p50_us") -> list:
+    """
+    Rows comparing every benchmark present in both result sets.
+
+    A benchmark regressed when its metric (a latency, so lower is better) grew by more
+    than tolerance relative to the baseline.
+    """
+    rows = []
+    for name in sorted(baseline["results"].keys() & current["results"].keys()):
+        before = baseline["results"][name][metric]
+        after = current["results"][name][metric]
+        change = (after - before) / before if before else 0.0
+        rows.append({"name": name, "baseline": before, "current": after, "change": change,
+                     "regressed": change > tolerance})
+    return rows
+
+
+def print_results(results: dict):
+    print(f"{'benchmark':<44}{'ops/s':>12}{'mean us':>12}{'p50 us':>12}{'p99 us':>12}")
+    for name, r in results.items():
+        print(f"{name:<44}{r['ops_per_sec']:>12.1f}{r['mean_us']:>12.1f}{r['p50_us']:>12.1f}{r['p99_us']:>12.1f}")
+
+
+def print_comparison(rows: list, metric: str = "p50_us"):
+    print(f"{'benchmark':<44}{'baseline':>12}{'current':>12}{'change':>10}  ({metric})")
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(f"{row['name']:<44}{row['baseline']:>12.1f}{row['current']:>12.1f}{row['change']:>+10.1%}{flag}")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app modules import each other as top-level modules (``from models import ...``),
+# the same way they do when run from app/.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
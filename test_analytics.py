@@ -0,0 +1,80 @@
+import pytest
+from analytics import Analytics
+from models import Database, Inventory
+
+@pytest.fixture
+def inventory(tmp_path):
+    db = Database(db_name=str(tmp_path / "analytics.db"))
+    inventory = Inventory(db)
+    inventory.add_product("P1", "Laptop", 1000.0, "Electronics", "", 3)
+    inventory.add_product("P2", "Phone", 500.0, "Electronics", "", 0)
+    inventory.add_product("P3", "Desk", 200.0, "Furniture", "", 40)
+    yield inventory
+    db.close()
+
+def by_category(analytics):
+    return {row["category"]: row for row in analytics.category_stats()}
+
+def test_summary_totals(inventory):
+    summary = Analytics(inventory.db).summary()
+    assert summary == {"categories": 2, "products": 3, "total_quantity": 43, "stock_value": 11000.0,
+                       "out_of_stock": 1, "low_stock": 2, "low_stock_threshold": 5}
+
+def test_category_stats_follow_writes(inventory):
+    analytics = Analytics(inventory.db)
+    inventory.update_product("P3", price=100.0, quantity=2)
+    inventory.adjust_stock("P1", -1)
+    inventory.remove_product("P2")
+    inventory.add_category("Garden", "")
+
+    stats = by_category(analytics)
+    assert stats["Electronics"] == {"category": "Electronics", "product_count": 1, "total_quantity": 2,
+                                    "stock_value": 2000.0, "out_of_stock": 0, "low_stock": 1}
+    assert stats["Furniture"]["stock_value"] == 200.0
+    assert stats["Furniture"]["low_stock"] == 1
+    assert stats["Garden"]["product_count"] == 0
+    assert analytics.check() == []
+
+def test_raw_sql_writes_are_counted(inventory):
+    analytics = Analytics(inventory.db)
+    inventory.db.execute("UPDATE products SET category_id = (SELECT id FROM categories WHERE name = 'Furniture') WHERE id = 'P1'")
+    inventory.db.execute("INSERT INTO products (id, name, price, quantity) VALUES ('X1', 'Loose', 2.0, 1)")
+
+    stats = by_category(analytics)
+    assert stats["Furniture"]["product_count"] == 2
+    assert stats["Electronics"]["product_count"] == 1
+    assert stats[None]["stock_value"] == 2.0
+    assert analytics.summary()["products"] == 4
+    assert str(inventory) == "Inventory with 4 products and 2 categories."
+
+def test_low_stock_products(inventory):
+    analytics = Analytics(inventory.db)
+    assert [p["id"] for p in analytics.low_stock()] == ["P2", "P1"]
+    assert [p["id"] for p in analytics.low_stock(threshold=0)] == ["P2"]
+    assert [p["id"] for p in analytics.low_stock(threshold=100, category="Furniture")] == ["P3"]
+
+    analytics.set_low_stock_threshold(50)
+    assert analytics.summary()["low_stock"] == 3
+    assert by_category(analytics)["Furniture"]["low_stock"] == 1
+
+def test_check_and_rebuild_repair_drift(inventory):
+    analytics = Analytics(inventory.db)
+    inventory.db.execute("UPDATE category_stats SET stock_value = 0, product_count = 99")
+    drift = analytics.check()
+    assert len(drift) == 2
+    assert analytics.rebuild() == drift
+    assert analytics.check() == []
+    assert analytics.summary()["stock_value"] == 11000.0
+
+def test_stats_routes(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "routes.db"))
+    routes = pytest.importorskip("routes")
+    monkeypatch.setattr(routes, "analytics", Analytics(inventory.db))
+    client = routes.app.test_client()
+
+    assert client.get("/stats").get_json()["data"]["products"] == 3
+    assert client.get("/stats/categories/Furniture").get_json()["data"]["total_quantity"] == 40
+    assert client.get("/stats/categories/Missing").status_code == 404
+    assert [p["id"] for p in client.get("/stats/low-stock?threshold=3").get_json()["data"]] == ["P2", "P1"]
+    assert client.get("/stats/low-stock?limit=0").status_code == 400
+    assert client.put("/stats/low-stock", json={"threshold": 0}).get_json()["data"]["low_stock"] == 1
@@ -0,0 +1,151 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from httpcache import TableVersions
+from models import Database, Inventory
+
+def seeded(path):
+    inventory = Inventory(Database(db_name=path))
+    for i in range(30):
+        inventory.add_product(f"P{i}", f"Product {i}", 10.0 + i, "Electronics" if i % 2 else "Garden", "", 5)
+    return inventory
+
+@pytest.fixture
+def apps(monkeypatch, tmp_path):
+    """The Flask and ASGI apps, each serving its own copy of the same catalog."""
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "default.db"))
+    routes = pytest.importorskip("routes")
+    asgi = pytest.importorskip("asgi")
+    inventories = []
+    for module, name in ((routes, "flask.db"), (asgi, "asgi.db")):
+        inventory = seeded(str(tmp_path / name))
+        monkeypatch.setattr(module, "db", inventory.db)
+        monkeypatch.setattr(module, "inventory", inventory)
+        monkeypatch.setattr(module, "versions", TableVersions(inventory.db))
+        inventories.append(inventory)
+    yield routes.app.test_client(), asgi.app
+    for inventory in inventories:
+        inventory.db.close()
+
+def call_asgi(app, method, path, body=b"", headers=()):
+    sent = []
+    path, _, query = path.partition("?")
+
+    async def receive():
+        return {"type": "http.request", "body": body}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+             "headers": [(name.lower().encode(), value.encode()) for name, value in headers]}
+    asyncio.run(app(scope, receive, send))
+    headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    return sent[0]["status"], headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+def both(apps, method, path, body=None, raw=None, headers=None):
+    """(status, headers, body) from each app for the same request; headers are lower-cased."""
+    client, asgi_app = apps
+    headers = dict(headers or {})
+    data = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+    if data:
+        headers.setdefault("Content-Type", "application/json")
+    resp = client.open(path, method=method, data=data, headers=headers)
+    flask = resp.status_code, {name.lower(): value for name, value in resp.headers.items()}, resp.get_data()
+    return flask, call_asgi(asgi_app, method, path, data, headers.items())
+
+def assert_same_json(apps, method, path, body=None, raw=None, status=None):
+    flask, asgi = both(apps, method, path, body, raw)
+    assert flask[0] == asgi[0], path
+    assert json.loads(flask[2]) == json.loads(asgi[2]), path
+    if status is not None:
+        assert flask[0] == status
+    return json.loads(flask[2])
+
+def test_product_routes_match(apps):
+    assert len(assert_same_json(apps, "GET", "/products", status=200)["data"]) == 30
+    assert assert_same_json(apps, "GET", "/products?limit=2&after=P10")["data"][0]["id"] == "P11"
+    assert_same_json(apps, "GET", "/products/P1", status=200)
+    assert_same_json(apps, "GET", "/products/missing", status=404)
+
+    product = {"name": "Lamp", "price": 12.5, "quantity": 3, "category_name": "Lighting", "description": ""}
+    assert assert_same_json(apps, "POST", "/products", product, status=201)["data"]["product_id"] == "P100001"
+    assert_same_json(apps, "POST", "/products", {**product, "id": "X1"}, status=201)
+    assert_same_json(apps, "POST", "/products", {"name": "Incomplete"}, status=400)
+    assert_same_json(apps, "POST", "/products", raw=b"{not json", status=400)
+
+    assert_same_json(apps, "PUT", "/products/P1", {"price": 99.0}, status=200)
+    assert_same_json(apps, "PUT", "/products/P1", {}, status=400)
+    assert_same_json(apps, "PUT", "/products/P1", raw=b"{not json", status=400)
+    assert_same_json(apps, "PUT", "/products/missing", {"price": 1}, status=404)
+    assert assert_same_json(apps, "GET", "/products/P1")["data"]["price"] == 99.0
+
+    assert_same_json(apps, "DELETE", "/products/P2", status=200)
+    assert_same_json(apps, "DELETE", "/products/P2", status=404)
+    assert_same_json(apps, "PATCH", "/products/P1", {}, status=405)
+    assert_same_json(apps, "GET", "/nowhere", status=404)
+    assert len(assert_same_json(apps, "GET", "/products")["data"]) == 31
+
+def test_stock_routes_match(apps):
+    assert assert_same_json(apps, "POST", "/products/P1/stock", {"delta": -2}, status=200)["data"]["quantity"] == 3
+    assert_same_json(apps, "POST", "/products/P1/stock", {"delta": -10}, status=409)
+    assert_same_json(apps, "POST", "/products/missing/stock", {"delta": 1}, status=404)
+    assert_same_json(apps, "POST", "/products/P1/stock", raw=b"[", status=400)
+    items = {"items": [{"product_id": "P3", "delta": -1}, {"product_id": "P4", "delta": 2}]}
+    assert assert_same_json(apps, "POST", "/stock", items, status=200)["data"] == {"P3": 4, "P4": 7}
+    assert_same_json(apps, "POST", "/stock", {"items": [{"product_id": "P3", "delta": -50}]}, status=409)
+    assert_same_json(apps, "POST", "/stock", {"items": []}, status=400)
+
+def test_streams_and_compression_match(apps):
+    for mode in ("ndjson", "json"):
+        flask, asgi = both(apps, "GET", f"/products?stream={mode}")
+        assert flask[0] == asgi[0] == 200 and flask[2] == asgi[2]
+        assert flask[1]["content-type"].split(";")[0] == asgi[1]["content-type"]
+
+    flask, asgi = both(apps, "GET", "/products", headers={"Accept-Encoding": "gzip"})
+    for _, headers, _ in (flask, asgi):
+        assert headers["content-encoding"] == "gzip" and headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(flask[2])) == json.loads(gzip.decompress(asgi[2]))
+    assert flask[1]["etag"] == asgi[1]["etag"]
+
+    flask, asgi = both(apps, "GET", "/products?stream=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(flask[2]) == gzip.decompress(asgi[2])
+
+    flask, asgi = both(apps, "GET", "/products/P1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in flask[1] and "content-encoding" not in asgi[1]
+    flask, asgi = both(apps, "GET", "/products", headers={"If-None-Match": flask[1]["etag"]})
+    assert flask[0] == asgi[0] == 304 and flask[2] == asgi[2] == b""
+
+def test_immutable_mode_rejects_writes(apps, monkeypatch):
+    for module in (pytest.importorskip("routes"), pytest.importorskip("asgi")):
+        path = module.db.db_name
+        module.db.close()
+        inventory = Inventory(Database(db_name=path, immutable=True))
+        monkeypatch.setattr(module, "db", inventory.db)
+        monkeypatch.setattr(module, "inventory", inventory)
+        monkeypatch.setattr(module, "versions", TableVersions(inventory.db))
+    assert_same_json(apps, "GET", "/products/P1", status=200)
+    product = {"name": "Lamp", "price": 12.5, "quantity": 3, "category_name": "Lighting", "description": ""}
+    assert_same_json(apps, "POST", "/products", product, status=503)
+    assert_same_json(apps, "PUT", "/products/P1", {"price": 99.0}, status=503)
+    assert_same_json(apps, "POST", "/products/P1/stock", {"delta": -2}, status=503)
+    assert_same_json(apps, "DELETE", "/products/P1", status=503)
+    assert_same_json(apps, "DELETE", "/nowhere", status=404)
+    assert assert_same_json(apps, "GET", "/products/P1")["data"]["quantity"] == 5
+    for module in (pytest.importorskip("routes"), pytest.importorskip("asgi")):
+        module.db.close()
+
+def test_head_is_answered_like_get(apps):
+    for path in ("/products", "/products/P1", "/products?stream=ndjson", "/categories"):
+        flask, asgi = both(apps, "HEAD", path)
+        assert flask[0] == asgi[0] == 200, path
+        assert flask[2] == asgi[2] == b"", path
+        assert flask[1]["content-type"].split(";")[0] == asgi[1]["content-type"], path
+        assert flask[1].get("etag") == asgi[1].get("etag"), path
+    flask, asgi = both(apps, "HEAD", "/products/missing")
+    assert flask[0] == asgi[0] == 404
+    etag = both(apps, "HEAD", "/products/P1")[0][1]["etag"]
+    flask, asgi = both(apps, "HEAD", "/products/P1", headers={"If-None-Match": etag})
+    assert flask[0] == asgi[0] == 304
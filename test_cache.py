@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from cache import MISSING, CachedInventory, FileCache, LRUCache
+from httpcache import TableVersions
+from models import Database, Inventory
+
+@pytest.fixture
+def inventory(tmp_path):
+    """A cached inventory on a fresh database."""
+    db = Database(db_name=str(tmp_path / "cached.db"))
+    yield CachedInventory(db, LRUCache(maxsize=100, ttl=60))
+    db.close()
+
+# ==== CACHE BACKEND TESTS ====
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_entries_expire():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is MISSING
+
+def test_file_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer, reader = FileCache(path), FileCache(path)
+    writer.set("product:P1", {"id": "P1"})
+    assert reader.get("product:P1") == {"id": "P1"}
+    writer.delete("product:P1")
+    assert reader.get("product:P1") is MISSING
+
+# ==== CACHED INVENTORY TESTS ====
+
+def test_get_product_served_from_cache(inventory):
+    inventory.add_product("P1", "Mouse", 20.0, "Accessories", "", 5)
+    assert inventory.get_product("P1")["name"] == "Mouse"
+    inventory.db.execute("UPDATE products SET name = 'Changed behind the cache' WHERE id = 'P1'")
+    assert inventory.get_product("P1")["name"] == "Mouse"
+    assert inventory.cache.stats()["hits"] == 1
+
+def test_writes_invalidate_cache(inventory):
+    assert inventory.get_product("P1") is None
+    inventory.add_product("P1", "Mouse", 20.0, "Accessories", "", 5)
+    assert inventory.get_product("P1")["price"] == 20.0
+
+    inventory.update_product("P1", price=25.0)
+    assert inventory.get_product("P1")["price"] == 25.0
+
+    inventory.remove_product("P1")
+    assert inventory.get_product("P1") is None
+
+    assert inventory.get_category("Accessories") is not None
+    assert inventory.remove_category("Accessories")
+    assert inventory.get_category("Accessories") is None
+
+def test_cached_values_are_copies(inventory):
+    inventory.add_product("P1", "Mouse", 20.0, "Accessories", "", 5)
+    inventory.get_product("P1")["name"] = "Mutated"
+    assert inventory.get_product("P1")["name"] == "Mouse"
+
+def test_stock_changes_invalidate_cache(inventory):
+    inventory.add_product("P1", "Mouse", 20.0, "Accessories", "", 5)
+    assert inventory.get_product("P1")["quantity"] == 5
+    inventory.adjust_stock("P1", -2)
+    assert inventory.get_product("P1")["quantity"] == 3
+    reservation = inventory.reserve_stock({"P1": 3})
+    assert inventory.get_product("P1")["quantity"] == 0
+    inventory.release_reservation(reservation)
+    assert inventory.get_product("P1")["quantity"] == 3
+
+def test_misses_are_not_cached(inventory):
+    assert inventory.get_product("P1") is None
+    Inventory(inventory.db).add_product("P1", "Mouse", 20.0, "Accessories", "", 5)
+    assert inventory.get_product("P1")["name"] == "Mouse"
+
+def test_entries_are_tied_to_table_versions(tmp_path):
+    db = Database(db_name=str(tmp_path / "versioned.db"))
+    inventory = CachedInventory(db, LRUCache(), TableVersions(db))
+    inventory.add_product("P1", "Mouse", 20.0, "Accessories", "", 5)
+    assert inventory.get_product("P1")["price"] == 20.0
+    assert inventory.get_product("P1")["price"] == 20.0
+    assert inventory.cache.stats()["hits"] == 1
+    # A write that bypasses this cache, as one made by another worker would.
+    Inventory(db).update_product("P1", price=30.0)
+    assert inventory.get_product("P1")["price"] == 30.0
+    db.close()
@@ -0,0 +1,76 @@
+import pytest
+from changes import ChangeLog, ChangesExpiredError
+from models import Database, Inventory
+
+@pytest.fixture
+def inventory(tmp_path):
+    db = Database(db_name=str(tmp_path / "changes.db"))
+    inventory = Inventory(db)
+    inventory.add_product("P1", "Laptop", 1000.0, "Electronics", "", 3)
+    inventory.add_product("P2", "Phone", 500.0, "Electronics", "", 0)
+    yield inventory
+    db.close()
+
+def test_every_write_is_logged(inventory):
+    log = ChangeLog(inventory.db)
+    since = log.latest_seq()
+    inventory.update_product("P1", price=900.0)
+    inventory.db.execute("UPDATE products SET quantity = 9 WHERE id = 'P2'")
+    inventory.remove_product("P1")
+    inventory.add_category("Garden", "Outdoor")
+
+    deltas = log.read(since)
+    assert [(d["table"], d["id"], d["op"]) for d in deltas] == [
+        ("products", "P2", "update"), ("products", "P1", "delete"), ("categories", deltas[-1]["id"], "insert")]
+    assert deltas[0]["data"] == {"id": "P2", "name": "Phone", "price": 500.0, "quantity": 9, "category": "Electronics"}
+    assert deltas[1]["data"] is None
+    assert deltas[2]["data"]["name"] == "Garden"
+    assert log.read(deltas[-1]["seq"]) == []
+
+def test_one_delta_per_row(inventory):
+    log = ChangeLog(inventory.db)
+    for delta in range(5):
+        inventory.adjust_stock("P1", 1)
+    deltas = log.read(0)
+    assert [d["id"] for d in deltas if d["table"] == "products"] == ["P2", "P1"]
+    assert deltas[-1]["data"]["quantity"] == 8
+    assert [d["id"] for d in log.iter_changes(0, batch_size=1) if d["table"] == "products"] == ["P2", "P1"]
+
+def test_compaction_keeps_latest_entry_per_row(inventory):
+    log = ChangeLog(inventory.db)
+    inventory.adjust_stock("P1", 1)
+    inventory.adjust_stock("P1", 1)
+    before = log.read(0)
+    assert log.compact() == 2
+    assert inventory.db.fetchone("SELECT COUNT(*) AS count FROM changes")["count"] == 3
+    assert log.read(0) == before
+
+def test_retention_expires_old_cursors(inventory):
+    log = ChangeLog(inventory.db)
+    inventory.adjust_stock("P1", 1)
+    latest = log.latest_seq()
+    assert log.trim(max_entries=1) == latest - 1
+    assert log.trimmed_seq() == latest - 1
+    with pytest.raises(ChangesExpiredError):
+        log.read(0)
+    assert [d["id"] for d in log.read(latest - 1)] == ["P1"]
+    assert log.trim(max_age=3600) == 0
+
+def test_changes_route(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "routes.db"))
+    routes = pytest.importorskip("routes")
+    monkeypatch.setattr(routes, "change_log", ChangeLog(inventory.db))
+    client = routes.app.test_client()
+
+    body = client.get("/changes?limit=2").get_json()
+    assert [(d["table"], d["id"]) for d in body["data"]] == [("categories", 1), ("products", "P1")]
+    assert body["next"] == body["data"][-1]["seq"]
+    rest = client.get(f"/changes?since={body['next']}").get_json()
+    assert [d["id"] for d in rest["data"]] == ["P2"] and rest["next"] == rest["latest"]
+    assert client.get(f"/changes?since={rest['next']}").get_json()["data"] == []
+    lines = client.get("/changes?stream=ndjson").get_data(as_text=True).splitlines()
+    assert len(lines) == 3
+    assert client.get("/changes?limit=0").status_code == 400
+
+    ChangeLog(inventory.db).trim(max_entries=1)
+    assert client.get("/changes?since=0").status_code == 410
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import sqlite3
+
+import pytest
+from export import backup, export, export_chunks, read_columnar
+from models import Database, Inventory
+
+@pytest.fixture
+def inventory(tmp_path):
+    db = Database(db_name=str(tmp_path / "export.db"))
+    inventory = Inventory(db)
+    for i in range(25):
+        inventory.add_product(f"P{i:02d}", f'Product "{i}", café', 10.5 + i, "Electronics" if i % 2 else "Garden", "", i)
+    yield inventory
+    db.close()
+
+def by_id(rows):
+    return sorted(rows, key=lambda row: row["id"])
+
+def exported(db, fmt, table="products"):
+    output = io.BytesIO()
+    export(db, output, table, fmt, chunk_size=7)
+    return output.getvalue()
+
+def test_formats_round_trip(inventory, tmp_path):
+    expected = by_id(inventory.get_all_products())
+    ndjson = exported(inventory.db, "ndjson")
+    assert by_id(json.loads(line) for line in ndjson.splitlines()) == expected
+
+    rows = list(csv.DictReader(io.StringIO(exported(inventory.db, "csv").decode())))
+    assert [row["name"] for row in by_id(rows)] == [row["name"] for row in expected]
+    assert float(rows[0]["price"]) == next(p["price"] for p in expected if p["id"] == rows[0]["id"])
+
+    path = tmp_path / "products.col"
+    path.write_bytes(exported(inventory.db, "columnar"))
+    assert by_id(read_columnar(str(path))) == expected
+    assert list(read_columnar(str(path), columns={"quantity"}))[:2] == [{"quantity": 0}, {"quantity": 1}]
+
+    inventory.db.execute("INSERT INTO categories (name, description) VALUES ('Empty', NULL)")
+    path.write_bytes(exported(inventory.db, "columnar", "categories"))
+    assert by_id(read_columnar(str(path))) == by_id(inventory.get_all_categories())
+
+def test_export_reads_one_snapshot(inventory):
+    chunks = export_chunks(inventory.db, "products", "ndjson", chunk_size=5)
+    first = [next(chunks), next(chunks)]
+    inventory.remove_product("P20")
+    inventory.add_product("P99", "Late", 1.0, "Garden", "", 1)
+    ids = {json.loads(line)["id"] for line in b"".join(first + list(chunks)).splitlines()}
+    assert "P20" in ids and "P99" not in ids and len(ids) == 25
+
+def test_backup_survives_concurrent_writes(inventory, tmp_path):
+    target = tmp_path / "backup.db"
+    writes = iter(range(100, 200))
+
+    def write_during_backup(remaining, total):
+        i = next(writes)
+        inventory.add_product(f"W{i}", "Written during backup", 1.0, "Garden", "", 1)
+
+    stats = backup(inventory.db, str(target), pages=1, pause=0, max_restarts=2, progress=write_during_backup)
+    assert stats["restarts"] == 2
+    with sqlite3.connect(target) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    assert 25 < count <= inventory.db.fetchone("SELECT COUNT(*) AS count FROM products")["count"]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".backup-")] == []
+
+def test_export_routes(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "routes.db"))
+    routes = pytest.importorskip("routes")
+    monkeypatch.setattr(routes, "db", inventory.db)
+    client = routes.app.test_client()
+
+    resp = client.get("/export/products?format=csv&chunk_size=3")
+    assert resp.mimetype == "text/csv" and resp.headers["Content-Disposition"] == 'attachment; filename="products.csv"'
+    assert len(resp.get_data().splitlines()) == 26
+    columnar = client.get("/export/categories?format=columnar", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in columnar.headers
+    assert client.get("/export/products?format=xml").status_code == 400
+    assert client.get("/export/settings").status_code == 404
+    assert client.get("/backup").get_data().startswith(b"SQLite format 3\0")
@@ -0,0 +1,114 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from httpcache import TableVersions, compress_chunks, negotiate, not_modified
+from models import Database, Inventory
+
+@pytest.fixture
+def inventory(tmp_path):
+    db = Database(db_name=str(tmp_path / "httpcache.db"))
+    inventory = Inventory(db)
+    for i in range(50):
+        inventory.add_product(f"P{i}", f"Product {i}", 10.0 + i, "Electronics", "", i)
+    yield inventory
+    db.close()
+
+def test_versions_follow_writes(inventory):
+    versions = TableVersions(inventory.db)
+    products, categories = versions.validators("products"), versions.validators("categories")
+    inventory.update_product("P1", price=1.0)
+    assert versions.validators("products")[0] != products[0]
+    assert versions.validators("categories") == categories
+    inventory.db.execute("UPDATE categories SET name = 'Gadgets'")
+    assert versions.validators("categories")[0] != categories[0]
+
+    cached = TableVersions(inventory.db, max_staleness=3600)
+    etag = cached.validators("products")[0]
+    inventory.remove_product("P2")
+    assert cached.validators("products")[0] == etag
+
+def test_not_modified():
+    assert not_modified('"3.1"', None, 'W/"3.1"', 0)
+    assert not_modified('W/"2.1", W/"3.1"', None, 'W/"3.1"', 0)
+    assert not_modified("*", None, 'W/"3.1"', 0)
+    assert not not_modified('W/"2.1"', "Thu, 01 Jan 2099 00:00:00 GMT", 'W/"3.1"', 0)
+    assert not_modified(None, "Thu, 01 Jan 1970 00:01:40 GMT", 'W/"3.1"', 100.5)
+    assert not not_modified(None, "Thu, 01 Jan 1970 00:01:39 GMT", 'W/"3.1"', 100.5)
+    assert not not_modified(None, "yesterday", 'W/"3.1"', 100.5)
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("br") is None
+    assert negotiate(None) is None
+    assert negotiate("*") in ("gzip", "zstd")
+    assert gzip.decompress(b"".join(compress_chunks(["[1,", b"2]"], "gzip"))) == b"[1,2]"
+
+def test_conditional_get_and_compression(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "routes.db"))
+    routes = pytest.importorskip("routes")
+    monkeypatch.setattr(routes, "inventory", inventory)
+    monkeypatch.setattr(routes, "versions", TableVersions(inventory.db))
+    client = routes.app.test_client()
+
+    first = client.get("/products")
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"] and first.headers["Vary"] == "Accept-Encoding"
+    cached = client.get("/products", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.get_data() == b"" and cached.headers["ETag"] == etag
+    assert client.get("/products/P1", headers={"If-None-Match": etag}).status_code == 304
+    category_etag = client.get("/categories").headers["ETag"]
+
+    inventory.adjust_stock("P1", 1)
+    assert client.get("/products", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/categories", headers={"If-None-Match": category_etag}).status_code == 304
+    assert "ETag" not in client.get("/products/missing").headers
+
+    compressed = client.get("/products", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.get_data())) == client.get("/products").get_json()
+    stream = client.get("/products?stream=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert len(gzip.decompress(stream.get_data()).splitlines()) == 50
+    assert "Content-Encoding" not in client.get("/products/P1", headers={"Accept-Encoding": "gzip"}).headers
+
+def call_asgi(app, path, headers=()):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"",
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+def test_asgi_conditional_get_and_compression(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "asgi.db"))
+    asgi = pytest.importorskip("asgi")
+    monkeypatch.setattr(asgi, "inventory", inventory)
+    monkeypatch.setattr(asgi, "versions", TableVersions(inventory.db))
+
+    status, headers, body = call_asgi(asgi.app, "/products", [("accept-encoding", "gzip")])
+    assert status == 200 and headers[b"content-encoding"] == b"gzip"
+    assert len(json.loads(gzip.decompress(body))["data"]) == 50
+    status, _, body = call_asgi(asgi.app, "/products", [("if-none-match", headers[b"etag"].decode())])
+    assert status == 304 and body == b""
+
+def test_writes_through_the_app_invalidate_cached_validators(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "routes.db"))
+    routes = pytest.importorskip("routes")
+    monkeypatch.setattr(routes, "inventory", inventory)
+    monkeypatch.setattr(routes, "versions", TableVersions(inventory.db, max_staleness=3600))
+    client = routes.app.test_client()
+
+    etag = client.get("/products/P1").headers["ETag"]
+    inventory.update_product("P1", price=2.0)
+    assert client.get("/products/P1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.put("/products/P1", json={"price": 3.0}).status_code == 200
+    resp = client.get("/products/P1", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.get_json()["data"]["price"] == 3.0
@@ -1,25 +1,20 @@
+import sqlite3
+import threading
+
 import pytest
-from app.models import Database, Inventory
+from app.models import MIGRATIONS, Database, InsufficientStockError, Inventory, ProductNotFoundError
 
 @pytest.fixture
-def db():
-    """Creates a test database instance."""
-    test_db = Database(db_name=":inventory.db:")  
-    return test_db
+def db(tmp_path):
+    """Creates a fresh test database for each test."""
+    test_db = Database(db_name=str(tmp_path / "inventory.db"))
+    yield test_db
+    test_db.close()
 
 @pytest.fixture
 def inventory(db):
-    """Creates an Inventory instance using the test database and clears existing data."""
-    inventory = Inventory(db)
-    
-    # Clear existing data before each test
-    with inventory.db.get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM products")  # Clear products table
-        cursor.execute("DELETE FROM categories")  # Clear categories table
-        conn.commit()
-    
-    return inventory
+    """Creates an Inventory instance using the test database."""
+    return Inventory(db)
 
 # ==== CATEGORY TESTS ====
 
@@ -90,5 +85,444 @@ def test_update_product(inventory):
     assert product["price"] == 120.0
     assert product["quantity"] == 25
 
+# ==== CONNECTION POOL TESTS ====
+
+def test_pool_reuses_connections(tmp_path):
+    db = Database(db_name=str(tmp_path / "pool.db"), pool_size=2)
+    with db.connection() as first:
+        pass
+    with db.connection() as second:
+        assert second is first
+    db.close()
+
+def test_wal_journal_mode(tmp_path):
+    db = Database(db_name=str(tmp_path / "wal.db"))
+    assert db.fetchone("PRAGMA journal_mode")["journal_mode"] == "wal"
+    db.close()
+
+def test_transaction_rolls_back_on_error(inventory):
+    inventory.add_category("Tools", "Hand tools")
+    with pytest.raises(sqlite3.IntegrityError):
+        with inventory.db.transaction() as conn:
+            conn.execute("DELETE FROM categories WHERE name = ?", ("Tools",))
+            conn.execute("INSERT INTO categories (name, description) VALUES (NULL, NULL)")
+    assert inventory.get_category("Tools") is not None
+
+def test_pool_shared_between_threads(tmp_path):
+    db = Database(db_name=str(tmp_path / "threads.db"), pool_size=4)
+    inventory = Inventory(db)
+
+    def worker(n):
+        for i in range(25):
+            inventory.add_product(f"T{n}-{i}", "Thread item", 1.0, "Threads", "", 1)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(inventory.get_all_products()) == 200
+    assert len(db.pool._connections) <= 4
+    db.close()
+
+def test_reads_use_read_only_pool(tmp_path):
+    db = Database(db_name=str(tmp_path / "read pool.db"), read_pool_size=2)
+    inventory = Inventory(db)
+    inventory.add_product("R1", "Reader", 1.0, "Reads", "", 1)
+    assert inventory.get_product("R1")["name"] == "Reader"
+    assert len(db.read_pool._connections) == 1
+    inventory.update_product("R1", quantity=5)
+    assert [p["quantity"] for p in inventory.get_all_products()] == [5]
+    assert inventory.get_category("Reads") == inventory.get_all_categories()[0]
+    with db.read_connection() as conn:
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1 << 30
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM products")
+    db.close()
+
+def test_streams_do_not_hold_writer_connections(tmp_path):
+    db = Database(db_name=str(tmp_path / "streams.db"), pool_size=1, read_pool_size=2)
+    db.pool.timeout = 0.5
+    inventory = Inventory(db)
+    inventory.add_products_bulk({"id": f"S{i}", "name": "Item", "price": 1.0, "quantity": 1,
+                                 "category_name": "Streams"} for i in range(10))
+    products, categories = inventory.iter_products(batch_size=2), inventory.iter_categories()
+    assert next(products)["id"] == "S0" and next(categories)["name"] == "Streams"
+    inventory.update_product("S9", quantity=7)    # would time out if a stream held the only writer connection
+    assert len(list(products)) == 9
+    db.close()
+
+def test_immutable_readers_see_checkpointed_writes(tmp_path):
+    path = str(tmp_path / "immutable.db")
+    writer = Database(db_name=path)
+    Inventory(writer).add_products_bulk({"id": f"I{i}", "name": "Item", "price": 1.0, "quantity": 1,
+                                         "category_name": "Frozen"} for i in range(50))
+    replica = Database(db_name=path, read_pool_size=1, immutable=True)
+    assert len(Inventory(replica).get_all_products()) == 50
+    replica.close()
+    writer.close()
+
+# ==== PRODUCT ID SEQUENCE TESTS ====
+
+def test_next_product_id_format(inventory):
+    first = inventory.next_product_id()
+    second = inventory.next_product_id()
+    assert first.startswith("P") and len(first) == 7
+    assert int(second[1:]) == int(first[1:]) + 1
+
+def test_product_sequence_seeded_from_existing_ids(tmp_path):
+    path = str(tmp_path / "seed.db")
+    db = Database(db_name=path)
+    db.execute("INSERT INTO products (id, name, price, quantity) VALUES ('P100042', 'Old', 1.0, 1)")
+    db.close()
+
+    inventory = Inventory(Database(db_name=path))
+    assert inventory.next_product_id() == "P100043"
+
+def test_reserve_product_id_skips_client_ids(inventory):
+    current = int(inventory.next_product_id()[1:])
+    inventory.reserve_product_id(f"P{current + 10:06d}")
+    assert inventory.next_product_id() == f"P{current + 11:06d}"
+
+def test_add_product_reserves_client_ids(tmp_path):
+    inventory = Inventory(Database(db_name=str(tmp_path / "client_ids.db")))
+    inventory.add_product("P100005", "Client ID", 1.0, "Misc", "", 1)
+    assert inventory.next_product_id() == "P100006"
+
+def test_client_ids_inside_a_held_id_block_are_skipped(tmp_path):
+    inventory = Inventory(Database(db_name=str(tmp_path / "client_ids.db")), id_block_size=16)
+    inventory.add_product(inventory.next_product_id(), "Generated", 1.0, "Misc", "", 1)
+    inventory.add_product("P100005", "Inside the block", 1.0, "Misc", "", 1)
+    inventory.add_product("P100020", "Past the block", 1.0, "Misc", "", 1)
+    assert inventory.next_product_id() == "P100006"
+    for _ in range(20):
+        inventory.add_product(inventory.next_product_id(), "Generated", 1.0, "Misc", "", 1)
+    assert len(inventory.get_all_products()) == 23
+
+@pytest.mark.parametrize("block_size", [1, 16])
+def test_concurrent_product_ids_are_unique(tmp_path, block_size):
+    path = str(tmp_path / "ids.db")
+    inventories = [Inventory(Database(db_name=path), id_block_size=block_size) for _ in range(4)]
+    ids = []
+    lock = threading.Lock()
+
+    def worker(inventory):
+        generated = [inventory.next_product_id() for _ in range(100)]
+        generated += inventory.next_product_ids(50)
+        for product_id in generated:
+            inventory.add_product(product_id, "Item", 1.0, "Stress", "", 1)
+        with lock:
+            ids.extend(generated)
+
+    threads = [threading.Thread(target=worker, args=(inventories[n % 4],)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(ids) == len(set(ids)) == 16 * 150
+    assert len(inventories[0].get_all_products()) == 16 * 150
+    if block_size == 1:
+        numbers = sorted(int(i[1:]) for i in ids)
+        assert numbers == list(range(numbers[0], numbers[0] + len(numbers)))
+
+# ==== BULK IMPORT TESTS ====
+
+def test_add_products_bulk(inventory):
+    rows = [
+        {"name": "Pen", "price": 1.5, "quantity": 100, "category_name": "Stationery", "description": "Office"},
+        {"name": "Desk", "price": "250", "quantity": "3", "category_name": "Furniture"},
+        {"id": "P900001", "name": "Lamp", "price": 30.0, "quantity": 7, "category_name": "Furniture"},
+    ]
+    result = inventory.add_products_bulk(rows, chunk_size=2)
+    assert result == {"inserted": 3, "failed": 0, "errors": []}
+    assert len(inventory.get_products_by_category("Furniture")) == 2
+    assert inventory.get_product("P900001")["name"] == "Lamp"
+    assert inventory.next_product_id() == "P900002"
+
+def test_add_products_bulk_generated_ids_skip_explicit_ids_in_chunk(tmp_path):
+    inventory = Inventory(Database(db_name=str(tmp_path / "mixed.db")))
+    rows = [{"name": "Generated", "price": 1, "quantity": 1, "category_name": "Misc"},
+            {"id": "P100001", "name": "Explicit", "price": 1, "quantity": 1, "category_name": "Misc"}]
+    assert inventory.add_products_bulk(rows) == {"inserted": 2, "failed": 0, "errors": []}
+    assert {p["name"]: p["id"] for p in inventory.get_all_products()} == {"Explicit": "P100001", "Generated": "P100002"}
+
+def test_add_products_bulk_reports_bad_rows(inventory):
+    inventory.add_product("P000001", "Existing", 1.0, "Misc", "", 1)
+    rows = [
+        {"name": "Ok", "price": 1.0, "quantity": 1, "category_name": "Misc"},
+        {"name": "No price", "quantity": 1, "category_name": "Misc"},
+        {"name": "Bad qty", "price": 1.0, "quantity": "many", "category_name": "Misc"},
+        {"id": "P000001", "name": "Duplicate", "price": 1.0, "quantity": 1, "category_name": "Misc"},
+        None,
+        {"name": "Also ok", "price": 2.0, "quantity": 2, "category_name": "Misc"},
+    ]
+    result = inventory.add_products_bulk(rows)
+    assert result["inserted"] == 2
+    assert sorted(error["row"] for error in result["errors"]) == [1, 2, 3, 4]
+    assert len(inventory.get_products_by_category("Misc")) == 3
+
+def test_add_products_bulk_keeps_derived_tables_like_single_inserts(tmp_path):
+    rows = [{"id": f"P{i:06d}", "name": f"Lamp {i}" if i % 2 else f"Desk {i}", "price": 1.5 * i,
+             "quantity": i % 7, "category_name": f"Category {i % 3}"} for i in range(1, 41)]
+    single, bulk = (Inventory(Database(db_name=str(tmp_path / name))) for name in ("single.db", "bulk.db"))
+    for row in rows:
+        single.add_product(row["id"], row["name"], row["price"], row["category_name"], "", row["quantity"])
+    assert bulk.add_products_bulk(rows, chunk_size=16)["inserted"] == 40
+
+    def derived(inventory):
+        return (inventory.db.fetchall("SELECT * FROM category_stats ORDER BY category_id"),
+                inventory.db.fetchall("SELECT table_name, row_id, op FROM changes WHERE table_name = 'products' ORDER BY seq"),
+                inventory.db.fetchall("SELECT table_name, version = (SELECT MAX(seq) FROM changes AS c "
+                                      "WHERE c.table_name = v.table_name) AS current FROM table_versions AS v"),
+                [p["id"] for p in inventory.search_products("lamp", limit=100, rank=False)["items"]])
+
+    assert derived(bulk) == derived(single)
+    assert bulk.db.fetchone("SELECT 1 FROM settings WHERE name = 'bulk_insert'") is None
+    # Single inserts after a bulk import go through the triggers again.
+    bulk.add_product("P000041", "Lamp 41", 1.0, "Category 0", "", 1)
+    assert len(bulk.search_products("lamp", limit=100)["items"]) == 21
+
+# ==== PAGINATION TESTS ====
+
+def test_products_keyset_pagination(inventory):
+    inventory.add_products_bulk({"name": f"Item {i}", "price": 1.0, "quantity": 1, "category_name": "Paged"} for i in range(7))
+    seen, after = [], None
+    while True:
+        page = inventory.get_products_page(3, after)
+        seen.extend(p["id"] for p in page)
+        if len(page) < 3:
+            break
+        after = page[-1]["id"]
+    assert seen == sorted(p["id"] for p in inventory.get_all_products())
+
+def test_categories_keyset_pagination(inventory):
+    for name in ("A", "B", "C"):
+        inventory.add_category(name, "")
+    first = inventory.get_categories_page(2)
+    second = inventory.get_categories_page(2, first[-1]["id"])
+    assert [c["name"] for c in first + second] == ["A", "B", "C"]
+
+def test_iter_products_streams_all_rows(inventory):
+    inventory.add_products_bulk({"name": f"Item {i}", "price": 1.0, "quantity": 1, "category_name": "Streamed"} for i in range(25))
+    rows = inventory.iter_products(batch_size=4)
+    assert next(rows)["category"] == "Streamed"
+    assert len(list(rows)) == 24
+
+# ==== SCHEMA MIGRATION TESTS ====
+
+def test_migrations_upgrade_existing_database(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, description TEXT)")
+    conn.execute("CREATE TABLE products (id TEXT PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL, quantity INTEGER NOT NULL, category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE)")
+    conn.execute("INSERT INTO categories (name, description) VALUES ('Legacy', '')")
+    conn.execute("INSERT INTO products VALUES ('P100001', 'Old stock', 5.0, 3, 1)")
+    conn.commit()
+    conn.close()
+
+    db = Database(db_name=path)
+    assert db.schema_version() == len(MIGRATIONS)
+    indexes = {row["name"] for row in db.fetchall("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_products_category_id", "idx_products_name", "idx_products_price_category", "idx_products_quantity_id"} <= indexes
+    assert Inventory(db).get_product("P100001")["category"] == "Legacy"
+
+def test_foreign_keys_enabled(inventory):
+    assert inventory.db.fetchone("PRAGMA foreign_keys")["foreign_keys"] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        inventory.db.execute("INSERT INTO products (id, name, price, quantity, category_id) VALUES ('X1', 'Orphan', 1.0, 1, 999999)")
+
+def query_plans(db, action):
+    """Run action and return the EXPLAIN QUERY PLAN details of every SELECT it issued."""
+    statements = []
+    with db.connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        action()
+    finally:
+        with db.connection() as conn:
+            conn.set_trace_callback(None)
+    with db.connection() as conn:
+        return {sql: [row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                for sql in statements if sql.lstrip().upper().startswith("SELECT")}
+
+@pytest.mark.parametrize("action", [
+    lambda inv: inv.get_product("P000001"),
+    lambda inv: inv.get_category("Indexed"),
+    lambda inv: inv.get_products_by_category("Indexed"),
+    lambda inv: inv.remove_category("Empty"),
+    lambda inv: inv.get_products_page(10, "P000001"),
+    lambda inv: inv.get_categories_page(10, 1),
+])
+def test_inventory_queries_use_indexes(tmp_path, action):
+    db = Database(db_name=str(tmp_path / "plans.db"), pool_size=1)
+    inventory = Inventory(db)
+    inventory.add_product("P000001", "Indexed item", 1.0, "Indexed", "", 1)
+    inventory.add_category("Empty", "")
+
+    plans = query_plans(db, lambda: action(inventory))
+    assert plans
+    for sql, details in plans.items():
+        assert not any(detail.startswith("SCAN") or "TEMP B-TREE" in detail for detail in details), (sql, details)
+
+# ==== STOCK TESTS ====
+
+def test_adjust_stock(inventory):
+    inventory.add_product("P100", "Cable", 5.0, "Accessories", "", 10)
+    assert inventory.adjust_stock("P100", -4) == 6
+    assert inventory.adjust_stock("P100", 3) == 9
+    with pytest.raises(InsufficientStockError):
+        inventory.adjust_stock("P100", -10)
+    with pytest.raises(ProductNotFoundError):
+        inventory.adjust_stock("missing", 1)
+    assert inventory.get_product("P100")["quantity"] == 9
+
+def test_adjust_stock_batch_is_all_or_nothing(inventory):
+    inventory.add_product("P101", "Cable", 5.0, "Accessories", "", 10)
+    inventory.add_product("P102", "Plug", 2.0, "Accessories", "", 1)
+    with pytest.raises(InsufficientStockError):
+        inventory.adjust_stock_batch({"P101": -5, "P102": -2})
+    assert inventory.get_product("P101")["quantity"] == 10
+    assert inventory.adjust_stock_batch({"P101": -5, "P102": -1}) == {"P101": 5, "P102": 0}
+
+def test_reserve_commit_release(inventory):
+    inventory.add_product("P103", "Cable", 5.0, "Accessories", "", 10)
+    committed = inventory.reserve_stock({"P103": 3})
+    released = inventory.reserve_stock({"P103": 4})
+    assert inventory.get_product("P103")["quantity"] == 3
+    with pytest.raises(InsufficientStockError):
+        inventory.reserve_stock({"P103": 4})
+
+    assert inventory.commit_reservation(committed)
+    assert inventory.release_reservation(released)
+    assert not inventory.release_reservation(committed)
+    assert not inventory.release_reservation(released)
+    assert inventory.get_product("P103")["quantity"] == 7
+    assert inventory.get_reservation(committed)["status"] == "committed"
+    assert inventory.get_reservation(released)["items"] == [{"product_id": "P103", "quantity": 4}]
+
+def test_release_expired_reservations(inventory):
+    inventory.add_product("P104", "Cable", 5.0, "Accessories", "", 10)
+    inventory.reserve_stock({"P104": 5})
+    assert inventory.release_expired_reservations(max_age=3600) == 0
+    assert inventory.release_expired_reservations(max_age=-1) >= 1
+    assert inventory.get_product("P104")["quantity"] == 10
+
+def test_concurrent_decrements_never_oversell(tmp_path):
+    path = str(tmp_path / "stock.db")
+    Inventory(Database(db_name=path)).add_product("P1", "Hot item", 1.0, "Sale", "", 500)
+    sold = []
+    lock = threading.Lock()
+
+    def checkout(inventory):
+        for _ in range(50):
+            try:
+                if _ % 2:
+                    inventory.adjust_stock("P1", -1)
+                else:
+                    inventory.commit_reservation(inventory.reserve_stock({"P1": 1}))
+            except InsufficientStockError:
+                continue
+            with lock:
+                sold.append(1)
+
+    inventories = [Inventory(Database(db_name=path)) for _ in range(4)]
+    threads = [threading.Thread(target=checkout, args=(inventories[n % 4],)) for n in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(sold) == 500
+    assert inventories[0].get_product("P1")["quantity"] == 0
+
+# ==== GROUP COMMIT TESTS ====
+
+def test_group_commit_batches_concurrent_writes(tmp_path):
+    db = Database(db_name=str(tmp_path / "group.db"), group_commit=True, flush_interval=0.01, max_batch=50)
+    inventory = Inventory(db)
+    inventory.add_category("Batched", "")
+    category_id = inventory.get_category("Batched")["id"]
+
+    def writer(n):
+        for i in range(20):
+            db.execute("INSERT INTO products (id, name, price, quantity, category_id) VALUES (?, ?, ?, ?, ?)",
+                       (f"G{n}-{i}", "Item", 1.0, 1, category_id))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(inventory.get_products_by_category("Batched")) == 200
+    db.close()
+
+def test_group_commit_reports_errors_to_the_failing_caller_only(tmp_path):
+    db = Database(db_name=str(tmp_path / "group.db"), group_commit=True, flush_interval=0.05)
+    futures = [
+        db.commit_queue.submit("INSERT INTO categories (name, description) VALUES ('A', '')"),
+        db.commit_queue.submit("INSERT INTO categories (name, description) VALUES ('A', '')"),
+        db.commit_queue.submit("INSERT INTO categories (name, description) VALUES ('B', '')"),
+    ]
+    assert futures[0].result() is None
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert futures[2].result() is None
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute("INSERT INTO categories (name, description) VALUES ('B', '')")
+    assert [c["name"] for c in db.fetchall("SELECT name FROM categories ORDER BY name")] == ["A", "B"]
+    db.close()
+
+def test_group_commit_close_flushes_pending_writes(tmp_path):
+    path = str(tmp_path / "group.db")
+    db = Database(db_name=path, group_commit=True, flush_interval=1.0)
+    future = db.commit_queue.submit("INSERT INTO categories (name, description) VALUES ('Pending', '')")
+    db.close()
+    assert future.done()
+    assert Database(db_name=path).fetchone("SELECT name FROM categories")["name"] == "Pending"
+
+# ==== SEARCH TESTS ====
+
+@pytest.fixture
+def catalog(inventory):
+    inventory.add_products_bulk([
+        {"id": "S1", "name": "Wireless Mouse", "price": 25.0, "quantity": 10, "category_name": "Accessories"},
+        {"id": "S2", "name": "Wired Mouse", "price": 10.0, "quantity": 0, "category_name": "Accessories"},
+        {"id": "S3", "name": "Mouse Pad", "price": 5.0, "quantity": 50, "category_name": "Office"},
+        {"id": "S4", "name": "Wireless Keyboard", "price": 45.0, "quantity": 3, "category_name": "Accessories"},
+    ])
+    return inventory
+
+def test_search_prefix_match(catalog):
+    result = catalog.search_products("wire")
+    assert {p["id"] for p in result["items"]} == {"S1", "S2", "S4"}
+    assert result["facets"] == {"Accessories": 3}
+
+    result = catalog.search_products("wireless mou", rank=False)
+    assert [p["id"] for p in result["items"]] == ["S1"]
+    assert catalog.search_products("wire mouse")["items"] == []
+
+def test_search_filters_and_facets(catalog):
+    result = catalog.search_products("mouse", in_stock=True)
+    assert {p["id"] for p in result["items"]} == {"S1", "S3"}
+    assert result["facets"] == {"Accessories": 1, "Office": 1}
+
+    result = catalog.search_products("mouse", category="Accessories", max_price=20)
+    assert [p["id"] for p in result["items"]] == ["S2"]
+    assert result["facets"] == {"Accessories": 1, "Office": 1}
+
+    result = catalog.search_products(min_price=20, limit=1)
+    assert [p["id"] for p in result["items"]] == ["S1"]
+    assert result["facets"] == {"Accessories": 2}
+
+def test_search_index_follows_writes(catalog):
+    catalog.db.execute("UPDATE products SET name = 'Trackball' WHERE id = 'S1'")
+    catalog.remove_product("S2")
+    assert catalog.search_products("mouse")["items"][0]["id"] == "S3"
+    assert [p["id"] for p in catalog.search_products("track")["items"]] == ["S1"]
+    catalog.rebuild_search_index()
+    assert [p["id"] for p in catalog.search_products("track")["items"]] == ["S1"]
+
 if __name__ == "__main__":
     pytest.main()
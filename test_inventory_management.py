@@ -0,0 +1,26 @@
+import pytest
+from models import Database, Inventory
+
+gui = pytest.importorskip("inventory_management")
+
+@pytest.fixture
+def inventory(tmp_path):
+    db = Database(db_name=str(tmp_path / "gui.db"))
+    inventory = Inventory(db)
+    for i in range(12):
+        inventory.add_product(f"P{i:02d}", "Red chair" if i % 3 == 0 else "Blue table", 10.0 + i, "Furniture", "", i)
+    yield inventory
+    db.close()
+
+def test_product_query_pages_the_catalog(inventory):
+    query = gui.ProductQuery(inventory, page_size=5)
+    pages = [query.next_page() for _ in range(3)]
+    assert [len(page) for page in pages] == [5, 5, 2]
+    assert [p["id"] for page in pages for p in page] == [f"P{i:02d}" for i in range(12)]
+    assert query.exhausted and query.loaded == 12 and query.next_page() == []
+
+def test_product_query_pages_a_search(inventory):
+    query = gui.ProductQuery(inventory, " red ch ", page_size=3)
+    first, second = query.next_page(), query.next_page()
+    assert {p["id"] for p in first + second} == {"P00", "P03", "P06", "P09"}
+    assert len(first) == 3 and query.exhausted
@@ -0,0 +1,82 @@
+import logging
+
+import pytest
+from metrics import QueryTimer, RouteMetrics, fingerprint, init_app, render_prometheus
+from models import Database, Inventory
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(db_name=str(tmp_path / "metrics.db"))
+    yield db
+    db.close()
+
+def test_fingerprint_strips_literals():
+    assert fingerprint("SELECT *  FROM t WHERE a = 'x' AND b = 42\n AND c IN (?, ?, ?)") == \
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?+)"
+
+def test_query_timer_aggregates_per_fingerprint(db):
+    timer = QueryTimer().install(db)
+    inventory = Inventory(db)
+    inventory.add_product("P1", "Pen", 1.0, "Office", "", 1)
+    inventory.add_product("P2", "Pad", 2.0, "Office", "", 1)
+    inventory.get_product("P1")
+    inventory.get_product("missing")
+
+    stats = {s["query"]: s for s in timer.stats()}
+    lookup = next(s for query, s in stats.items() if query.startswith("SELECT p.id") and "WHERE p.id" in query)
+    assert lookup["count"] == 2
+    assert lookup["rows"] == 1
+    assert lookup["p99"] >= lookup["p50"] > 0
+
+    QueryTimer.uninstall(db)
+    inventory.get_product("P1")
+    assert {s["query"]: s for s in timer.stats()}[lookup["query"]]["count"] == 2
+
+def test_slow_queries_are_logged(db, caplog):
+    QueryTimer(slow_query_threshold=0).install(db)
+    with caplog.at_level(logging.WARNING, logger="inventory.slow_queries"):
+        db.fetchall("SELECT * FROM categories")
+    assert "Slow query" in caplog.text
+
+def test_render_prometheus(db):
+    timer = QueryTimer().install(db)
+    db.fetchone("SELECT COUNT(*) AS count FROM products")
+    routes = RouteMetrics()
+    routes.observe("GET", "/products", 200, 0.003)
+    text = render_prometheus(timer, routes)
+    assert 'inventory_query_duration_seconds_count{query="SELECT COUNT(*) AS count FROM products"} 1' in text
+    assert 'inventory_http_request_duration_seconds_bucket{method="GET",route="/products",status="200",le="0.005"} 1' in text
+    assert 'le="0.0025"} 0' in text
+
+def test_flask_route_metrics(db):
+    flask = pytest.importorskip("flask")
+    app = flask.Flask(__name__)
+
+    @app.route("/items/<int:item_id>")
+    def item(item_id):
+        db.fetchone("SELECT ? AS id", (item_id,))
+        return "ok"
+
+    init_app(app, db)
+    client = app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'inventory_http_request_duration_seconds_count{method="GET",route="/items/<int:item_id>",status="200"} 2' in text
+    assert 'inventory_query_duration_seconds_count{query="SELECT ? AS id"} 2' in text
+
+def test_transactions_are_timed_under_their_caller(db):
+    timer = QueryTimer().install(db)
+    inventory = Inventory(db)
+    inventory.add_products_bulk([{"id": f"P{i}", "name": "Pen", "price": 1.0, "quantity": 5, "category_name": "Office"}
+                                 for i in range(3)])
+    inventory.adjust_stock_batch({"P0": -1, "P1": -1})
+    inventory.release_reservation(inventory.reserve_stock({"P2": 2}))
+    with db.transaction("manual") as conn:
+        conn.execute("UPDATE products SET price = 2.0")
+
+    stats = {s["query"]: s for s in timer.stats()}
+    for label in ("Inventory._insert_chunk", "Inventory.adjust_stock_batch", "Inventory.reserve_stock",
+                  "Inventory.release_reservation", "manual"):
+        assert stats[f"transaction {label}"]["count"] >= 1, label
+    assert not any(query.startswith("transaction Database.") for query in stats)
@@ -0,0 +1,179 @@
+import sqlite3
+
+import pytest
+import sharding
+from models import InsufficientStockError, ProductNotFoundError
+from sharding import ShardedInventory, hash_shard, rebalance, reshard
+
+def populate(inventory, count=30):
+    for i in range(count):
+        inventory.add_product(f"P{i:03d}", f"Chair {i}" if i % 2 else f"Table {i}", 10.0 + i, f"Category {i % 5}", "", i)
+
+@pytest.fixture
+def sharded(tmp_path):
+    inventory = ShardedInventory(str(tmp_path / "by_id"), shard_count=3, shard_by="id")
+    populate(inventory)
+    yield inventory
+    inventory.close()
+
+@pytest.fixture
+def by_category(tmp_path):
+    inventory = ShardedInventory(str(tmp_path / "by_category"), shard_count=2, shard_by="category")
+    yield inventory
+    inventory.close()
+
+def test_products_are_spread_and_gathered(sharded):
+    counts = sharded.product_counts()
+    assert sum(counts) == 30 and all(counts)
+    for shard_index, shard in enumerate(sharded.shards):
+        assert all(hash_shard(p["id"], 3) == shard_index for p in shard.get_all_products())
+
+    assert sharded.get_product("P007")["category"] == "Category 2"
+    assert sharded.get_product("missing") is None
+    assert sorted(p["id"] for p in sharded.get_all_products()) == [f"P{i:03d}" for i in range(30)]
+    assert [p["id"] for p in sharded.get_products_page(4, after="P010")] == ["P011", "P012", "P013", "P014"]
+    assert [p["id"] for p in sharded.iter_products(batch_size=2)] == [f"P{i:03d}" for i in range(30)]
+    assert {p["id"] for p in sharded.filter_products(category="Category 1", max_price=25)} == {"P001", "P006", "P011"}
+    assert len(sharded.get_products_by_category("Category 4")) == 6
+
+    result = sharded.search_products("chair", limit=5, offset=10, rank=False)
+    assert [p["id"] for p in result["items"]] == ["P021", "P023", "P025", "P027", "P029"]
+    assert sum(result["facets"].values()) == 15
+    assert len(sharded.search_products("chair", limit=50)["items"]) == 15
+
+    assert sharded.summary()["products"] == 30 and sharded.summary()["categories"] == 5
+    assert str(sharded) == "Inventory with 30 products and 5 categories on 3 shards."
+
+def test_bulk_import_and_writes(sharded):
+    rows = [{"name": f"Lamp {i}", "price": 5, "quantity": 1, "category_name": "Lighting"} for i in range(20)]
+    rows.insert(3, {"name": "Broken"})
+    rows.append({"id": "P005", "name": "Duplicate", "price": 1, "quantity": 1, "category_name": "Lighting"})
+    result = sharded.add_products_bulk(rows, chunk_size=8)
+    assert result["inserted"] == 20 and [error["row"] for error in result["errors"]] == [3, 21]
+    assert len(sharded.get_products_by_category("Lighting")) == 20
+    assert all(shard.get_category("Lighting") for shard in sharded.shards)
+
+    sharded.update_product("P001", price=1.5)
+    sharded.remove_product("P002")
+    assert sharded.get_product("P001")["price"] == 1.5 and sharded.get_product("P002") is None
+    with pytest.raises(Exception):
+        sharded.remove_category("Lighting")
+    sharded.add_category("Empty", "")
+    assert sharded.remove_category("Empty") and not any(shard.get_category("Empty") for shard in sharded.shards)
+
+def test_cross_shard_stock_is_all_or_nothing(sharded):
+    ids = ["P010", "P011", "P012", "P013"]
+    assert len({hash_shard(product_id, 3) for product_id in ids}) > 1
+    before = {product_id: sharded.get_product(product_id)["quantity"] for product_id in ids}
+    with pytest.raises(InsufficientStockError):
+        sharded.adjust_stock_batch({"P010": -1, "P011": -1, "P012": -1, "P013": -100})
+    assert {product_id: sharded.get_product(product_id)["quantity"] for product_id in ids} == before
+    with pytest.raises(ProductNotFoundError):
+        sharded.adjust_stock_batch({"P010": 1, "missing": 1})
+    assert sharded.adjust_stock_batch({"P010": -2, "P011": 3}) == {"P010": 8, "P011": 14}
+
+    reservation_id = sharded.reserve_stock({"P012": 2, "P013": 3})
+    assert sorted(item["product_id"] for item in sharded.get_reservation(reservation_id)["items"]) == ["P012", "P013"]
+    assert sharded.get_product("P013")["quantity"] == 10
+    assert sharded.release_reservation(reservation_id) and not sharded.release_reservation(reservation_id)
+    assert sharded.get_product("P013")["quantity"] == 13
+    with pytest.raises(InsufficientStockError):
+        sharded.reserve_stock({"P012": 2, "P013": 100})
+    assert sharded.get_product("P012")["quantity"] == 12
+
+def test_category_routing_and_rebalance(by_category):
+    for category, count in (("Big", 12), ("Medium", 6), ("Small", 3), ("Tiny", 1)):
+        for i in range(count):
+            by_category.add_product(f"{category[0]}{i:02d}", f"{category} item {i}", 1.0, category, "", 1)
+    for name in ("Big", "Medium", "Small", "Tiny"):
+        located = [i for i, shard in enumerate(by_category.shards) if shard.get_products_by_category(name)]
+        assert len(located) == 1
+    # Categories are placed on the shard with the fewest categories, not the fewest products.
+    assert by_category.product_counts() == [15, 7]
+
+    moves = rebalance(by_category)
+    assert moves and sorted(by_category.product_counts()) == [10, 12]
+    assert len(by_category.search_products("medium")["items"]) == 6
+    assert by_category.get_product("S01")["category"] == "Small"
+    assert by_category.summary()["products"] == 22
+    by_category.adjust_stock("T00", 4)
+    assert by_category.get_product("T00")["quantity"] == 5
+
+def test_ids_stay_unique_across_category_shards(by_category):
+    by_category.add_category("X", "")
+    by_category.add_category("Y", "")
+    by_category.add_product("P1", "First", 1.0, "X", "", 1)
+    with pytest.raises(sqlite3.IntegrityError, match="UNIQUE constraint failed: products.id"):
+        by_category.add_product("P1", "Second", 1.0, "Y", "", 1)
+    assert [p["name"] for p in by_category.get_all_products()] == ["First"]
+
+    rows = [{"name": "Generated", "price": 1, "quantity": 1, "category_name": "Y"},
+            {"id": "P100001", "name": "Explicit", "price": 1, "quantity": 1, "category_name": "X"},
+            {"id": "P1", "name": "Taken", "price": 1, "quantity": 1, "category_name": "Y"},
+            {"id": "Q1", "name": "Twice", "price": 1, "quantity": 1, "category_name": "X"},
+            {"id": "Q1", "name": "Twice", "price": 1, "quantity": 1, "category_name": "Y"}]
+    result = by_category.add_products_bulk(rows)
+    assert result["inserted"] == 3 and [error["row"] for error in result["errors"]] == [2, 4]
+    assert {p["name"]: p["id"] for p in by_category.get_all_products()} == {
+        "First": "P1", "Explicit": "P100001", "Generated": "P100002", "Twice": "Q1"}
+
+    by_category.remove_product("P1")
+    by_category.add_product("P1", "Again", 2.0, "Y", "", 1)
+    assert by_category.get_product("P1")["name"] == "Again"
+
+def test_reshard(sharded):
+    root = sharded.root
+    sharded.close()
+    assert sum(reshard(root, 5)) == 30
+    with ShardedInventory(root) as inventory:
+        assert inventory.shard_count == 5
+        for shard_index, shard in enumerate(inventory.shards):
+            assert all(hash_shard(p["id"], 5) == shard_index for p in shard.get_all_products())
+        assert inventory.get_product("P017")["price"] == 27.0
+    assert reshard(root, 1) == [30]
+    with pytest.raises(ValueError):
+        ShardedInventory(root, shard_count=4)
+
+def test_moves_carry_reservations(by_category, monkeypatch):
+    for category, count in (("Big", 12), ("Medium", 6), ("Small", 3), ("Tiny", 1)):
+        for i in range(count):
+            by_category.add_product(f"{category[0]}{i:02d}", f"{category} item {i}", 1.0, category, "", 5)
+    reservation_id = by_category.reserve_stock({"B00": 2, "S01": 3})
+    monkeypatch.setattr(ShardedInventory, "_assign_category", lambda *args: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        rebalance(by_category)
+    monkeypatch.undo()
+    with ShardedInventory(by_category.root) as inventory:
+        # Reopening finished the move that the failed directory update left behind.
+        assert sorted(inventory.product_counts()) == [10, 12]
+        assert sorted(item["product_id"] for item in inventory.get_reservation(reservation_id)["items"]) == ["B00", "S01"]
+        assert inventory.release_reservation(reservation_id)
+        assert inventory.get_product("B00")["quantity"] == inventory.get_product("S01")["quantity"] == 5
+
+def test_interrupted_reshard_resumes(sharded, monkeypatch):
+    root = sharded.root
+    reservation_id = sharded.reserve_stock({f"P{i:03d}": 1 for i in range(1, 30, 3)})
+    sharded.close()
+    move, calls = sharding._move_products, []
+
+    def crash_after_five_moves(*args):
+        calls.append(args)
+        if len(calls) > 5:
+            raise ZeroDivisionError
+        return move(*args)
+
+    monkeypatch.setattr(sharding, "_move_products", crash_after_five_moves)
+    with pytest.raises(ZeroDivisionError):
+        reshard(root, 5)
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="interrupted"):
+        ShardedInventory(root)
+    with pytest.raises(ValueError, match="interrupted"):
+        reshard(root, 2)
+    assert sum(reshard(root, 5)) == 30
+    with ShardedInventory(root) as inventory:
+        for shard_index, shard in enumerate(inventory.shards):
+            assert all(hash_shard(p["id"], 5) == shard_index for p in shard.get_all_products())
+        assert len(inventory.get_reservation(reservation_id)["items"]) == 10
+        assert inventory.release_reservation(reservation_id)
+        assert inventory.get_product("P028")["quantity"] == 28
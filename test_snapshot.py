@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from changes import ChangeLog
+from models import Database, Inventory
+from snapshot import CatalogSnapshot
+
+@pytest.fixture
+def inventory(tmp_path):
+    db = Database(db_name=str(tmp_path / "snapshot.db"))
+    inventory = Inventory(db)
+    inventory.add_product("P1", "Laptop", 1000.0, "Electronics", "", 3)
+    inventory.add_product("P2", 'Phone "X"', 500.0, "Electronics", "", 0)
+    inventory.add_product("P3", "Desk", 200.0, "Furniture", "", 40)
+    yield inventory
+    db.close()
+
+def by_id(rows):
+    return sorted(rows, key=lambda row: row["id"])
+
+def test_snapshot_matches_database(inventory):
+    snapshot = CatalogSnapshot(inventory.db)
+    assert by_id(snapshot.get_all_products()) == by_id(inventory.get_all_products())
+    assert by_id(snapshot.get_products_by_category("Electronics")) == by_id(inventory.get_products_by_category("Electronics"))
+    assert snapshot.get_products_by_category("Missing") == []
+    assert json.loads(snapshot.products_json()) == snapshot.get_all_products()
+
+def test_writes_are_applied_incrementally(inventory):
+    snapshot = CatalogSnapshot(inventory.db)
+    inventory.update_product("P1", price=900.0)
+    inventory.adjust_stock("P3", -10)
+    inventory.remove_product("P2")
+    inventory.add_product("P4", "Chair", 50.0, "Furniture", "", 7)
+    inventory.db.execute("UPDATE categories SET name = 'Office' WHERE name = 'Furniture'")
+    inventory.db.execute("UPDATE products SET name = 'Notebook', category_id = (SELECT id FROM categories WHERE name = 'Office') WHERE id = 'P1'")
+
+    assert by_id(snapshot.get_all_products()) == by_id(inventory.get_all_products())
+    assert {p["id"] for p in snapshot.get_products_by_category("Office")} == {"P1", "P3", "P4"}
+    assert snapshot.get_products_by_category("Electronics") == []
+    assert json.loads(snapshot.products_json()) == snapshot.get_all_products()
+    assert snapshot.reloads == 1
+
+def test_range_filters(inventory):
+    snapshot = CatalogSnapshot(inventory.db)
+    bounds = {"min_price": 300, "max_quantity": 5}
+    assert {p["id"] for p in snapshot.filter_products(**bounds)} == {"P1", "P2"}
+    assert by_id(snapshot.filter_products(**bounds)) == by_id(inventory.filter_products(**bounds))
+    assert [p["id"] for p in snapshot.filter_products(category="Furniture", min_quantity=10)] == ["P3"]
+    assert json.loads(snapshot.json(snapshot.select(max_price=200))) == inventory.filter_products(max_price=200)
+
+def test_trimmed_change_log_forces_reload(inventory):
+    snapshot = CatalogSnapshot(inventory.db)
+    inventory.add_product("P4", "Chair", 50.0, "Furniture", "", 7)
+    ChangeLog(inventory.db).trim(max_entries=0)
+    inventory.add_product("P5", "Lamp", 20.0, "Furniture", "", 1)
+    assert {p["id"] for p in snapshot.get_all_products()} == {"P1", "P2", "P3", "P4", "P5"}
+    assert snapshot.reloads == 2
+
+def test_products_route_uses_snapshot(inventory, monkeypatch, tmp_path):
+    monkeypatch.setenv("INVENTORY_DB", str(tmp_path / "routes.db"))
+    routes = pytest.importorskip("routes")
+    monkeypatch.setattr(routes, "snapshot", CatalogSnapshot(inventory.db))
+    client = routes.app.test_client()
+
+    body = client.get("/products").get_json()
+    assert body["success"] and by_id(body["data"]) == by_id(inventory.get_all_products())
+    assert [p["id"] for p in client.get("/products?category=Electronics&min_price=600").get_json()["data"]] == ["P1"]
+    assert client.get("/products?min_price=abc").status_code == 400